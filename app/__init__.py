@@ -1,6 +1,6 @@
-from flask import Flask
+from flask import Flask, session
 from flask_login import LoginManager
-from app.services.auth_service import AuthService
+from app.services.auth_service import SESSION_KEY, auth_service
 import os
 import yaml
 import logging
@@ -68,11 +68,17 @@ def create_app():
     login_manager.login_message = '请先登录'
     login_manager.login_message_category = 'warning'
     
-    auth_service = AuthService()
-    
     @login_manager.user_loader
     def load_user(user_id):
-        return auth_service.get_user(user_id)
+        return auth_service.get_user(user_id, session.get(SESSION_KEY))
+    
+    # 请求耗时指标
+    from app.utils.metrics import init_metrics
+    init_metrics(app)
+    
+    # 请求剖析（按配置或管理员的 X-Profile 请求头开启）
+    from app.utils.profiler import request_profiler
+    request_profiler.init_app(app)
     
     # 注册所有路由
     from app.routes import init_routes
@@ -26,6 +26,9 @@ def init_routes(app: Flask) -> None:
     from .tenant_file_routes import tenant_file_bp
     from .usage_routes import usage_bp
     from .console_connection_routes import console_connection_bp
+    from .fleet_routes import fleet_bp
+    from .profiling_routes import profiling_bp
+    from .inventory_routes import inventory_bp
 
     # 定义蓝图和URL前缀
     blueprints = [
@@ -41,7 +44,10 @@ def init_routes(app: Flask) -> None:
         (network_bp, '/network'),     # 网络管理
         (tenant_file_bp, '/tenant-file'),     # 租户文件管理
         (usage_bp, '/usage'),      # 使用量查询
-        (console_connection_bp, '/console-connection')  # 控制台连接路由
+        (console_connection_bp, '/console-connection'),  # 控制台连接路由
+        (fleet_bp, '/fleet'),      # 跨租户资源总览
+        (profiling_bp, '/profiling'),  # 慢请求剖析
+        (inventory_bp, '/inventory')   # 资源清单和变更历史
     ]
 
     # 注册所有蓝图
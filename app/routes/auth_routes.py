@@ -1,9 +1,13 @@
 from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, session
 from flask_login import login_user, logout_user, login_required, current_user
-from app.services.auth_service import AuthService
+from app.services.auth_service import SESSION_KEY, auth_service
 
 auth_bp = Blueprint('auth', __name__)
-auth_service = AuthService()
+
+
+def _login(user):
+    session[SESSION_KEY] = auth_service.start_session(user)
+    login_user(user)
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
@@ -19,7 +23,7 @@ def login():
                     if auth_service.verify_mfa(username, mfa_token):
                         print("MFA验证成功，准备登录用户")  
                         user.mfa_verified = True
-                        login_user(user)
+                        _login(user)
                         print(f"用户登录状态: {current_user.is_authenticated}")  
                         return redirect(url_for('main.index'))
                     else:
@@ -31,7 +35,7 @@ def login():
                     return render_template('auth/login.html', show_mfa=True, username=username, password=password)
             else:
                 print("不需要MFA，直接登录")  
-                login_user(user)
+                _login(user)
                 return redirect(url_for('main.index'))
         flash('用户名或密码错误', 'error')
     
@@ -40,6 +44,7 @@ def login():
 @auth_bp.route('/logout')
 @login_required
 def logout():
+    auth_service.end_session(session.pop(SESSION_KEY, None))
     logout_user()
     return redirect(url_for('auth.login'))
 
@@ -106,8 +111,6 @@ def enable_mfa():
 def disable_mfa():
     try:
         if auth_service.disable_mfa(current_user.username):
-            # 重新加载用户配置
-            auth_service._load_users()
             # 更新当前用户状态
             user = auth_service.get_user(current_user.username)
             if user:
@@ -122,7 +125,6 @@ def disable_mfa():
 @auth_bp.route('/settings')
 @login_required
 def settings():
-    auth_service._load_users()
     user = auth_service.get_user(current_user.username)
     if user:
         current_user.mfa_enabled = user.mfa_enabled
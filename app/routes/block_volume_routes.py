@@ -1,10 +1,12 @@
 from flask import Blueprint, request, jsonify
 from app.decorators import login_required
 from app.services.block_volume_service import BlockVolumeService
+from app.services.registry import services
+from app.utils.concurrency import FanoutTimeoutError
 import logging
 
 block_volume_bp = Blueprint('block_volume', __name__, url_prefix='/api/block-volume')
-block_volume_service = BlockVolumeService()
+block_volume_service = services.lazy(BlockVolumeService)
 
 @block_volume_bp.route('/attached-volumes/<instance_id>')
 @login_required
@@ -111,6 +113,9 @@ def list_available_volumes(availability_domain: str):
         volumes = block_volume_service.list_available_volumes(tenant_id, availability_domain)
         return jsonify(volumes)
         
+    except FanoutTimeoutError as e:
+        logging.error(f"获取可用卷列表超时: {str(e)}")
+        return jsonify({'error': str(e)}), 504
     except Exception as e:
         logging.error(f"获取可用卷列表失败: {str(e)}")
         return jsonify({'error': str(e)}), 500
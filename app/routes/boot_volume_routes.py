@@ -1,10 +1,11 @@
 from flask import Blueprint, request, jsonify
 from app.services.boot_volume_service import BootVolumeService
+from app.services.registry import services
 from app.decorators import login_required
 import logging
 
 boot_volume_bp = Blueprint('boot_volume', __name__, url_prefix='/api/boot-volume')
-boot_volume_service = BootVolumeService()
+boot_volume_service = services.lazy(BootVolumeService)
 
 @boot_volume_bp.route('/attached-volumes/<instance_id>', methods=['GET'])
 @login_required
@@ -1,10 +1,11 @@
 from flask import Blueprint, jsonify, request
 from app.services.instance_service import InstanceService
+from app.services.registry import services
 from app.decorators import login_required
 import logging
 
 compute_bp = Blueprint('compute', __name__)
-instance_service = InstanceService()
+instance_service = services.lazy(InstanceService)
 
 @compute_bp.route('/list_instances')
 @login_required
@@ -2,9 +2,10 @@ import logging
 from flask import Blueprint, jsonify, request
 from app.decorators import login_required
 from app.services.console_connection_service import ConsoleConnectionService
+from app.services.registry import services
 
 console_connection_bp = Blueprint('console_connection', __name__, url_prefix='/console-connection')
-console_connection_service = ConsoleConnectionService()
+console_connection_service = services.lazy(ConsoleConnectionService)
 
 @console_connection_bp.route('/create', methods=['POST'])
 @login_required
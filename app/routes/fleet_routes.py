@@ -0,0 +1,31 @@
+from flask import Blueprint, jsonify, request, render_template
+from app.services.fleet_service import FleetService
+from app.services.registry import services
+from app.decorators import login_required
+import logging
+
+fleet_bp = Blueprint('fleet', __name__)
+fleet_service = services.lazy(FleetService)
+
+@fleet_bp.route('/')
+@login_required
+def fleet_overview():
+    """跨租户资源总览页面"""
+    return render_template('fleet/list.html')
+
+@fleet_bp.route('/api/overview')
+@login_required
+def get_overview():
+    """
+    获取所有租户的实例、引导卷和配额余量
+
+    可选参数 timeout（秒）：等待租户返回的最长时间，超时的租户在结果中标记为 timeout；
+    force=1：先重新同步资源清单，否则实例和引导卷直接读取清单
+    """
+    try:
+        timeout = request.args.get('timeout', type=float)
+        force = request.args.get('force') == '1'
+        return jsonify(fleet_service.get_overview(timeout=timeout, force=force))
+    except Exception as e:
+        logging.error(f"获取资源总览失败: {str(e)}")
+        return jsonify({"error": str(e)}), 500
@@ -1,14 +1,18 @@
 import logging
-import oci
-import time
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, session
+from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, session, Response, stream_with_context
 from app.decorators import login_required
 from app.services.instance_service import InstanceService
 from app.services.tenant_service import TenantService
+from app.services.ip_rotation_service import ip_rotation
+from app.services.job_service import job_manager
+from app.services.instance_stream_service import instance_stream_hub
+from app.services.resource_catalog_service import resource_catalog
+from app.services.registry import services
+from app.utils.ndjson import ndjson_response, wants_ndjson
 
 instance_bp = Blueprint('instance', __name__, url_prefix='/instance')
-instance_service = InstanceService()
-tenant_service = TenantService()
+instance_service = services.lazy(InstanceService)
+tenant_service = services.lazy(TenantService)
 
 @instance_bp.route('/list')
 @login_required
@@ -22,12 +26,33 @@ def instance_list():
 def get_instances_api(tenant_id):
     """获取实例列表API"""
     try:
+        # 与推送共用缓存并合并并发调用：页面在推送不可用时定时轮询这里，不能每次都直接查询OCI
         instances = instance_service.list_instances(tenant_id)
+        if wants_ndjson(request):
+            # 每行一个实例，客户端边收边渲染
+            return ndjson_response(instances)
         return jsonify(instances)
     except Exception as e:
         logging.error(f"获取实例列表失败: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@instance_bp.route('/api/stream/<tenant_id>')
+@login_required
+def stream_instances(tenant_id):
+    """实例状态推送（SSE），同一租户的所有订阅者共享一个后台轮询"""
+    if not instance_stream_hub.accepting():
+        # 每个连接占用一个工作线程，达到上限后让页面改为轮询
+        return jsonify({'error': '实例状态推送连接数已达上限'}), 503
+    refresh = request.args.get('refresh') == '1'
+    response = Response(
+        stream_with_context(instance_stream_hub.stream(tenant_id, refresh=refresh)),
+        mimetype='text/event-stream'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    # 禁止反向代理缓冲事件流
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @instance_bp.route('/api/instance/action', methods=['POST'])
 @login_required
 def instance_action():
@@ -48,6 +73,7 @@ def instance_action():
 
         # 执行操作
         success = False
+        job_id = None
         if action == 'start':
             success = instance_service.start_instance(tenant_id, instance_id)
         elif action == 'stop':
@@ -55,7 +81,9 @@ def instance_action():
         elif action == 'reset':
             success = instance_service.restart_instance(tenant_id, instance_id)
         elif action == 'terminate':
-            success = instance_service.delete_instance(tenant_id, instance_id)
+            # 终止操作在后台任务中等待完成
+            job_id = instance_service.delete_instance(tenant_id, instance_id)
+            success = job_id is not None
 
         if success:
             # 获取更新后的实例状态
@@ -63,7 +91,8 @@ def instance_action():
             return jsonify({
                 'success': True,
                 'message': f'实例{action}操作已提交',
-                'instance': instance
+                'instance': instance,
+                'job_id': job_id
             })
         else:
             return jsonify({
@@ -81,7 +110,7 @@ def instance_action():
 @instance_bp.route('/api/instance/public-ip', methods=['POST'])
 @login_required
 def change_public_ip():
-    """更换实例公网IP"""
+    """更换实例公网IP（后台任务，通过 /instance/api/jobs/<job_id> 查询新旧IP）"""
     try:
         data = request.get_json()
         if not data:
@@ -93,48 +122,8 @@ def change_public_ip():
         if not all([tenant_id, instance_id]):
             return jsonify({'success': False, 'error': '缺少必要参数'}), 400
 
-        # 先获取当前实例信息，记录原IP
-        try:
-            original_instance = instance_service.get_instance(tenant_id, instance_id)
-            if not original_instance:
-                return jsonify({'success': False, 'error': '找不到实例'}), 404
-            
-            original_ip = original_instance.get('public_ip')
-            
-            # 尝试更换IP
-            instance_service.change_public_ip(tenant_id, instance_id)
-            
-            # 等待20秒
-            time.sleep(20)
-            
-            # 获取新的实例信息
-            new_instance = instance_service.get_instance(tenant_id, instance_id)
-            if not new_instance:
-                return jsonify({'success': False, 'error': '无法获取更新后的实例信息'}), 500
-                
-            new_ip = new_instance.get('public_ip')
-            
-            # 比较IP是否发生变化
-            if new_ip != original_ip:
-                return jsonify({
-                    'success': True,
-                    'message': '公网IP更换成功',
-                    'instance': new_instance,
-                    'old_ip': original_ip,
-                    'new_ip': new_ip
-                })
-            else:
-                return jsonify({
-                    'success': False,
-                    'error': 'IP未发生变化，可能更换失败'
-                }), 500
-                
-        except Exception as e:
-            logging.error(f"更换公网IP时发生错误: {str(e)}")
-            return jsonify({
-                'success': False,
-                'error': str(e)
-            }), 500
+        job = ip_rotation.submit(tenant_id, instance_id)
+        return jsonify({'success': True, 'job_id': job.id}), 202
 
     except Exception as e:
         logging.error(f"处理更换公网IP请求时发生错误: {str(e)}")
@@ -143,6 +132,28 @@ def change_public_ip():
             'error': '处理请求时发生错误'
         }), 500
 
+@instance_bp.route('/api/instance/public-ip/batch', methods=['POST'])
+@login_required
+def change_public_ips():
+    """
+    批量更换多台实例（可跨租户）的公网IP
+    
+    请求体: {"targets": [{"tenant_id": "1", "instance_id": "ocid1.instance..."}, ...]}
+    """
+    data = request.get_json(silent=True) or {}
+    targets = data.get('targets')
+    if not isinstance(targets, list) or not targets:
+        return jsonify({'success': False, 'error': '缺少targets参数'}), 400
+    if not all(isinstance(t, dict) and t.get('tenant_id') and t.get('instance_id') for t in targets):
+        return jsonify({'success': False, 'error': 'targets中的每一项都需要tenant_id和instance_id'}), 400
+
+    try:
+        job = ip_rotation.submit_batch([(t['tenant_id'], t['instance_id']) for t in targets])
+        return jsonify({'success': True, 'job_id': job.id, 'total': job.result['total']}), 202
+    except Exception as e:
+        logging.error(f"提交批量更换公网IP任务失败: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @instance_bp.route('/api/instance/<tenant_id>/<instance_id>')
 @login_required
 def get_instance_api(tenant_id, instance_id):
@@ -191,12 +202,21 @@ def attach_vnic(tenant_id, instance_id):
 def detach_vnic(tenant_id, attachment_id):
     """分离VNIC"""
     try:
-        success = instance_service.detach_vnic(tenant_id, attachment_id)
-        return jsonify({'success': success})
+        job_id = instance_service.detach_vnic(tenant_id, attachment_id)
+        return jsonify({'success': True, 'job_id': job_id})
     except Exception as e:
         logging.error(f"分离VNIC失败: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@instance_bp.route('/api/jobs/<job_id>')
+@login_required
+def get_job(job_id):
+    """查询后台任务的进度和结果"""
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({'error': '任务不存在或已过期'}), 404
+    return jsonify(job)
+
 @instance_bp.route('/detail')
 @login_required
 def instance_detail():
@@ -247,10 +267,21 @@ def create_instance():
 @instance_bp.route('/api/resources/<tenant_id>')
 @login_required
 def get_resources(tenant_id):
-    """获取可用域、镜像和子网等资源"""
+    """
+    获取可用域、镜像和子网等资源
+
+    响应带 ETag，浏览器用 If-None-Match 重新验证，内容未变化时返回 304；refresh=1 时忽略缓存
+    """
     try:
-        resources = instance_service.get_resources(tenant_id)
-        return jsonify(resources)
+        force = request.args.get('refresh') == '1'
+        resources, etag = resource_catalog.get_resources(tenant_id, force=force)
+        if etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            response = jsonify(resources)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
     except Exception as e:
         logging.error(f"获取资源列表失败: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -294,7 +325,6 @@ def create_instance_api():
 def get_shapes(tenant_id, instance_id):
     """获取实例可用的形状列表"""
     try:
-        instance_service = InstanceService()
         result = instance_service.list_available_shapes(
             tenant_id=tenant_id,
             instance_id=instance_id
@@ -324,7 +354,6 @@ def update_shape(tenant_id, instance_id):
                 'message': '缺少必要的参数'
             }), 400
 
-        instance_service = InstanceService()
         result = instance_service.update_instance_shape(
             tenant_id=tenant_id,
             instance_id=instance_id,
@@ -344,21 +373,10 @@ def update_shape(tenant_id, instance_id):
 @instance_bp.route('/api/instance/<tenant_id>/<instance_id>/change-public-ip', methods=['POST'])
 @login_required
 def change_instance_public_ip(tenant_id, instance_id):
-    """更换实例公网IP"""
+    """更换实例公网IP（后台任务）"""
     try:
-        # 更换公网IP
-        result = instance_service.change_public_ip(tenant_id, instance_id)
-        if result:
-            return jsonify({
-                'success': True,
-                'message': '公网IP更换成功',
-                'instance': result
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'error': '公网IP更换失败'
-            }), 500
+        job = ip_rotation.submit(tenant_id, instance_id)
+        return jsonify({'success': True, 'job_id': job.id}), 202
     except Exception as e:
         logging.error(f"更换公网IP时发生错误: {str(e)}")
         return jsonify({
@@ -0,0 +1,72 @@
+from flask import Blueprint, jsonify, request
+from app.services.inventory_service import KINDS, inventory_service
+from app.decorators import login_required
+import logging
+
+inventory_bp = Blueprint('inventory', __name__)
+
+@inventory_bp.route('/api/<tenant_id>/<kind>')
+@login_required
+def get_inventory(tenant_id, kind):
+    """
+    从资源清单读取租户的某类资源
+
+    kind 可选 instances、vnics、boot_volumes、block_volumes、vcns、subnets、security_lists；
+    可选参数 force=1：先向OCI同步再返回。结果中的 last_refreshed 和 stale 表示清单的新鲜程度
+    """
+    if kind not in KINDS:
+        return jsonify({'error': f'不支持的资源类型: {kind}'}), 400
+    try:
+        items, meta = inventory_service.get(tenant_id, kind, force=request.args.get('force') == '1')
+        return jsonify(dict(meta, items=items))
+    except Exception as e:
+        logging.error(f"读取资源清单失败: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@inventory_bp.route('/api/<tenant_id>/changes')
+@login_required
+def get_changes(tenant_id):
+    """
+    租户的变更历史（按时间倒序）
+
+    可选参数 kind、resource_id、since（时间戳）、limit（默认200）
+    """
+    try:
+        changes = inventory_service.get_changes(
+            tenant_id,
+            kind=request.args.get('kind'),
+            resource_id=request.args.get('resource_id'),
+            since=request.args.get('since', type=float),
+            limit=request.args.get('limit', 200, type=int)
+        )
+        return jsonify({'changes': changes})
+    except Exception as e:
+        logging.error(f"查询资源变更历史失败: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@inventory_bp.route('/api/history')
+@login_required
+def get_address_history():
+    """查询某个IP地址的分配和释放历史（跨租户），参数 ip"""
+    address = (request.args.get('ip') or '').strip()
+    if not address:
+        return jsonify({'error': '缺少必要参数: ip'}), 400
+    try:
+        history = inventory_service.get_address_history(address, limit=request.args.get('limit', 200, type=int))
+        return jsonify({'ip': address, 'history': history})
+    except Exception as e:
+        logging.error(f"查询IP历史失败: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@inventory_bp.route('/api/<tenant_id>/sync', methods=['POST'])
+@login_required
+def sync_inventory(tenant_id):
+    """立即同步租户的资源清单，可在请求体中用 kinds 指定资源类型"""
+    try:
+        kinds = (request.get_json(silent=True) or {}).get('kinds')
+        if kinds and any(kind not in KINDS for kind in kinds):
+            return jsonify({'error': '不支持的资源类型'}), 400
+        return jsonify(inventory_service.sync_tenant(tenant_id, kinds))
+    except Exception as e:
+        logging.error(f"同步资源清单失败: {str(e)}")
+        return jsonify({'error': str(e)}), 500
@@ -1,6 +1,6 @@
 from flask import Blueprint, jsonify, request, render_template
-from oci import management_agent
 from app.decorators import login_required
+from app.utils.metrics import metrics_allowed, render_metrics
 
 main_bp = Blueprint('main', __name__, url_prefix='/')
 
@@ -14,3 +14,10 @@ def index():
 def health_check():
     """健康检查端点"""
     return {'status': 'healthy'}, 200
+
+@main_bp.route('/metrics')
+def metrics():
+    """Prometheus 指标，只允许 metrics.allowed_networks 中的地址或管理员访问"""
+    if not metrics_allowed():
+        return jsonify({'error': '无权访问'}), 403
+    return render_metrics()
@@ -1,13 +1,14 @@
 import logging
-import oci
 from flask import Blueprint, render_template, request, jsonify, redirect, url_for
 from app.decorators import login_required
 from app.services.network_service import NetworkService
 from app.services.tenant_service import TenantService
+from app.services.registry import services
+from app.utils.concurrency import FanoutTimeoutError
 
 network_bp = Blueprint('network', __name__, url_prefix='/network')
-network_service = NetworkService()
-tenant_service = TenantService()
+network_service = services.lazy(NetworkService)
+tenant_service = services.lazy(TenantService)
 
 @network_bp.route('/')
 @login_required
@@ -207,6 +208,9 @@ def get_network_entities(tenant_id, vcn_id):
         entities = network_service.list_network_entities(tenant_id, vcn_id)
         logging.info(f"网络实体列表: {entities}")
         return jsonify(entities)
+    except FanoutTimeoutError as e:
+        logging.error(f"获取网络实体列表超时: {str(e)}")
+        return jsonify({'error': str(e)}), 504
     except Exception as e:
         logging.error(f"获取网络实体列表失败: {str(e)}")
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
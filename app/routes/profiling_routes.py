@@ -0,0 +1,47 @@
+from flask import Blueprint, jsonify, render_template, redirect, url_for, flash
+from app.decorators import admin_required
+from app.utils.profiler import request_profiler
+
+profiling_bp = Blueprint('profiling', __name__)
+
+@profiling_bp.route('/')
+@admin_required
+def trace_list():
+    """慢请求耗时树列表"""
+    return render_template('profiling/list.html',
+                           traces=request_profiler.buffer.list(),
+                           enabled=request_profiler.enabled,
+                           slow_threshold=request_profiler.slow_threshold)
+
+@profiling_bp.route('/<trace_id>')
+@admin_required
+def trace_detail(trace_id):
+    """单个请求的耗时树"""
+    trace = request_profiler.get_trace(trace_id)
+    if not trace:
+        flash('记录不存在或已被覆盖', 'warning')
+        return redirect(url_for('profiling.trace_list'))
+    return render_template('profiling/detail.html', trace=trace)
+
+@profiling_bp.route('/api/traces')
+@admin_required
+def get_traces():
+    """慢请求摘要列表"""
+    return jsonify(request_profiler.buffer.list())
+
+@profiling_bp.route('/api/traces/<trace_id>')
+@admin_required
+def get_trace(trace_id):
+    """包含耗时树的完整记录"""
+    trace = request_profiler.get_trace(trace_id)
+    if not trace:
+        return jsonify({'error': '记录不存在或已被覆盖'}), 404
+    return jsonify(trace)
+
+@profiling_bp.route('/clear', methods=['POST'])
+@admin_required
+def clear_traces():
+    """清空缓冲区"""
+    request_profiler.buffer.clear()
+    flash('已清空', 'success')
+    return redirect(url_for('profiling.trace_list'))
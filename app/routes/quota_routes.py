@@ -1,12 +1,13 @@
-from flask import Blueprint, jsonify, request, render_template
+from flask import Blueprint, jsonify, request, render_template, Response, stream_with_context
 from ..services.quota_service import QuotaService
 from ..services.tenant_service import TenantService
+from ..services.registry import services
+import json
 import logging
-import oci
 
 quota_bp = Blueprint('quota', __name__, url_prefix='/quota')
-quota_service = QuotaService()
-tenant_service = TenantService()
+quota_service = services.lazy(QuotaService)
+tenant_service = services.lazy(TenantService)
 
 @quota_bp.route('/')
 def quota_list():
@@ -44,8 +45,58 @@ def get_quotas(tenant_id):
         if not service_name:
             return jsonify({"error": "请指定服务名称"}), 400
             
-        quotas = quota_service.get_service_quotas(tenant_id, service_name, availability_domain)
+        force = request.args.get('refresh') == '1'
+        quotas = quota_service.get_service_quotas(tenant_id, service_name, availability_domain, force=force)
         return jsonify(quotas)
     except Exception as e:
         logging.error(f"获取配额信息失败: {str(e)}")
         return jsonify({"error": str(e)}), 400
+
+@quota_bp.route('/api/quotas/<tenant_id>/stream')
+def stream_quotas(tenant_id):
+    """
+    以 NDJSON 流式返回配额信息，每查询完一条限制就推送一行
+
+    每行一个JSON对象：{"type": "total"}、{"type": "limit"}，最后是 {"type": "done"} 或 {"type": "error"}。
+    有快照时直接输出快照，否则实时查询并在完成后保存快照；refresh=1 时忽略快照。
+    """
+    service_name = request.args.get('service_name')
+    availability_domain = request.args.get('availability_domain')
+    force = request.args.get('refresh') == '1'
+    if not service_name:
+        return jsonify({"error": "请指定服务名称"}), 400
+
+    def generate():
+        try:
+            cached = None if force else quota_service.get_cached_service_quotas(
+                tenant_id, service_name, availability_domain)
+            if cached:
+                limits = cached["service_limits"]
+                yield json.dumps({"type": "total", "total": len(limits)}) + "\n"
+                for row in limits:
+                    yield json.dumps({"type": "limit", "data": row}, ensure_ascii=False) + "\n"
+                result = cached
+            else:
+                generation = quota_service.quota_generation(tenant_id, service_name, availability_domain)
+                rows = quota_service.iter_service_quotas(tenant_id, service_name, availability_domain)
+                yield json.dumps({"type": "total", "total": next(rows)["total"]}) + "\n"
+                limits = []
+                for row in rows:
+                    limits.append(row)
+                    yield json.dumps({"type": "limit", "data": row}, ensure_ascii=False) + "\n"
+                result = quota_service.store_service_quotas(tenant_id, service_name, availability_domain, limits,
+                                                            generation=generation)
+            yield json.dumps({
+                "type": "done",
+                "total_limits": result["total_limits"],
+                "last_refreshed": result["last_refreshed"],
+                "stale": result["stale"]
+            }) + "\n"
+        except Exception as e:
+            logging.error(f"获取配额信息失败: {str(e)}")
+            yield json.dumps({"type": "error", "error": str(e)}, ensure_ascii=False) + "\n"
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
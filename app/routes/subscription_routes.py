@@ -2,11 +2,12 @@
 from flask import Blueprint, render_template, jsonify, request
 from app.services.subscription_service import SubscriptionService
 from app.services.tenant_service import TenantService
+from app.services.registry import services
 from app.decorators import login_required
 
 subscription_bp = Blueprint('subscription', __name__)
-subscription_service = SubscriptionService()
-tenant_service = TenantService()
+subscription_service = services.lazy(SubscriptionService)
+tenant_service = services.lazy(TenantService)
 
 @subscription_bp.route('/list')
 @login_required
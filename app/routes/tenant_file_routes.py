@@ -1,9 +1,10 @@
 from flask import Blueprint, request, jsonify
 from app.decorators import login_required
 from app.services.tenant_file_service import TenantFileService
+from app.services.registry import services
 
 tenant_file_bp = Blueprint('tenant_file', __name__, url_prefix='/tenant/file')
-tenant_file_service = TenantFileService()
+tenant_file_service = services.lazy(TenantFileService)
 
 @tenant_file_bp.route('/upload', methods=['POST'])
 @login_required
@@ -2,11 +2,12 @@ from flask import Blueprint, render_template, request, flash, redirect, url_for,
 from app.decorators import login_required
 from app.services.tenant_service import TenantService
 from app.services.tenant_file_service import TenantFileService
+from app.services.registry import services
 import logging
 
 tenant_bp = Blueprint('tenant', __name__, url_prefix='/tenant')
-tenant_service = TenantService()
-tenant_file_service = TenantFileService()
+tenant_service = services.lazy(TenantService)
+tenant_file_service = services.lazy(TenantFileService)
 
 @tenant_bp.route('/list')
 @login_required
@@ -147,6 +148,19 @@ def get_tenant_info(tenant_id):
         return jsonify({'error': '租户不存在'}), 404
     return jsonify(tenant)
 
+@tenant_bp.route('/revalidate/<tenant_id>', methods=['POST'])
+@login_required
+def revalidate_tenant(tenant_id):
+    """立即重新验证租户配置"""
+    try:
+        health = tenant_service.revalidate_tenant(tenant_id)
+        if health is None:
+            return jsonify({'error': '租户不存在'}), 404
+        return jsonify(health)
+    except Exception as e:
+        logging.error(f"重新验证租户失败: {str(e)}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
 @tenant_bp.route('/copy/<tenant_id>', methods=['POST'])
 @login_required
 def copy_tenant(tenant_id):
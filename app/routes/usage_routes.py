@@ -1,12 +1,13 @@
 from flask import Blueprint, jsonify, request, render_template
 from app.services.usage_service import UsageService
 from app.services.tenant_service import TenantService
+from app.services.registry import services
 from app.decorators import login_required
 import logging
 
 usage_bp = Blueprint('usage', __name__)
-usage_service = UsageService()
-tenant_service = TenantService()
+usage_service = services.lazy(UsageService)
+tenant_service = services.lazy(TenantService)
 
 @usage_bp.route('/list')
 @login_required
@@ -111,3 +112,44 @@ def get_storage_usage():
             'status': 'error',
             'message': str(e)
         }), 500
+
+@usage_bp.route('/api/breakdown', methods=['GET'])
+@login_required
+def get_usage_breakdown():
+    """按日期、租户、服务等维度汇总使用量，支持多个租户和TopN"""
+    try:
+        tenant_ids = request.args.getlist('tenant_id')
+        start_time = request.args.get('start_time')
+        end_time = request.args.get('end_time')
+        group_by = [field for field in request.args.get('group_by', 'service').split(',') if field]
+        top_n = request.args.get('top', type=int)
+        
+        if not tenant_ids or not start_time or not end_time:
+            return jsonify({
+                'status': 'error',
+                'message': '缺少必要参数: tenant_id, start_time, end_time'
+            }), 400
+            
+        usage_data = usage_service.get_usage_breakdown(
+            tenant_ids=tenant_ids,
+            start_time=start_time,
+            end_time=end_time,
+            group_by=group_by,
+            top_n=top_n
+        )
+        
+        return jsonify({
+            'status': 'success',
+            'data': usage_data
+        }), 200
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        logging.error(f"获取使用量汇总失败: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
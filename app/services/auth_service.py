@@ -1,13 +1,18 @@
-import bcrypt
+import logging
 import os
-from datetime import datetime, timedelta
+import tempfile
+import threading
+from datetime import datetime
 import yaml
 from flask_login import UserMixin
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
 import pyotp
 import qrcode
 import io
 import base64
+from config.config import config
+from app.services.auth_store import auth_store
+from app.utils.profiler import span
 
 class User(UserMixin):
     def __init__(self, username: str, password: str, role: str, mfa_enabled: bool = False, mfa_secret: str = None):
@@ -22,68 +27,139 @@ class User(UserMixin):
         self.mfa_secret = mfa_secret
         self.mfa_verified = False  
 
+    @property
+    def is_admin(self) -> bool:
+        return self.role == 'admin'
+
+# Flask session 中保存共享会话ID的键
+SESSION_KEY = 'auth_session_id'
+
+# 用户配置所在的主配置文件
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                           'config', 'config.yml')
+
+
 class AuthService:
-    def __init__(self):
-        with open('config/config.yml', 'r', encoding='utf-8') as f:
-            self.config = yaml.safe_load(f)
-        self.max_attempts = self.config['security']['max_login_attempts']
-        self.lockout_duration = self.config['security']['lockout_duration']
-        self.mfa_issuer = self.config['security']['mfa_issuer']
-        self.users = {}
-        self._load_users()
-        
-    def _load_users(self):
+    """
+    用户认证服务
+
+    auth.users 解析后常驻内存，只有 config.yml 的 mtime、inode 或大小变化时才重新解析，
+    每个请求加载用户时不再读取YAML；登录失败次数、锁定和会话保存在 auth_store 中，由所有工作进程共享。
+    """
+
+    def __init__(self, path: str = CONFIG_PATH):
+        self.path = path
+        self.max_attempts = config.get('security.max_login_attempts', 5)
+        self.lockout_duration = config.get('security.lockout_duration', 300)
+        self.mfa_issuer = config.get('security.mfa_issuer', 'OCI-Manager')
+        self._lock = threading.RLock()
+        self._stat_key: Optional[Tuple[int, int, int]] = None
+        self._user_configs: Dict[str, Dict[str, Any]] = {}
+
+    def _current_stat_key(self) -> Optional[Tuple[int, int, int]]:
         try:
-            with open('config/config.yml', 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
-                self.config = config
-                
-            # 清空现有用户
-            self.users = {}
-            
-            # 加载用户
-            for user_config in config['auth']['users']:
-                user = User(
-                    username=user_config['username'],
-                    password=user_config['password'],
-                    role=user_config['role'],
-                    mfa_enabled=user_config.get('mfa_enabled', False),
-                    mfa_secret=user_config.get('mfa_secret')
-                )
-                self.users[user.username] = user
-                
-            print(f"已加载用户配置: {len(self.users)}个用户")  # 调试日志
-        except Exception as e:
-            print(f"加载用户配置出错: {str(e)}")  # 调试日志
-            raise
-    
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_ino, st.st_size
+
+    def _load_users(self):
+        """重新解析 config.yml 中的用户配置"""
+        with self._lock:
+            stat_key = self._current_stat_key()
+            try:
+                with span('读取 config.yml'), open(self.path, 'r', encoding='utf-8') as f:
+                    data = yaml.safe_load(f) or {}
+            except Exception as e:
+                logging.error(f"加载用户配置出错: {str(e)}")
+                # 文件暂时不可读（例如正在被替换）时保留旧数据，下次调用再尝试
+                if self._stat_key is not None:
+                    return
+                raise
+            self._user_configs = {
+                user_config['username']: dict(user_config)
+                for user_config in (data.get('auth') or {}).get('users') or []
+            }
+            self._stat_key = stat_key
+            logging.info(f"已加载用户配置: {len(self._user_configs)}个用户")
+
+    def _refresh(self):
+        if self._current_stat_key() == self._stat_key:
+            return
+        with self._lock:
+            if self._current_stat_key() != self._stat_key:
+                self._load_users()
+
+    def usernames(self) -> List[str]:
+        """config.yml 中配置的全部用户名"""
+        self._refresh()
+        return list(self._user_configs)
+
+    def _build_user(self, username: str) -> Optional[User]:
+        """按缓存的配置创建新的 User 对象，每个请求各自持有，互不影响"""
+        self._refresh()
+        user_config = self._user_configs.get(username)
+        if not user_config:
+            return None
+        return User(
+            username=user_config['username'],
+            password=user_config['password'],
+            role=user_config['role'],
+            mfa_enabled=user_config.get('mfa_enabled', False),
+            mfa_secret=user_config.get('mfa_secret')
+        )
+
+    def _update_user_config(self, username: str, **fields: Any) -> bool:
+        """修改 config.yml 中某个用户的配置，写临时文件后原子替换"""
+        with self._lock:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = yaml.safe_load(f) or {}
+            for user_config in (data.get('auth') or {}).get('users') or []:
+                if user_config['username'] == username:
+                    user_config.update(fields)
+                    break
+            else:
+                return False
+
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix='.config-', suffix='.yml')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    yaml.dump(data, f, allow_unicode=True)
+                os.chmod(tmp_path, os.stat(self.path).st_mode & 0o777)
+                os.replace(tmp_path, self.path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            self._load_users()
+            return True
+
     def authenticate_user(self, username: str, password: str) -> Optional[User]:
-        # 每次验证时重新加载用户配置
-        self._load_users()
-        
-        user = self.users.get(username)
-        
+        user = self._build_user(username)
         if not user:
             return None
-            
-        if user.is_locked and user.locked_until and user.locked_until > datetime.utcnow():
-            return None    
-        if user.password == password:  
-            user.failed_login_attempts = 0
-            user.is_locked = False
-            user.locked_until = None
-            if user.mfa_enabled:
-                user.mfa_verified = False
-                return user
-            return user
-        user.failed_login_attempts += 1
-        if user.failed_login_attempts >= self.max_attempts:
+
+        locked_until = auth_store.locked_until(username)
+        if locked_until:
             user.is_locked = True
-            user.locked_until = datetime.utcnow() + timedelta(seconds=self.lockout_duration)
+            user.locked_until = datetime.utcfromtimestamp(locked_until)
+            return None
+        if user.password == password:
+            auth_store.reset_failures(username)
+            return user
+        user.failed_login_attempts = auth_store.record_failure(username, self.max_attempts, self.lockout_duration)
         return None
-    
+
+    def start_session(self, user: User) -> str:
+        """登录成功后创建共享会话，返回的会话ID保存在 Flask session 中"""
+        return auth_store.create_session(user.username, user.mfa_verified)
+
+    def end_session(self, session_id: Optional[str]) -> None:
+        if session_id:
+            auth_store.delete_session(session_id)
+
     def verify_mfa(self, username: str, token: str) -> bool:
-        user = self.users.get(username)
+        user = self._build_user(username)
         if not user:
             print("用户不存在")  # 调试日志
             return False
@@ -104,7 +180,7 @@ class AuthService:
         return False
     
     def setup_mfa(self, username: str) -> tuple[str, str]:
-        user = self.users.get(username)
+        user = self._build_user(username)
         if not user:
             raise ValueError("User not found")
             
@@ -128,7 +204,7 @@ class AuthService:
         return secret, qr_code
     
     def enable_mfa(self, username: str, secret: str, token: str) -> bool:
-        user = self.users.get(username)
+        user = self._build_user(username)
         if not user:
             print("用户不存在")  
             return False
@@ -136,72 +212,46 @@ class AuthService:
         if not totp.verify(token):
             print("令牌验证失败")  
             return False
-        user.mfa_enabled = True
-        user.mfa_secret = secret
-        with open('config/config.yml', 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
-            
-        for user_config in config['auth']['users']:
-            if user_config['username'] == username:
-                user_config['mfa_enabled'] = True
-                user_config['mfa_secret'] = secret
-                break
-                
-        with open('config/config.yml', 'w', encoding='utf-8') as f:
-            yaml.dump(config, f, allow_unicode=True)
-        print(f"MFA已启用: enabled={user.mfa_enabled}, secret={user.mfa_secret}")
+        if not self._update_user_config(username, mfa_enabled=True, mfa_secret=secret):
+            return False
+        print(f"MFA已启用: 用户={username}")
         return True
     
     def disable_mfa(self, username: str) -> bool:
         print(f"禁用MFA: 用户={username}") 
-        user = self.users.get(username)
+        user = self._build_user(username)
         if not user:
             print("用户不存在")  
             return False
-            
-        user.mfa_enabled = False
-        user.mfa_secret = None
-        
-        with open('config/config.yml', 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
-            
-        for user_config in config['auth']['users']:
-            if user_config['username'] == username:
-                user_config['mfa_enabled'] = False
-                user_config['mfa_secret'] = None
-                break
-                
-        with open('config/config.yml', 'w', encoding='utf-8') as f:
-            yaml.dump(config, f, allow_unicode=True) 
-        self._load_users()
-        return True
+        return self._update_user_config(username, mfa_enabled=False, mfa_secret=None)
     
     def change_password(self, username: str, current_password: str, new_password: str) -> bool:
-        user = self.users.get(username)
+        user = self._build_user(username)
         if not user:
             return False
             
         if user.password != current_password:
             return False
             
-        user.password = new_password
-        for user_config in self.config['auth']['users']:
-            if user_config['username'] == username:
-                user_config['password'] = new_password
-                break
-                
-        self._save_config()
-        return True
-    
-    def _save_config(self):
-        for user_config in self.config['auth']['users']:
-            user = self.users.get(user_config['username'])
-            if user:
-                user_config['password'] = user.password
-        
-        with open('config/config.yml', 'w', encoding='utf-8') as f:
-            yaml.dump(self.config, f, allow_unicode=True)
+        return self._update_user_config(username, password=new_password)
     
-    def get_user(self, user_id: str) -> Optional[User]:
-        self._load_users()
-        return self.users.get(user_id)
+    def get_user(self, user_id: str, session_id: Optional[str] = None) -> Optional[User]:
+        """
+        Flask-Login 的 user_loader，每个请求调用一次
+
+        Args:
+            user_id: 用户名
+            session_id: start_session 返回的会话ID；会话已退出或过期时返回None，需要重新登录
+        """
+        user = self._build_user(user_id)
+        if user is None or not session_id:
+            return user
+        state = auth_store.get_session(session_id)
+        if not state or state[0] != user_id:
+            return None
+        user.mfa_verified = state[1]
+        return user
+
+
+# 全局认证服务
+auth_service = AuthService()
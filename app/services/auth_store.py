@@ -0,0 +1,156 @@
+"""登录状态仓库
+
+登录失败次数、账户锁定和登录会话（含MFA验证状态）保存在SQLite中，
+由所有 gunicorn 工作进程共享：任一进程记录的失败次数都计入锁定，
+在任一进程退出登录后，该会话在所有进程中失效。
+"""
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+from config.config import config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS login_state (
+    username         TEXT PRIMARY KEY,
+    failed_attempts  INTEGER NOT NULL,
+    locked_until     REAL
+);
+CREATE TABLE IF NOT EXISTS auth_sessions (
+    session_id    TEXT PRIMARY KEY,
+    username      TEXT NOT NULL,
+    mfa_verified  INTEGER NOT NULL,
+    created_at    REAL NOT NULL,
+    last_seen     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_auth_sessions_username ON auth_sessions (username);
+"""
+
+# 会话超过该时间（秒）未使用即失效
+SESSION_LIFETIME = config.get('security.session_lifetime', 7 * 24 * 3600)
+# last_seen 的最小更新间隔（秒），避免每个请求都写库
+SESSION_TOUCH_INTERVAL = 60
+
+
+class AuthStateStore:
+    """基于SQLite的登录状态存储"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程一个连接，首次使用时才打开，避免在 fork 之前打开数据库"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and getattr(self._local, 'pid', None) == os.getpid():
+            return conn
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        with self._init_lock:
+            if not self._initialized:
+                conn.executescript(SCHEMA)
+                self._initialized = True
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            yield conn
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def locked_until(self, username: str) -> Optional[float]:
+        """账户处于锁定中时返回解锁时间戳，否则返回None"""
+        row = self._connect().execute(
+            'SELECT locked_until FROM login_state WHERE username = ?', (username,)
+        ).fetchone()
+        if row and row[0] and row[0] > time.time():
+            return row[0]
+        return None
+
+    def record_failure(self, username: str, max_attempts: int, lockout_duration: float) -> int:
+        """
+        记录一次登录失败，达到 max_attempts 次时锁定账户
+
+        Returns:
+            当前连续失败次数
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                'SELECT failed_attempts, locked_until FROM login_state WHERE username = ?', (username,)
+            ).fetchone()
+            attempts, locked_until = row if row else (0, None)
+            # 上一次锁定已过期，重新计数
+            if locked_until and locked_until <= now:
+                attempts, locked_until = 0, None
+            attempts += 1
+            if attempts >= max_attempts:
+                locked_until = now + lockout_duration
+            conn.execute(
+                'INSERT OR REPLACE INTO login_state (username, failed_attempts, locked_until) VALUES (?, ?, ?)',
+                (username, attempts, locked_until)
+            )
+        if attempts >= max_attempts:
+            logging.warning(f"用户 {username} 连续登录失败 {attempts} 次，锁定 {lockout_duration} 秒")
+        return attempts
+
+    def reset_failures(self, username: str) -> None:
+        self._connect().execute('DELETE FROM login_state WHERE username = ?', (username,))
+
+    def create_session(self, username: str, mfa_verified: bool) -> str:
+        """创建登录会话并返回会话ID，同时清理已过期的会话"""
+        session_id = secrets.token_urlsafe(32)
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM auth_sessions WHERE last_seen < ?', (now - SESSION_LIFETIME,))
+            conn.execute(
+                'INSERT INTO auth_sessions (session_id, username, mfa_verified, created_at, last_seen) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (session_id, username, int(mfa_verified), now, now)
+            )
+        return session_id
+
+    def get_session(self, session_id: str) -> Optional[Tuple[str, bool]]:
+        """
+        返回有效会话的 (用户名, MFA是否已验证)，会话不存在或已过期时返回None
+        """
+        conn = self._connect()
+        row = conn.execute(
+            'SELECT username, mfa_verified, last_seen FROM auth_sessions WHERE session_id = ?', (session_id,)
+        ).fetchone()
+        if not row:
+            return None
+        username, mfa_verified, last_seen = row
+        now = time.time()
+        if last_seen < now - SESSION_LIFETIME:
+            return None
+        if now - last_seen > SESSION_TOUCH_INTERVAL:
+            conn.execute('UPDATE auth_sessions SET last_seen = ? WHERE session_id = ?', (now, session_id))
+        return username, bool(mfa_verified)
+
+    def delete_session(self, session_id: str) -> None:
+        self._connect().execute('DELETE FROM auth_sessions WHERE session_id = ?', (session_id,))
+
+
+# 全局登录状态仓库
+auth_store = AuthStateStore(config.get(
+    'security.state_store_path',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'auth.db')
+))
@@ -1,7 +1,11 @@
-import oci
+from __future__ import annotations
 import logging
 from typing import Dict, Any, List, Optional, Tuple
 from app.services.tenant_service import TenantService
+from app.utils.concurrency import FANOUT_TIMEOUT, bounded_map, run_parallel
+from app.utils.invalidation import instance_key, publishes, volume_key
+from app.utils.lazy_import import oci
+from app.utils.pagination import list_all
 # from app import db
 
 class BlockVolumeService:
@@ -35,18 +39,18 @@ class BlockVolumeService:
                 raise ValueError("租户配置中缺少compartment_id")
             
             # 获取实例的所有附件（包括已分离的）
-            attachments = compute_client.list_volume_attachments(
+            attachments = list_all(
+                compute_client.list_volume_attachments,
                 compartment_id=compartment_id,
                 instance_id=instance_id
-            ).data
+            )
             
-            volumes = []
-            for attachment in attachments:
+            def fetch_volume(attachment):
                 try:
                     if attachment.lifecycle_state != "ATTACHED":
                         # 如果附件的状态不是ATTACHED，跳过
                         logging.info(f"卷附件 {attachment.id} 状态为 {attachment.lifecycle_state}，跳过获取卷详情")
-                        continue
+                        return None
                     volume_info = None
                     if attachment.volume_id.startswith('ocid1.bootvolume.'):
                         # 如果是引导卷
@@ -55,7 +59,7 @@ class BlockVolumeService:
                         # 如果是块存储卷
                         volume_info = block_volume_client.get_volume(volume_id=attachment.volume_id).data
                     
-                    volumes.append({
+                    return {
                         "id": volume_info.id,
                         "display_name": volume_info.display_name,
                         "size_in_gbs": volume_info.size_in_gbs,
@@ -64,10 +68,13 @@ class BlockVolumeService:
                         "attachment_id": attachment.id,
                         "attachment_type": attachment.attachment_type,
                         "time_created": attachment.time_created.strftime("%Y-%m-%d %H:%M:%S")
-                    })
+                    }
                 except Exception as e:
                     logging.error(f"获取卷详情失败: {str(e)}")
-                    continue
+                    return None
+            
+            # 并发获取每个附件的卷详情
+            volumes = [volume for volume in bounded_map(fetch_volume, attachments, timeout=FANOUT_TIMEOUT) if volume]
             
             logging.info(f"找到 {len(volumes)} 个卷")
             return volumes
@@ -76,6 +83,7 @@ class BlockVolumeService:
             logging.error(f"获取卷列表失败: {str(e)}")
             raise
             
+    @publishes(lambda args: volume_key(args['tenant_id']))
     def detach_volume(self, tenant_id: str, attachment_id: str) -> Dict[str, str]:
         """分离块存储卷"""
         try:
@@ -89,6 +97,8 @@ class BlockVolumeService:
             logging.error(f"分离块存储卷失败: {str(e)}")
             raise
             
+    @publishes(lambda args: [volume_key(args['tenant_id'], args['volume_id']),
+                             instance_key(args['tenant_id'], args['instance_id'])])
     def attach_volume(self, tenant_id: str, instance_id: str, volume_id: str) -> Dict[str, Any]:
         """附加块存储卷到实例"""
         try:
@@ -117,6 +127,7 @@ class BlockVolumeService:
             logging.error(f"附加块存储卷失败: {str(e)}")
             raise
             
+    @publishes(lambda args: volume_key(args['tenant_id'], args['volume_id']))
     def update_volume(self, tenant_id: str, volume_id: str, vpus_per_gb: int) -> Dict[str, Any]:
         """更新块存储卷或引导卷的性能"""
         try:
@@ -184,23 +195,25 @@ class BlockVolumeService:
             if not compartment_id:
                 raise ValueError("租户配置中缺少compartment_id")
             
-            # 获取可用的块存储卷
-            block_volumes = block_volume_client.list_volumes(
-                compartment_id=compartment_id,
-                availability_domain=availability_domain
-            ).data
-            
-            # 获取可用的引导卷
-            boot_volumes = boot_volume_client.list_boot_volumes(
-                compartment_id=compartment_id,
-                availability_domain=availability_domain
-            ).data
-            
-            # 获取所有引导卷附件
-            boot_attachments = compute_client.list_boot_volume_attachments(
-                compartment_id=compartment_id,
-                availability_domain=availability_domain
-            ).data
+            # 并发获取块存储卷、引导卷和引导卷附件
+            block_volumes, boot_volumes, boot_attachments = run_parallel(
+                lambda: list_all(
+                    block_volume_client.list_volumes,
+                    compartment_id=compartment_id,
+                    availability_domain=availability_domain
+                ),
+                lambda: list_all(
+                    boot_volume_client.list_boot_volumes,
+                    compartment_id=compartment_id,
+                    availability_domain=availability_domain
+                ),
+                lambda: list_all(
+                    compute_client.list_boot_volume_attachments,
+                    compartment_id=compartment_id,
+                    availability_domain=availability_domain
+                ),
+                timeout=FANOUT_TIMEOUT
+            )
             
             # 创建已附加引导卷ID集合
             attached_boot_volume_ids = {attachment.boot_volume_id for attachment in boot_attachments
@@ -1,7 +1,11 @@
-import oci
+from __future__ import annotations
 import logging
 from typing import Dict, Any, List, Optional, Tuple
 from app.services.tenant_service import TenantService
+from app.utils.concurrency import FANOUT_TIMEOUT, bounded_map
+from app.utils.invalidation import instance_key, limits_key, publishes, volume_key
+from app.utils.lazy_import import oci
+from app.utils.pagination import list_all
 # from app import db
 
 class BootVolumeService:
@@ -32,11 +36,12 @@ class BootVolumeService:
             
             logging.info(f"获取实例 {instance_id} 的引导卷附件列表")
             # 获取实例的引导卷附件
-            boot_attachments = compute_client.list_boot_volume_attachments(
+            boot_attachments = list_all(
+                compute_client.list_boot_volume_attachments,
                 availability_domain=availability_domain,
                 compartment_id=compartment_id,
                 instance_id=instance_id
-            ).data
+            )
             
             logging.info(f"找到 {len(boot_attachments)} 个引导卷附件")
             
@@ -90,6 +95,7 @@ class BootVolumeService:
             logging.error(f"获取已附加引导卷列表失败: {str(e)}")
             raise
             
+    @publishes(lambda args: volume_key(args['tenant_id']))
     def detach_volume(self, tenant_id: str, attachment_id: str) -> Dict[str, str]:
         """分离引导卷"""
         try:
@@ -131,6 +137,8 @@ class BootVolumeService:
             logging.error(f"分离引导卷失败: {str(e)}")
             raise
             
+    @publishes(lambda args: [volume_key(args['tenant_id'], args['volume_id']),
+                             instance_key(args['tenant_id'], args['instance_id'])])
     def attach_volume(self, tenant_id: str, instance_id: str, volume_id: str) -> Dict[str, str]:
         """附加引导卷到实例"""
         try:
@@ -163,12 +171,13 @@ class BootVolumeService:
                 logging.error(f"附加引导卷时发生错误: {str(e)}")
                 if "NotAuthorizedOrNotFound" in str(e):
                     # 检查是否已经附加
-                    attachments = compute_client.list_boot_volume_attachments(
+                    attachments = list_all(
+                        compute_client.list_boot_volume_attachments,
                         availability_domain=instance.availability_domain,
                         compartment_id=instance.compartment_id,
                         instance_id=instance_id,
                         boot_volume_id=volume_id
-                    ).data
+                    )
                     
                     if attachments:
                         attachment = attachments[0]
@@ -183,6 +192,7 @@ class BootVolumeService:
             logging.error(f"附加引导卷失败: {str(e)}")
             raise
             
+    @publishes(lambda args: [volume_key(args['tenant_id'], args['boot_volume_id']), limits_key(args['tenant_id'])])
     def update_volume(self, tenant_id: str, boot_volume_id: str, size_in_gbs: Optional[int] = None, 
                      vpus_per_gb: Optional[int] = None) -> Dict[str, str]:
         """更新引导卷配置（大小只能增加不能减少）"""
@@ -230,10 +240,11 @@ class BootVolumeService:
             
             # 获取可用的引导卷
             try:
-                volumes = boot_volume_client.list_boot_volumes(
+                volumes = list_all(
+                    boot_volume_client.list_boot_volumes,
                     availability_domain=availability_domain,
                     compartment_id=compartment_id
-                ).data
+                )
                 
                 return [{
                     "id": volume.id,
@@ -247,32 +258,31 @@ class BootVolumeService:
                 # 检查是否是权限或资源不存在的错误
                 if "NotAuthorizedOrNotFound" in str(e):
                     # 尝试获取实例的引导卷附件
-                    boot_attachments = compute_client.list_boot_volume_attachments(
+                    boot_attachments = list_all(
+                        compute_client.list_boot_volume_attachments,
                         availability_domain=availability_domain,
                         compartment_id=compartment_id
-                    ).data
+                    )
                     
                     # 获取所有引导卷的ID
                     volume_ids = [attachment.boot_volume_id for attachment in boot_attachments]
                     
-                    # 获取每个引导卷的详细信息
-                    volumes = []
-                    for volume_id in volume_ids:
+                    # 并发获取每个引导卷的详细信息
+                    def fetch_volume(volume_id):
                         try:
-                            volume = boot_volume_client.get_boot_volume(boot_volume_id=volume_id).data
-                            if volume.lifecycle_state == "AVAILABLE":
-                                volumes.append({
-                                    "id": volume.id,
-                                    "display_name": volume.display_name,
-                                    "size_in_gbs": volume.size_in_gbs,
-                                    "vpus_per_gb": volume.vpus_per_gb,
-                                    "lifecycle_state": volume.lifecycle_state
-                                })
+                            return boot_volume_client.get_boot_volume(boot_volume_id=volume_id).data
                         except Exception as ve:
                             logging.error(f"获取引导卷 {volume_id} 详情失败: {str(ve)}")
-                            continue
+                            return None
                     
-                    return volumes
+                    return [{
+                        "id": volume.id,
+                        "display_name": volume.display_name,
+                        "size_in_gbs": volume.size_in_gbs,
+                        "vpus_per_gb": volume.vpus_per_gb,
+                        "lifecycle_state": volume.lifecycle_state
+                    } for volume in bounded_map(fetch_volume, volume_ids, timeout=FANOUT_TIMEOUT)
+                        if volume and volume.lifecycle_state == "AVAILABLE"]
                 raise
         except Exception as e:
             logging.error(f"获取可用引导卷列表失败: {str(e)}")
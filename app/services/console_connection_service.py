@@ -1,5 +1,6 @@
-import oci
 from app.services.tenant_service import TenantService
+from app.utils.lazy_import import oci
+from app.utils.pagination import list_all
 import logging
 from typing import Dict, Any
 
@@ -88,10 +89,11 @@ class ConsoleConnectionService:
 
             # 先获取现有的连接
             try:
-                connections = compute_client.list_instance_console_connections(
+                connections = list_all(
+                    compute_client.list_instance_console_connections,
                     compartment_id=compartment_id,
                     instance_id=instance_id
-                ).data
+                )
 
                 # 查找活动的连接
                 active_connection = next(
@@ -146,10 +148,11 @@ class ConsoleConnectionService:
                     return None
 
                 logging.info(f"Listing console connections for instance {instance_id} in compartment {compartment_id}")
-                connections = compute_client.list_instance_console_connections(
+                connections = list_all(
+                    compute_client.list_instance_console_connections,
                     compartment_id=compartment_id,
                     instance_id=instance_id
-                ).data
+                )
 
                 print(f"Found {len(connections)} console connections")
                 for conn in connections:
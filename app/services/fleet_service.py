@@ -0,0 +1,232 @@
+"""跨租户资源总览服务
+
+同时向 tenants.yml 中的所有租户发起查询，把实例、引导卷和配额余量合并成一张表。
+实例和引导卷读取本地资源清单（见 inventory_service），清单新鲜时不调用OCI；
+每个租户在独立线程中查询，总耗时接近最慢的租户；
+单个租户失败或超时只影响该租户，其余租户的结果照常返回。
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config.config import config
+from config.tenant_registry import tenant_registry
+from app.services.inventory_service import KIND_BOOT_VOLUMES, KIND_INSTANCES, inventory_service
+from app.services.quota_service import QuotaService
+from app.services.tenant_service import TenantService
+from app.utils.concurrency import run_parallel
+from app.utils.pagination import list_all
+from app.utils.profiler import propagate, traced
+
+# 同时查询的租户数上限
+FLEET_MAX_WORKERS = config.get('fleet.max_workers', 16)
+# 单次总览等待租户返回的最长时间（秒），超时的租户标记为 timeout
+FLEET_TIMEOUT = config.get('fleet.timeout', 30)
+
+STATUS_OK = 'ok'
+STATUS_PARTIAL = 'partial'
+STATUS_ERROR = 'error'
+STATUS_TIMEOUT = 'timeout'
+
+
+class FleetService:
+    def __init__(self):
+        self.tenant_service = TenantService()
+        self.quota_service = QuotaService()
+
+    @traced()
+    def list_boot_volumes(self, tenant_id: str) -> List[Dict[str, Any]]:
+        """获取租户下的全部引导卷，附带所挂载的实例ID"""
+        tenant = self.tenant_service.get_tenant_by_id(tenant_id)
+        if not tenant:
+            raise ValueError("租户不存在")
+        compartment_id = tenant['compartment_id'] or tenant['tenancy']
+
+        compute_client = self.tenant_service.get_oci_client(tenant_id, service="compute")
+        block_client = self.tenant_service.get_oci_client(tenant_id, service="block_storage")
+        if not compute_client or not block_client:
+            raise ValueError("无法创建OCI客户端")
+
+        def list_attachments():
+            # 引导卷附件只能按可用性域列出
+            attachments = []
+            for domain in self.quota_service.get_availability_domains(tenant_id):
+                attachments.extend(list_all(
+                    compute_client.list_boot_volume_attachments,
+                    availability_domain=domain['name'],
+                    compartment_id=compartment_id
+                ))
+            return attachments
+
+        volumes, attachments = run_parallel(
+            lambda: list_all(
+                block_client.list_boot_volumes,
+                compartment_id=compartment_id
+            ),
+            list_attachments
+        )
+
+        instance_by_volume = {
+            attachment.boot_volume_id: attachment.instance_id
+            for attachment in attachments
+            if attachment.lifecycle_state in ('ATTACHING', 'ATTACHED')
+        }
+        return [{
+            'id': volume.id,
+            'display_name': volume.display_name,
+            'availability_domain': volume.availability_domain,
+            'size_in_gbs': volume.size_in_gbs,
+            'vpus_per_gb': volume.vpus_per_gb,
+            'lifecycle_state': volume.lifecycle_state,
+            'instance_id': instance_by_volume.get(volume.id)
+        } for volume in volumes if volume.lifecycle_state != 'TERMINATED']
+
+    @staticmethod
+    def _capture(name: str, func: Callable[[], Any]) -> Tuple[Any, Optional[str]]:
+        """执行单项查询，失败时返回 (None, 错误信息)"""
+        try:
+            return func(), None
+        except Exception as e:
+            logging.error(f"总览查询 {name} 失败: {str(e)}")
+            return None, str(e)
+
+    @traced()
+    def collect_tenant(self, tenant_id: str, force: bool = False) -> Dict[str, Any]:
+        """
+        并发查询单个租户的实例、引导卷和配额余量，某一项失败时保留其余项
+
+        force 为 True 时实例和引导卷先重新同步资源清单
+        """
+        started = time.time()
+        (inventory_instances, instance_error), (inventory_volumes, volume_error), (headroom, headroom_error) = \
+            run_parallel(
+                lambda: self._capture(f"{tenant_id}/实例",
+                                      lambda: inventory_service.get(tenant_id, KIND_INSTANCES, force=force)),
+                lambda: self._capture(f"{tenant_id}/引导卷",
+                                      lambda: inventory_service.get(tenant_id, KIND_BOOT_VOLUMES, force=force)),
+                lambda: self._capture(f"{tenant_id}/配额余量", lambda: self.quota_service.get_headroom(tenant_id))
+            )
+        instances, instance_meta = inventory_instances or (None, None)
+        volumes, volume_meta = inventory_volumes or (None, None)
+        metas = [meta for meta in (instance_meta, volume_meta) if meta]
+
+        errors = {name: error for name, error in (
+            ('instances', instance_error),
+            ('boot_volumes', volume_error),
+            ('headroom', headroom_error)
+        ) if error}
+        if not errors:
+            status = STATUS_OK
+        elif len(errors) == 3:
+            status = STATUS_ERROR
+        else:
+            status = STATUS_PARTIAL
+
+        return {
+            'status': status,
+            'errors': errors,
+            'elapsed': round(time.time() - started, 3),
+            'instances': [i for i in instances or [] if i['lifecycle_state'] != 'TERMINATED'],
+            'boot_volumes': volumes or [],
+            'headroom': (headroom or {}).get('headroom', []),
+            # 取较旧的一项作为该租户数据的同步时间
+            'last_refreshed': min((meta['last_refreshed'] for meta in metas), default=None),
+            'stale': any(meta['stale'] for meta in metas)
+        }
+
+    def get_overview(self, timeout: Optional[float] = None, force: bool = False) -> Dict[str, Any]:
+        """
+        获取所有租户的资源总览
+
+        Args:
+            timeout: 等待租户返回的最长时间（秒），默认取 fleet.timeout
+            force: 先重新同步所有租户的资源清单
+
+        Returns:
+            tenants: 每个租户的状态、耗时和汇总；
+            instances: 合并后的实例表，每行附带租户信息和引导卷
+        """
+        timeout = FLEET_TIMEOUT if timeout is None else timeout
+        tenants = tenant_registry.items()
+        started = time.time()
+        if not tenants:
+            return {'tenants': [], 'instances': [], 'elapsed': 0}
+
+        # 每次总览使用独立的线程池，超时的租户不会阻塞下一次请求
+        executor = ThreadPoolExecutor(max_workers=max(1, min(FLEET_MAX_WORKERS, len(tenants))),
+                                      thread_name_prefix='fleet')
+        try:
+            collect = propagate(self.collect_tenant)
+            futures = {tenant_id: executor.submit(collect, tenant_id, force) for tenant_id, _ in tenants}
+            wait(futures.values(), timeout=timeout)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        summaries, rows = [], []
+        for tenant_id, tenant in tenants:
+            future = futures[tenant_id]
+            if not future.done():
+                logging.warning(f"租户 {tenant.get('name')} 的总览查询超时（{timeout}秒）")
+                result = {'status': STATUS_TIMEOUT, 'errors': {'tenant': f"查询超时（{timeout}秒）"},
+                          'elapsed': None, 'instances': [], 'boot_volumes': [], 'headroom': [],
+                          'last_refreshed': None, 'stale': False}
+            else:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logging.error(f"租户 {tenant.get('name')} 的总览查询失败: {str(e)}")
+                    result = {'status': STATUS_ERROR, 'errors': {'tenant': str(e)},
+                              'elapsed': None, 'instances': [], 'boot_volumes': [], 'headroom': [],
+                              'last_refreshed': None, 'stale': False}
+
+            tenant_info = {
+                'tenant_id': tenant_id,
+                'tenant_name': tenant.get('name'),
+                'region': tenant.get('region')
+            }
+            summaries.append(self._summarize(tenant_info, result))
+            rows.extend(self._merge_rows(tenant_info, result))
+
+        return {
+            'tenants': summaries,
+            'instances': rows,
+            'elapsed': round(time.time() - started, 3)
+        }
+
+    @staticmethod
+    def _summarize(tenant_info: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+        instances = result['instances']
+        volumes = result['boot_volumes']
+        return dict(
+            tenant_info,
+            status=result['status'],
+            errors=result['errors'],
+            elapsed=result['elapsed'],
+            instance_count=len(instances),
+            running_count=sum(1 for i in instances if i['lifecycle_state'] == 'RUNNING'),
+            ocpu_count=sum(i['ocpu_count'] or 0 for i in instances),
+            memory_in_gbs=sum(i['memory_in_gbs'] or 0 for i in instances),
+            boot_volume_count=len(volumes),
+            boot_volume_gbs=sum(v['size_in_gbs'] or 0 for v in volumes),
+            unattached_boot_volume_count=sum(1 for v in volumes if not v['instance_id']),
+            headroom=result['headroom'],
+            last_refreshed=result['last_refreshed'],
+            stale=result['stale']
+        )
+
+    @staticmethod
+    def _merge_rows(tenant_info: Dict[str, Any], result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """把引导卷按实例ID并入实例行"""
+        volume_by_instance = {v['instance_id']: v for v in result['boot_volumes'] if v['instance_id']}
+        rows = []
+        for instance in result['instances']:
+            volume = volume_by_instance.get(instance['id'])
+            rows.append(dict(
+                tenant_info,
+                **instance,
+                boot_volume_id=volume['id'] if volume else None,
+                boot_volume_gbs=volume['size_in_gbs'] if volume else None,
+                boot_volume_vpus=volume['vpus_per_gb'] if volume else None
+            ))
+        return rows
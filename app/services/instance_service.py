@@ -1,13 +1,68 @@
-import oci
+from __future__ import annotations
 import logging
 import random
 import string
 import base64
-import time
-from typing import Dict, Any, List, Optional, Tuple
+import copy
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 
-from oci.util import back_up_body_calculate_stream_content_length
+from config.config import config
+from config.tenant_registry import tenant_registry
+from app.utils.lazy_import import oci
 from app.services.tenant_service import TenantService
+from app.services.ip_rotation_service import ip_rotation
+from app.services.job_service import job_manager
+from app.services.resource_catalog_service import resource_catalog
+from app.utils.cache import SnapshotCache
+from app.utils.concurrency import bounded_map
+from app.utils.invalidation import INSTANCE, ResourceKey, instance_key, invalidation_bus, limits_key, publishes
+from app.utils.pagination import iter_pages, list_all
+from app.utils.profiler import propagate, traced
+from app.utils.singleflight import coalesced
+from app.utils.waiter import WaitTimeoutError, wait_for_state
+
+# 批量获取VNIC详情时的最大并发数
+VNIC_FETCH_WORKERS = 8
+
+# 后台任务等待资源状态时的初始轮询间隔和间隔上限（秒）
+JOB_POLL_INTERVAL = config.get('jobs.poll_interval', 1)
+JOB_MAX_POLL_INTERVAL = config.get('jobs.max_poll_interval', 8)
+
+# 实例列表按 (租户ID, 是否附带VNIC) 缓存，实例详情按 (租户ID, 实例ID) 缓存；
+# 本应用的变更操作通过失效总线立即清除相关条目，OCI侧的其他变化在 ttl 后刷新
+INSTANCE_CACHE_TTL = config.get('instances.cache_ttl', 30)
+instance_list_snapshots = SnapshotCache('instances', ttl=INSTANCE_CACHE_TTL, max_stale=INSTANCE_CACHE_TTL)
+instance_snapshots = SnapshotCache('instance', ttl=INSTANCE_CACHE_TTL, max_stale=INSTANCE_CACHE_TTL)
+
+for _cache in (instance_list_snapshots, instance_snapshots):
+    tenant_registry.add_listener(_cache.clear)
+
+
+def _evict_instances(keys: List[ResourceKey]) -> None:
+    """清除变化实例的详情和所在租户的实例列表，之后的读取不再合并到变更前开始的调用"""
+    for key in keys:
+        if key.kind != INSTANCE:
+            continue
+        instance_list_snapshots.invalidate(predicate=lambda k, tenant_id=key.tenant_id: k[0] == tenant_id)
+        if key.resource_id:
+            instance_snapshots.invalidate((key.tenant_id, key.resource_id))
+        else:
+            instance_snapshots.invalidate(predicate=lambda k, tenant_id=key.tenant_id: k[0] == tenant_id)
+        for method in (InstanceService.list_instances, InstanceService.get_instance, InstanceService.list_vnics):
+            method.flight.forget(predicate=lambda k, key=key: _flight_matches(k, key))
+
+
+def _flight_matches(flight_key, key: ResourceKey) -> bool:
+    """合并调用的参数是否属于变化的租户（和实例）"""
+    args = dict(flight_key)
+    if str(args.get('tenant_id')) != key.tenant_id:
+        return False
+    return not key.resource_id or args.get('instance_id', key.resource_id) == key.resource_id
+
+
+invalidation_bus.subscribe(_evict_instances)
+
 
 class InstanceService:
     def __init__(self):
@@ -25,47 +80,17 @@ class InstanceService:
 
     def _get_compute_client(self, tenant_id):
         """获取计算客户端"""
-        tenant = self.tenant_service.get_tenant_by_id(tenant_id)
-        if not tenant:
-            raise ValueError("租户不存在")
-        
-        config = {
-            "user": tenant['user_ocid'],
-            "key_file": tenant['key_file'],
-            "fingerprint": tenant['fingerprint'],
-            "tenancy": tenant['tenancy'],
-            "region": tenant['region']
-        }
-        
-        return oci.core.ComputeClient(config)
+        compute_client = self.tenant_service.get_oci_client(tenant_id, service="compute")
+        if not compute_client:
+            raise Exception("无法创建计算客户端")
+        return compute_client
 
     def _get_network_client(self, tenant_id):
         """获取网络客户端"""
-        try:
-            tenant = self.tenant_service.get_tenant_by_id(tenant_id)
-            if not tenant:
-                raise Exception("租户不存在")
-        
-            # 从租户配置中读取私钥文件内容
-            try:
-                with open(tenant['key_file'], 'r') as f:
-                    private_key = f.read()
-            except Exception as e:
-                logging.error(f"读取私钥文件失败: {str(e)}", exc_info=True)
-                raise Exception(f"读取私钥文件失败: {str(e)}")
-        
-            config = {
-                "user": tenant['user_ocid'],
-                "key_content": private_key,
-                "fingerprint": tenant['fingerprint'],
-                "tenancy": tenant['tenancy'],
-                "region": tenant['region']
-            }
-        
-            return oci.core.VirtualNetworkClient(config)
-        except Exception as e:
-            logging.error(f"创建网络客户端失败: {str(e)}", exc_info=True)
-            raise
+        network_client = self.tenant_service.get_oci_client(tenant_id, service="network")
+        if not network_client:
+            raise Exception("无法创建网络客户端")
+        return network_client
 
     def _generate_random_password(self, length=12):
         """生成随机密码"""
@@ -76,10 +101,11 @@ class InstanceService:
     def get_instance_vnic_attachments(self, compute_client, network_client, compartment_id: str, instance_id: str) -> Tuple[Optional[str], Optional[str]]:
         """获取实例的网络接口信息"""
         try:
-            vnic_attachments = compute_client.list_vnic_attachments(
+            vnic_attachments = list_all(
+                compute_client.list_vnic_attachments,
                 compartment_id=compartment_id,
                 instance_id=instance_id
-            ).data
+            )
             
             if not vnic_attachments:
                 logging.warning(f"实例 {instance_id} 没有找到网络接口")
@@ -96,69 +122,112 @@ class InstanceService:
             logging.error(f"获取网络接口信息失败: {str(e)}")
             return None, None
     
-    def list_instances(self, tenant_id: str):
-        """获取租户下的所有实例列表"""
+    @traced()
+    @coalesced()
+    def list_instances(self, tenant_id: str, include_vnics: bool = False, force: bool = False):
+        """
+        获取租户下的所有实例列表
+        :param tenant_id: 租户ID
+        :param include_vnics: 是否在结果中附带每个实例的VNIC列表和IPv6地址
+        :param force: 忽略缓存重新查询，结果写回缓存
+        """
         try:
-            compute_client = self._get_compute_client(tenant_id)
-            
-            # 获取租户配置
-            tenant = self.tenant_service.get_tenant_by_id(tenant_id)
-            if not tenant:
-                raise Exception("租户不存在")
-            
-            # 如果compartment_id为空，则使用tenancy
-            compartment_id = tenant['compartment_id'] or tenant['tenancy']
-            
-            # 获取实例列表
-            instances = compute_client.list_instances(compartment_id=compartment_id).data
-            
-            result = []
-            for instance in instances:
-                try:
-                    # 创建基本的实例信息
-                    instance_data = {
-                        'id': instance.id,
-                        'display_name': instance.display_name,
-                        'lifecycle_state': instance.lifecycle_state,
-                        'availability_domain': instance.availability_domain,
-                        'shape': instance.shape,
-                        'time_created': instance.time_created,
-                        'public_ip': None,
-                        'private_ip': None,
-                        'ocpu_count': None,
-                        'memory_in_gbs': None
-                    }
-                    
-                    # 获取实例的shape配置
-                    if hasattr(instance, 'shape_config'):
-                        instance_data.update({
-                            'ocpu_count': instance.shape_config.ocpus,
-                            'memory_in_gbs': instance.shape_config.memory_in_gbs
-                        })
-                    
-                    # 只有在实例不是终止状态时才获取VNIC信息
-                    if instance.lifecycle_state not in ['TERMINATED', 'TERMINATING']:
-                        # 获取实例的VNIC列表
-                        vnics = self.list_vnics(tenant_id, instance.id)
-                        # 找到主VNIC
-                        primary_vnic = next((vnic for vnic in vnics if vnic['is_primary']), None)
-                        if primary_vnic:
-                            instance_data.update({
-                                'public_ip': primary_vnic['public_ip'],
-                                'private_ip': primary_vnic['private_ip']
-                            })
-                    
-                    result.append(instance_data)
-                except Exception as e:
-                    logging.error(f"处理实例 {instance.id} 时出错: {str(e)}", exc_info=True)
-                    # 即使处理单个实例出错，也继续处理其他实例
-                    continue
-            
-            return result
+            instances, _ = instance_list_snapshots.get(
+                (str(tenant_id), include_vnics),
+                lambda: list(self.iter_instances(tenant_id, include_vnics)),
+                force=force
+            )
+            return copy.deepcopy(instances)
         except Exception as e:
             logging.error(f"获取实例列表失败: {str(e)}", exc_info=True)
             raise
 
+    def iter_instances(self, tenant_id: str, include_vnics: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        按页产出租户下的实例，拿到第一页实例及其VNIC后即开始产出，适合流式返回
+        :param tenant_id: 租户ID
+        :param include_vnics: 是否在结果中附带每个实例的VNIC列表和IPv6地址
+        """
+        compute_client = self._get_compute_client(tenant_id)
+        
+        # 获取租户配置
+        tenant = self.tenant_service.get_tenant_by_id(tenant_id)
+        if not tenant:
+            raise Exception("租户不存在")
+        
+        # 如果compartment_id为空，则使用tenancy
+        compartment_id = tenant['compartment_id'] or tenant['tenancy']
+        
+        # 整个区间的VNIC附件列表与第一页实例并发获取
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='vnic-attachments')
+        try:
+            attachments_future = executor.submit(propagate(lambda: list_all(
+                compute_client.list_vnic_attachments,
+                compartment_id=compartment_id
+            )))
+            
+            # 处理当前页时已在后台请求下一页
+            for instances in iter_pages(compute_client.list_instances, compartment_id=compartment_id, prefetch=True):
+                # 只为非终止状态的实例并发获取VNIC详情
+                active_ids = {
+                    instance.id for instance in instances
+                    if instance.lifecycle_state not in ['TERMINATED', 'TERMINATING']
+                }
+                vnics_by_instance = self._resolve_vnics(
+                    tenant_id,
+                    [a for a in attachments_future.result() if a.instance_id in active_ids]
+                ) if active_ids else {}
+                
+                for instance in instances:
+                    try:
+                        yield self._format_instance(instance, vnics_by_instance.get(instance.id, []), include_vnics)
+                    except Exception as e:
+                        logging.error(f"处理实例 {instance.id} 时出错: {str(e)}", exc_info=True)
+                        # 即使处理单个实例出错，也继续处理其他实例
+                        continue
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _format_instance(self, instance, vnics: List[Dict[str, Any]], include_vnics: bool) -> Dict[str, Any]:
+        """组装实例列表中的一行"""
+        # 创建基本的实例信息
+        instance_data = {
+            'id': instance.id,
+            'display_name': instance.display_name,
+            'lifecycle_state': instance.lifecycle_state,
+            'availability_domain': instance.availability_domain,
+            'shape': instance.shape,
+            'time_created': instance.time_created,
+            'public_ip': None,
+            'private_ip': None,
+            'ocpu_count': None,
+            'memory_in_gbs': None
+        }
+        
+        # 获取实例的shape配置
+        if hasattr(instance, 'shape_config'):
+            instance_data.update({
+                'ocpu_count': instance.shape_config.ocpus,
+                'memory_in_gbs': instance.shape_config.memory_in_gbs
+            })
+        
+        # 找到主VNIC
+        primary_vnic = next((vnic for vnic in vnics if vnic['is_primary']), None)
+        if primary_vnic:
+            instance_data.update({
+                'public_ip': primary_vnic['public_ip'],
+                'private_ip': primary_vnic['private_ip']
+            })
+        
+        if include_vnics:
+            instance_data.update({
+                'ipv6_addresses': [vnic['ipv6_addresses'] for vnic in vnics if vnic['ipv6_addresses']],
+                'vnics': vnics
+            })
+        return instance_data
+
+    @publishes(lambda args: instance_key(args['tenant_id'], args['instance_id']),
+               lambda args: limits_key(args['tenant_id']) if args['action'] == 'terminate' else None)
     def instance_action(self, tenant_id: str, instance_id: str, action: str) -> bool:
         """执行实例操作"""
         try:
@@ -180,14 +249,13 @@ class InstanceService:
             try:
                 if action == 'terminate':
                     action_map[action](instance_id, preserve_boot_volume=False)
+                    # 终止接口不返回实例，读取一次当前状态
+                    instance = compute_client.get_instance(instance_id).data
                 else:
-                    action_map[action](instance_id, action=action.upper())
-                
-                # 等待操作开始执行
-                time.sleep(2)
+                    # 实例操作接口直接返回操作后的实例，无需等待后再查询
+                    instance = action_map[action](instance_id, action=action.upper()).data
                 
                 # 检查操作是否成功启动
-                instance = compute_client.get_instance(instance_id).data
                 expected_states = {
                     'start': ['STARTING', 'RUNNING'],
                     'stop': ['STOPPING', 'STOPPED'],
@@ -215,8 +283,18 @@ class InstanceService:
     def restart_instance(self, tenant_id: str, instance_id: str) -> bool:
         return self.instance_action(tenant_id, instance_id, 'reset')
     
-    def get_instance(self, tenant_id, instance_id):
-        """获取实例详情"""
+    @traced()
+    @coalesced()
+    def get_instance(self, tenant_id, instance_id, force=False):
+        """获取实例详情（快照缓存，force 为 True 时重新查询）"""
+        instance, _ = instance_snapshots.get(
+            (str(tenant_id), instance_id),
+            lambda: self._load_instance(tenant_id, instance_id),
+            force=force
+        )
+        return copy.deepcopy(instance)
+
+    def _load_instance(self, tenant_id, instance_id):
         try:
             compute_client = self._get_compute_client(tenant_id)
             instance = compute_client.get_instance(instance_id).data
@@ -249,219 +327,19 @@ class InstanceService:
             raise
 
     def change_public_ip(self, tenant_id: str, instance_id: str) -> Optional[Dict[str, Any]]:
-        """更换实例的公共IP地址"""
+        """更换实例的公共IP地址（同步执行，见 ip_rotation_service），返回更新后的实例信息"""
         try:
-            tenant = self.tenant_service.get_tenant_by_id(tenant_id)
-            if not tenant:
-                raise Exception(f"找不到租户: {tenant_id}")
-            
-            compute_client, network_client = self._get_clients(tenant_id)
-            if not compute_client or not network_client:
-                raise Exception("无法创建OCI客户端")
-
-            # 获取实例的VNIC附件
-            vnic_attachments = compute_client.list_vnic_attachments(
-                instance_id=instance_id,
-                compartment_id=tenant['compartment_id'] or tenant['tenancy']
-            ).data
-
-            if not vnic_attachments:
-                raise Exception(f"找不到实例的网络接口: {instance_id}")
-            # 筛查主要VNIC
-            for i in vnic_attachments:
-                if i.lifecycle_state != 'ATTACHED':
-                    continue
-                else:
-                    if network_client.get_vnic(i.vnic_id).data.is_primary:
-                        primary_vnic = network_client.get_vnic(i.vnic_id).data
-                        break
-            # 获取主VNIC
-           
-
-            # 如果已有公共IP，先释放它
-            if primary_vnic.public_ip:
-                try:
-                    # 获取公共IP对象
-                    public_ip = network_client.get_public_ip_by_ip_address(
-                        get_public_ip_by_ip_address_details=oci.core.models.GetPublicIpByIpAddressDetails(
-                            ip_address=primary_vnic.public_ip
-                        )
-                    ).data
-
-                    # 释放公共IP
-                    if public_ip.lifecycle_state != 'TERMINATED':
-                        network_client.delete_public_ip(public_ip.id)
-                        
-                        # 等待旧IP完全释放
-                        try:
-                            oci.wait_until(
-                                network_client,
-                                network_client.get_public_ip(public_ip.id),
-                                'lifecycle_state',
-                                'TERMINATED',
-                                max_wait_seconds=300,
-                                succeed_on_not_found=True
-                            )
-                        except oci.exceptions.ServiceError as e:
-                            if e.status != 404:  # 404是预期的，表示IP已被释放
-                                raise
-                except Exception as e:
-                    logging.error(f"释放旧公共IP时出错: {str(e)}")
-                    raise Exception(f"释放旧公共IP失败: {str(e)}")
-
-            # 获取私有IP对象
-            private_ips = network_client.list_private_ips(vnic_id=primary_vnic.id).data
-            if not private_ips:
-                raise Exception(f"找不到实例的私有IP: {instance_id}")
-            
-            private_ip = private_ips[0]  # 使用主私有IP
-
-            # 等待一段时间确保旧IP完全释放
-            time.sleep(10)
-
-            # 创建新的临时公共IP
-            public_ip_details = oci.core.models.CreatePublicIpDetails(
-                compartment_id=tenant['compartment_id'] or tenant['tenancy'],
-                lifetime='EPHEMERAL',
-                private_ip_id=private_ip.id
-            )
-            
-            # 分配新的公共IP
-            try:
-                new_public_ip = network_client.create_public_ip(
-                    create_public_ip_details=public_ip_details
-                ).data
-
-                # 等待公共IP变为可用状态
-                oci.wait_until(
-                    network_client,
-                    network_client.get_public_ip(new_public_ip.id),
-                    'lifecycle_state',
-                    'AVAILABLE',
-                    max_wait_seconds=300
-                )
-                
-                # 获取更新后的实例信息
-                instance = self.get_instance(tenant_id, instance_id)
-                return instance
-            except Exception as e:
-                logging.error(f"分配新公共IP时出错: {str(e)}")
-                raise Exception(f"分配新公共IP失败: {str(e)}")
-
+            ip_rotation.rotate(tenant_id, instance_id)
+            return self.get_instance(tenant_id, instance_id)
         except Exception as e:
             logging.error(f"更换公共IP失败: {str(e)}")
             raise
 
-    def get_resources(self, tenant_id):
-        """获取可用域、镜像和子网等资源"""
+    def get_resources(self, tenant_id, force=False):
+        """获取可用域、镜像和子网等资源（按类型缓存，见 resource_catalog_service）"""
         try:
-            tenant = self.tenant_service.get_tenant_by_id(tenant_id)
-            if not tenant:
-                raise Exception("租户不存在")
-        
-            compute_client = self._get_compute_client(tenant_id)
-            network_client = self._get_network_client(tenant_id)
-            identity_client = oci.identity.IdentityClient({
-                "user": tenant['user_ocid'],
-                "key_file": tenant['key_file'],
-                "fingerprint": tenant['fingerprint'],
-                "tenancy": tenant['tenancy'],
-                "region": tenant['region']
-            })
-        
-            # 获取可用域（在租户级别）
-            availability_domains = identity_client.list_availability_domains(
-                compartment_id=tenant['tenancy']
-            ).data
-            logging.debug(f"获取到可用域: {[ad.name for ad in availability_domains]}")
-        
-            # 获取系统镜像（Oracle Linux、CentOS、Ubuntu）
-            images = []
-            for os_name in ["Oracle Linux", "CentOS", "Canonical Ubuntu"]:
-                os_images = compute_client.list_images(
-                    compartment_id=tenant['compartment_id'],
-                    operating_system=os_name,
-                    sort_by="TIMECREATED",
-                    sort_order="DESC"
-                ).data
-                images.extend(os_images)
-            logging.debug(f"获取到系统镜像: {[image.display_name for image in images]}")
-        
-            # 获取所有VCN
-            try:
-                vcns = network_client.list_vcns(
-                    compartment_id=tenant['compartment_id']
-                ).data
-                logging.debug(f"获取到VCN: {[vcn.display_name for vcn in vcns]}")
-            
-                # 获取所有子网
-                subnets = []
-                for vcn in vcns:
-                    try:
-                        vcn_subnets = network_client.list_subnets(
-                            compartment_id=tenant['compartment_id'],
-                            vcn_id=vcn.id
-                        ).data
-                        logging.debug(f"VCN {vcn.display_name} 的子网: {[subnet.display_name for subnet in vcn_subnets]}")
-                    
-                        # 为每个子网添加VCN信息
-                        for subnet in vcn_subnets:
-                            subnet_info = {
-                                'id': subnet.id,
-                                'name': f"{vcn.display_name} - {subnet.display_name}",
-                                'cidr_block': f"{subnet.cidr_block}",
-                                'vcn_id': vcn.id,
-                                'vcn_name': vcn.display_name,
-                                'availability_domain': subnet.availability_domain
-                            }
-                            subnets.append(subnet_info)
-                    except Exception as e:
-                        logging.error(f"获取VCN {vcn.display_name} 的子网失败: {str(e)}", exc_info=True)
-                        continue
-            except Exception as e:
-                logging.error(f"获取VCN列表失败: {str(e)}", exc_info=True)
-                subnets = []  # 如果获取VCN失败，返回空的子网列表
-        
-            # 获取实例规格
-            shapes = compute_client.list_shapes(
-                compartment_id=tenant['compartment_id']
-            ).data
-            logging.debug(f"获取到实例规格: {[shape.shape for shape in shapes]}")
-        
-            result = {
-                'availability_domains': [
-                    {
-                        'name': ad.name,
-                        'id': ad.name
-                    } for ad in availability_domains
-                ],
-                'images': [
-                    {
-                        'id': image.id,
-                        'name': f"{image.operating_system} {image.operating_system_version} - {image.display_name}",
-                        'size': image.size_in_mbs // 1024  # 转换为GB
-                    } for image in sorted(images, key=lambda x: (x.operating_system, x.operating_system_version))
-                ],
-                'subnets': [
-                    {
-                        'id': subnet['id'],
-                        'name': subnet['name'],
-                        'cidr_block': f"{subnet['name']} ({subnet['cidr_block']})"
-                    } for subnet in subnets
-                ],
-                'shapes': [
-                    {
-                        'name': shape.shape,
-                        'ocpus': shape.ocpus,
-                        'memory_in_gbs': shape.memory_in_gbs,
-                        'networking_bandwidth_in_gbps': shape.networking_bandwidth_in_gbps,
-                        'processor_description': shape.processor_description,
-                        'is_flex': shape.shape.endswith('.Flex')
-                    } for shape in shapes
-                ]
-            }
-        
-            return result
+            resources, _ = resource_catalog.get_resources(tenant_id, force=force)
+            return resources
         except Exception as e:
             logging.error(f"获取资源列表失败: {str(e)}", exc_info=True)
             raise
@@ -549,6 +427,7 @@ runcmd:
 """
         return base64.b64encode(script.encode()).decode()
 
+    @publishes(lambda args: [instance_key(args['data']['tenant_id']), limits_key(args['data']['tenant_id'])])
     def create_instance(self, data):
         """
         创建实例
@@ -561,17 +440,8 @@ runcmd:
             if not tenant:
                 raise ValueError("租户不存在")
             
-            # 创建OCI配置
-            config = {
-                "user": tenant['user_ocid'],
-                "key_file": tenant['key_file'],
-                "fingerprint": tenant['fingerprint'],
-                "tenancy": tenant['tenancy'],
-                "region": tenant['region']
-            }
-            
-            compute_client = oci.core.ComputeClient(config)
-            network_client = oci.core.VirtualNetworkClient(config)
+            compute_client = self._get_compute_client(tenant_id)
+            network_client = self._get_network_client(tenant_id)
             
             # 准备用户数据和SSH密钥
             metadata = {}
@@ -612,55 +482,67 @@ runcmd:
             )
             
             instance = launch_instance_response.data
+            compartment_id = tenant['compartment_id']
+            
+            def wait_for_running(job):
+                # 等待实例变为RUNNING状态；启动失败的实例会直接变为TERMINATED
+                job.update(progress='等待实例启动')
+                latest = [instance]
+
+                def fetch_state():
+                    latest[0] = compute_client.get_instance(instance.id).data
+                    return latest[0].lifecycle_state
+
+                state = wait_for_state(fetch_state, ('RUNNING', 'TERMINATED'), timeout=1000,
+                                       initial_interval=JOB_POLL_INTERVAL, max_interval=JOB_MAX_POLL_INTERVAL,
+                                       description=f"实例 {instance.display_name}")
+                if state == 'TERMINATED':
+                    raise Exception("实例启动失败，已被终止")
+                running = latest[0]
+                
+                # 获取实例的VNIC信息以获取公网IP
+                job.update(progress='获取网络信息')
+                private_ip, public_ip = self.get_instance_vnic_attachments(
+                    compute_client,
+                    network_client,
+                    compartment_id,
+                    running.id
+                )
+                invalidation_bus.publish([instance_key(tenant_id, running.id)])
+                return {'instance': self._format_launched_instance(running, public_ip, private_ip)}
             
-            # 等待实例变为RUNNING状态
-            get_instance_response = oci.wait_until(
-                compute_client,
-                compute_client.get_instance(instance.id),
-                'lifecycle_state',
-                'RUNNING',
-                max_wait_seconds=1000
-            )
-            
-            instance = get_instance_response.data
-            
-            # 获取实例的VNIC信息以获取公网IP
-            private_ip, public_ip = self.get_instance_vnic_attachments(
-                compute_client,
-                network_client,
-                tenant['compartment_id'],
-                instance.id
-            )
-            
-            # 构建返回结果
-            result = {
-                'success': True,
-                'instance': {
-                    'id': instance.id,
-                    'display_name': instance.display_name,
-                    'lifecycle_state': instance.lifecycle_state,
-                    'time_created': instance.time_created.strftime('%Y-%m-%d %H:%M:%S'),
-                    'public_ip': public_ip,
-                    'private_ip': private_ip
-                }
-            }
+            # 构建返回结果，后续进度由后台任务跟踪
+            initial_result = {'instance': self._format_launched_instance(instance)}
+            job = job_manager.submit('create_instance', wait_for_running, tenant_id=tenant_id, **initial_result)
             
-            # 如果是密码登录，返回生成的密码
+            result = dict(initial_result, success=True, job_id=job.id)
+            # 如果是密码登录，只在本次响应中返回生成的密码；任务结果对所有已登录会话可见，不能保存密码
             if data['login_method'] == 'password':
                 result['password'] = password
-        
             return result
         
         except Exception as e:
             logging.error(f"创建实例失败: {str(e)}", exc_info=True)
             raise Exception(f"创建实例失败: {str(e)}")
 
-    def delete_instance(self, tenant_id: str, instance_id: str) -> bool:
+    def _format_launched_instance(self, instance, public_ip=None, private_ip=None) -> Dict[str, Any]:
+        """格式化新创建实例的返回信息"""
+        return {
+            'id': instance.id,
+            'display_name': instance.display_name,
+            'lifecycle_state': instance.lifecycle_state,
+            'time_created': instance.time_created.strftime('%Y-%m-%d %H:%M:%S'),
+            'public_ip': public_ip,
+            'private_ip': private_ip
+        }
+
+    @publishes(lambda args: [instance_key(args['tenant_id'], args['instance_id']), limits_key(args['tenant_id'])])
+    def delete_instance(self, tenant_id: str, instance_id: str) -> Optional[str]:
         """
         删除实例
         :param tenant_id: 租户ID
         :param instance_id: 实例ID
-        :return: 是否成功
+        :return: 跟踪终止进度的后台任务ID，失败时返回None
         """
         try:
             # 获取租户信息
@@ -668,46 +550,95 @@ runcmd:
             if not tenant:
                 raise ValueError("租户不存在")
             
-            # 创建OCI配置
-            config = {
-                "user": tenant['user_ocid'],
-                "key_file": tenant['key_file'],
-                "fingerprint": tenant['fingerprint'],
-                "tenancy": tenant['tenancy'],
-                "region": tenant['region']
-            }
-            
             # 获取计算客户端
             compute_client = self._get_compute_client(tenant_id)
             
             # 终止实例
             compute_client.terminate_instance(instance_id)
             
-            # 等待实例被删除
-            try:
-                oci.wait_until(
-                    compute_client,
-                    compute_client.get_instance(instance_id),
-                    'lifecycle_state',
-                    'TERMINATED',
-                    max_wait_seconds=1000
-                )
-            except oci.exceptions.ServiceError as e:
-                if e.status == 404:  # 实例已经被删除
-                    return True
-                raise
-                
-            return True
+            def wait_for_terminated(job):
+                # 等待实例被删除
+                job.update(progress='等待实例终止')
+                # 404表示实例已经被删除
+                wait_for_state(lambda: compute_client.get_instance(instance_id).data.lifecycle_state,
+                               ('TERMINATED',), timeout=1000, initial_interval=JOB_POLL_INTERVAL,
+                               max_interval=JOB_MAX_POLL_INTERVAL, succeed_on_not_found=True,
+                               description=f"实例 {instance_id}")
+                invalidation_bus.publish([instance_key(tenant_id, instance_id), limits_key(tenant_id)])
+                return {'lifecycle_state': 'TERMINATED'}
+            
+            job = job_manager.submit('terminate_instance', wait_for_terminated, tenant_id=tenant_id,
+                                     instance_id=instance_id)
+            return job.id
             
         except Exception as e:
             logging.error(f"删除实例失败: {str(e)}", exc_info=True)
-            return False
+            return None
+
+    def _fetch_vnic(self, network_client, attachment) -> Optional[Dict[str, Any]]:
+        """获取单个VNIC附件对应的VNIC详情，VNIC不存在或获取失败时返回None"""
+        try:
+            logging.debug(f"正在获取VNIC {attachment.vnic_id} 的详情")
+            vnic = network_client.get_vnic(attachment.vnic_id).data
+            return {
+                'id': vnic.id,
+                'display_name': vnic.display_name,
+                'private_ip': vnic.private_ip,
+                'public_ip': vnic.public_ip,
+                'ipv6_addresses': vnic.ipv6_addresses if hasattr(vnic, 'ipv6_addresses') else [],
+                'subnet_id': vnic.subnet_id,
+                'mac_address': vnic.mac_address,
+                'is_primary': vnic.is_primary,
+                'state': vnic.lifecycle_state,
+                'attachment_id': attachment.id,
+                'attachment_state': attachment.lifecycle_state
+            }
+        except oci.exceptions.ServiceError as se:
+            if se.status == 404:
+                logging.warning(f"VNIC {attachment.vnic_id} 不存在或已被删除")
+            else:
+                logging.error(f"获取VNIC详情失败: {str(se)}", exc_info=True)
+        except Exception as e:
+            logging.error(f"获取VNIC详情失败: {str(e)}", exc_info=True)
+        return None
 
+    @traced()
+    def _resolve_vnics(self, tenant_id, vnic_attachments) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        并发获取一批VNIC附件的VNIC详情，并按实例ID分组
+        :param tenant_id: 租户ID
+        :param vnic_attachments: VNIC附件列表，可跨多个实例
+        :return: 实例ID到VNIC列表的映射
+        """
+        attached = []
+        for attachment in vnic_attachments:
+            # 如果VNIC附件不是ATTACHED状态，跳过获取VNIC详情
+            if attachment.lifecycle_state != 'ATTACHED':
+                logging.debug(f"VNIC附件 {attachment.id} 状态为 {attachment.lifecycle_state}，跳过获取VNIC详情")
+                continue
+            attached.append(attachment)
+        
+        vnics_by_instance = {}
+        if not attached:
+            return vnics_by_instance
+        
+        network_client = self._get_network_client(tenant_id)
+        vnics = bounded_map(
+            lambda attachment: self._fetch_vnic(network_client, attachment),
+            attached,
+            max_workers=VNIC_FETCH_WORKERS
+        )
+        for attachment, vnic in zip(attached, vnics):
+            if vnic:
+                vnics_by_instance.setdefault(attachment.instance_id, []).append(vnic)
+        return vnics_by_instance
+
+    @traced()
+    @coalesced()
     def list_vnics(self, tenant_id, instance_id):
         """获取实例的VNIC列表"""
         try:
             compute_client = self._get_compute_client(tenant_id)
-            network_client = self._get_network_client(tenant_id)
             
             # 获取租户配置
             tenant = self.tenant_service.get_tenant_by_id(tenant_id)
@@ -719,50 +650,18 @@ runcmd:
         
             logging.info(f"正在获取实例 {instance_id} 的VNIC附件列表")
             # 获取VNIC附件列表
-            vnic_attachments = compute_client.list_vnic_attachments(
+            vnic_attachments = list_all(
+                compute_client.list_vnic_attachments,
                 compartment_id=compartment_id,
                 instance_id=instance_id
-            ).data
+            )
             
-            vnics = []
-            for attachment in vnic_attachments:
-                # 如果VNIC附件不是ATTACHED状态，跳过获取VNIC详情
-                if attachment.lifecycle_state != 'ATTACHED':
-                    logging.info(f"VNIC附件 {attachment.id} 状态为 {attachment.lifecycle_state}，跳过获取VNIC详情")
-                    continue
-                
-                try:
-                    logging.info(f"正在获取VNIC {attachment.vnic_id} 的详情")
-                    # 获取VNIC详情
-                    try:
-                        vnic = network_client.get_vnic(attachment.vnic_id).data
-                        vnics.append({
-                            'id': vnic.id,
-                            'display_name': vnic.display_name,
-                            'private_ip': vnic.private_ip,
-                            'public_ip': vnic.public_ip,
-                            'ipv6_addresses': vnic.ipv6_addresses if hasattr(vnic, 'ipv6_addresses') else [],
-                            'subnet_id': vnic.subnet_id,
-                            'mac_address': vnic.mac_address,
-                            'is_primary': vnic.is_primary,
-                            'state': vnic.lifecycle_state,
-                            'attachment_id': attachment.id,
-                            'attachment_state': attachment.lifecycle_state
-                        })
-                    except oci.exceptions.ServiceError as se:
-                        if se.status == 404:
-                            logging.warning(f"VNIC {attachment.vnic_id} 不存在或已被删除")
-                        else:
-                            raise
-                except Exception as e:
-                    logging.error(f"获取VNIC详情失败: {str(e)}", exc_info=True)
-                    continue
-        
-            return vnics
+            return self._resolve_vnics(tenant_id, vnic_attachments).get(instance_id, [])
         except Exception as e:
             logging.error(f"获取VNIC列表失败: {str(e)}", exc_info=True)
             raise
 
+    @publishes(lambda args: instance_key(args['tenant_id'], args['instance_id']))
     def attach_vnic(self, tenant_id, instance_id, subnet_id, display_name=None):
         """附加VNIC到实例"""
         try:
@@ -832,93 +731,40 @@ runcmd:
             logging.error(f"附加VNIC失败: {str(e)}", exc_info=True)
             raise
 
+    @publishes(lambda args: instance_key(args['tenant_id']))
     def detach_vnic(self, tenant_id, attachment_id):
-        """分离VNIC"""
+        """分离VNIC，返回跟踪分离进度的后台任务ID"""
         try:
             compute_client = self._get_compute_client(tenant_id)
         
             # 分离VNIC
             compute_client.detach_vnic(attachment_id)
         
-            # 等待VNIC分离完成
-            try:
-                oci.wait_until(
-                    compute_client,
-                    compute_client.get_vnic_attachment(attachment_id),
-                    'lifecycle_state',
-                    'DETACHED',
-                    max_wait_seconds=300,
-                    succeed_on_not_found=True
-                )
-                return True
-            except oci.exceptions.WaitUntilTimeoutError:
-                logging.error("等待VNIC分离超时")
-                raise Exception("VNIC分离操作超时，请稍后刷新查看状态")
-            except oci.exceptions.ServiceError as se:
-                if se.status == 404:  # VNIC已经完全分离
-                    return True
-                raise
+            def wait_for_detached(job):
+                # 等待VNIC分离完成
+                job.update(progress='等待VNIC分离')
+                try:
+                    # 404表示VNIC已经完全分离
+                    wait_for_state(lambda: compute_client.get_vnic_attachment(attachment_id).data.lifecycle_state,
+                                   ('DETACHED',), timeout=300, initial_interval=JOB_POLL_INTERVAL,
+                                   max_interval=JOB_MAX_POLL_INTERVAL, succeed_on_not_found=True,
+                                   description=f"VNIC附件 {attachment_id}")
+                except WaitTimeoutError:
+                    logging.error("等待VNIC分离超时")
+                    raise Exception("VNIC分离操作超时，请稍后刷新查看状态")
+                # 只知道附件ID，清除该租户的全部实例
+                invalidation_bus.publish([instance_key(tenant_id)])
+                return {'attachment_state': 'DETACHED'}
+            
+            job = job_manager.submit('detach_vnic', wait_for_detached, tenant_id=tenant_id,
+                                     attachment_id=attachment_id)
+            return job.id
             
         except Exception as e:
             logging.error(f"分离VNIC失败: {str(e)}", exc_info=True)
             raise
 
-    def _get_network_client(self, tenant_id):
-        """获取网络客户端"""
-        try:
-            tenant = self.tenant_service.get_tenant_by_id(tenant_id)
-            if not tenant:
-                raise Exception("租户不存在")
-        
-            # 从租户配置中读取私钥文件内容
-            try:
-                with open(tenant['key_file'], 'r') as f:
-                    private_key = f.read()
-            except Exception as e:
-                logging.error(f"读取私钥文件失败: {str(e)}", exc_info=True)
-                raise Exception(f"读取私钥文件失败: {str(e)}")
-        
-            config = {
-                "user": tenant['user_ocid'],
-                "key_content": private_key,
-                "fingerprint": tenant['fingerprint'],
-                "tenancy": tenant['tenancy'],
-                "region": tenant['region']
-            }
-        
-            return oci.core.VirtualNetworkClient(config)
-        except Exception as e:
-            logging.error(f"创建网络客户端失败: {str(e)}", exc_info=True)
-            raise
-
-    def _get_compute_client(self, tenant_id):
-        """获取计算客户端"""
-        try:
-            tenant = self.tenant_service.get_tenant_by_id(tenant_id)
-            if not tenant:
-                raise Exception("租户不存在")
-        
-            # 从租户配置中读取私钥文件内容
-            try:
-                with open(tenant['key_file'], 'r') as f:
-                    private_key = f.read()
-            except Exception as e:
-                logging.error(f"读取私钥文件失败: {str(e)}", exc_info=True)
-                raise Exception(f"读取私钥文件失败: {str(e)}")
-        
-            config = {
-                "user": tenant['user_ocid'],
-                "key_content": private_key,
-                "fingerprint": tenant['fingerprint'],
-                "tenancy": tenant['tenancy'],
-                "region": tenant['region']
-            }
-        
-            return oci.core.ComputeClient(config)
-        except Exception as e:
-            logging.error(f"创建计算客户端失败: {str(e)}", exc_info=True)
-            raise
-
+    @publishes(lambda args: [instance_key(args['tenant_id'], args['instance_id']), limits_key(args['tenant_id'])])
     def update_instance_shape(self, tenant_id: str, instance_id: str, shape: str, shape_config: dict = None) -> dict:
         """更新实例的形状"""
         try:
@@ -974,11 +820,12 @@ runcmd:
             image_id = instance.image_id
 
             # 获取可用的实例形状
-            shapes = compute_client.list_shapes(
+            shapes = list_all(
+                compute_client.list_shapes,
                 compartment_id=compartment_id,
                 availability_domain=availability_domain,
                 image_id=image_id
-            ).data
+            )
 
             # 处理形状信息
             result = []
@@ -1017,6 +864,7 @@ runcmd:
                 'message': f"获取可用实例形状失败: {str(e)}"
             }
 
+    @publishes(lambda args: instance_key(args['tenant_id'], args['instance_id']))
     def add_ipv6_address(self, tenant_id: str, instance_id: str, vnic_id: str, is_auto: bool = True, ipv6_address: str = None) -> bool:
         """
         添加IPv6地址到VNIC
@@ -1066,6 +914,7 @@ runcmd:
             logging.error(f"添加IPv6地址失败: {str(e)}", exc_info=True)
             raise
 
+    @publishes(lambda args: instance_key(args['tenant_id'], args['instance_id']))
     def delete_ipv6_address(self, tenant_id: str, instance_id: str, ipv6_address: str) -> bool:
         """
         删除IPv6地址
@@ -1093,9 +942,10 @@ runcmd:
                 raise Exception(f"找不到包含IPv6地址 {ipv6_address} 的VNIC")
 
             # 获取VNIC的IPv6地址列表
-            ipv6s = network_client.list_ipv6s(
+            ipv6s = list_all(
+                network_client.list_ipv6s,
                 vnic_id=target_vnic['id']
-            ).data
+            )
 
             # 找到匹配的IPv6地址
             target_ipv6 = None
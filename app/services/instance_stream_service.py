@@ -0,0 +1,245 @@
+"""实例状态推送服务
+
+每个租户只有一个后台观察线程调用 list_instances，与上一次结果比较后，
+只把发生变化的实例推送给所有订阅者（浏览器通过 SSE 订阅）。
+无论打开多少个页面，对OCI的轮询次数都保持不变。
+本应用对实例的变更通过缓存失效总线通知观察线程立即轮询。
+gthread 工作进程中每个打开的 SSE 连接占用一个线程，因此每个进程的订阅者数量有上限
+（instance_stream.max_subscribers），超出后新连接返回 503，页面改为定时轮询实例列表。
+"""
+import datetime
+import json
+import logging
+import queue
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+from config.config import config
+from app.utils.invalidation import INSTANCE, ResourceKey, invalidation_bus
+
+# 处于这些状态的实例变化较快，存在时使用较短的轮询间隔
+TRANSITIONAL_STATES = {'PROVISIONING', 'STARTING', 'STOPPING', 'TERMINATING', 'CREATING_IMAGE', 'MOVING'}
+
+EVENT_SNAPSHOT = 'snapshot'
+EVENT_CHANGED = 'changed'
+EVENT_REMOVED = 'removed'
+EVENT_FAILURE = 'failure'
+
+# 单个订阅者最多积压的事件数，超出后直接改发完整快照
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """将事件编码为 text/event-stream 格式"""
+    data = json.dumps(event['data'], ensure_ascii=False, default=_json_default)
+    return f"event: {event['event']}\ndata: {data}\n\n"
+
+
+class TenantInstanceWatcher:
+    """单个租户的实例观察线程"""
+
+    def __init__(self, tenant_id: str, interval: int, idle_interval: int):
+        """
+        Args:
+            tenant_id: 租户ID
+            interval: 存在过渡状态实例时的轮询间隔（秒）
+            idle_interval: 所有实例状态稳定时的轮询间隔（秒）
+        """
+        self.tenant_id = tenant_id
+        self.interval = interval
+        self.idle_interval = idle_interval
+        self._lock = threading.Lock()
+        self._subscribers: Set[queue.Queue] = set()
+        self._snapshot: Optional[Dict[str, Dict[str, Any]]] = None
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self) -> queue.Queue:
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if self._snapshot is not None:
+                # 已有快照时直接发给新订阅者，不额外调用OCI
+                subscriber.put_nowait(self._snapshot_event())
+            if not self._thread or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f'instance-watch-{self.tenant_id}',
+                                                daemon=True)
+                self._thread.start()
+                logging.info(f"租户 {self.tenant_id} 的实例观察线程已启动")
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+        # 唤醒线程，让它在没有订阅者时尽快退出
+        self._wakeup.set()
+
+    def poke(self) -> None:
+        """立即执行一次轮询，用于用户操作之后尽快推送新状态"""
+        self._wakeup.set()
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def _snapshot_event(self) -> Dict[str, Any]:
+        return {'event': EVENT_SNAPSHOT, 'data': list(self._snapshot.values())}
+
+    def _run(self) -> None:
+        from app.services.instance_service import InstanceService
+
+        instance_service = InstanceService()
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    # 没有订阅者时退出并丢弃快照，下次订阅重新获取
+                    self._snapshot = None
+                    self._thread = None
+                    logging.info(f"租户 {self.tenant_id} 的实例观察线程已停止")
+                    return
+
+            self._wakeup.clear()
+            wait = self.idle_interval
+            try:
+                # 跳过缓存直接查询，结果写回缓存供页面使用
+                instances = instance_service.list_instances(self.tenant_id, include_vnics=True, force=True)
+                self._publish(instances)
+                if any(i['lifecycle_state'] in TRANSITIONAL_STATES for i in instances):
+                    wait = self.interval
+            except Exception as e:
+                logging.error(f"租户 {self.tenant_id} 的实例观察失败: {str(e)}")
+                self._broadcast({'event': EVENT_FAILURE, 'data': {'error': str(e)}})
+            self._wakeup.wait(wait)
+
+    def _publish(self, instances: List[Dict[str, Any]]) -> None:
+        """与上一次快照比较，只广播变化的部分"""
+        current = {instance['id']: instance for instance in instances}
+        with self._lock:
+            previous = self._snapshot
+            self._snapshot = current
+            if previous is None:
+                self._broadcast_locked(self._snapshot_event())
+                return
+
+            changed = [instance for instance_id, instance in current.items()
+                       if previous.get(instance_id) != instance]
+            removed = [instance_id for instance_id in previous if instance_id not in current]
+            if changed:
+                self._broadcast_locked({'event': EVENT_CHANGED, 'data': changed})
+            if removed:
+                self._broadcast_locked({'event': EVENT_REMOVED, 'data': removed})
+
+    def _broadcast(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            self._broadcast_locked(event)
+
+    def _broadcast_locked(self, event: Dict[str, Any]) -> None:
+        for subscriber in self._subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                # 订阅者消费过慢，清空积压并改发完整快照
+                self._drain(subscriber)
+                if self._snapshot is not None:
+                    subscriber.put_nowait(self._snapshot_event())
+
+    @staticmethod
+    def _drain(subscriber: queue.Queue) -> None:
+        while True:
+            try:
+                subscriber.get_nowait()
+            except queue.Empty:
+                return
+
+
+class InstanceStreamHub:
+    """按租户管理实例观察线程和订阅者"""
+
+    def __init__(self, interval: int = 5, idle_interval: int = 30, heartbeat: int = 15,
+                 max_subscribers: int = 8):
+        """
+        Args:
+            interval: 存在过渡状态实例时的轮询间隔（秒）
+            idle_interval: 所有实例状态稳定时的轮询间隔（秒）
+            heartbeat: SSE 心跳间隔（秒），用于保持连接和发现已断开的客户端
+            max_subscribers: 本进程同时保持的订阅者数上限，0 表示不限（gevent 工作进程）
+        """
+        self.interval = interval
+        self.idle_interval = idle_interval
+        self.heartbeat = heartbeat
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._watchers: Dict[str, TenantInstanceWatcher] = {}
+
+    def _get_watcher(self, tenant_id: str) -> TenantInstanceWatcher:
+        tenant_id = str(tenant_id)
+        with self._lock:
+            watcher = self._watchers.get(tenant_id)
+            if watcher is None:
+                watcher = TenantInstanceWatcher(tenant_id, self.interval, self.idle_interval)
+                self._watchers[tenant_id] = watcher
+            return watcher
+
+    def poke(self, tenant_id: str) -> None:
+        """通知租户的观察线程立即轮询（没有订阅者时不做任何事）"""
+        with self._lock:
+            watcher = self._watchers.get(str(tenant_id))
+        if watcher:
+            watcher.poke()
+
+    def on_invalidate(self, keys: List[ResourceKey]) -> None:
+        """缓存失效总线回调：实例变化后通知对应租户的观察线程"""
+        for tenant_id in {key.tenant_id for key in keys if key.kind == INSTANCE}:
+            self.poke(tenant_id)
+
+    def subscriber_count(self) -> int:
+        """本进程所有租户的订阅者总数"""
+        return sum(self.stats().values())
+
+    def accepting(self) -> bool:
+        """是否还能接受新的订阅者；不是严格上限，同时到达的连接可能略微超出"""
+        return not self.max_subscribers or self.subscriber_count() < self.max_subscribers
+
+    def stream(self, tenant_id: str, refresh: bool = False):
+        """
+        订阅租户的实例变化，返回 SSE 文本生成器
+
+        客户端断开后，下一次写入（最迟在一个心跳间隔后）会触发 GeneratorExit，
+        此时自动取消订阅。
+        """
+        watcher = self._get_watcher(tenant_id)
+        subscriber = watcher.subscribe()
+        if refresh:
+            watcher.poke()
+        try:
+            yield f"retry: {int(self.heartbeat * 1000)}\n\n"
+            while True:
+                try:
+                    event = subscriber.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            watcher.unsubscribe(subscriber)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            watchers = list(self._watchers.values())
+        return {watcher.tenant_id: watcher.subscriber_count() for watcher in watchers}
+
+
+# 全局实例推送中心
+instance_stream_hub = InstanceStreamHub(
+    interval=config.get('instance_stream.interval', 5),
+    idle_interval=config.get('instance_stream.idle_interval', 30),
+    heartbeat=config.get('instance_stream.heartbeat', 15),
+    max_subscribers=config.get('instance_stream.max_subscribers', 8)
+)
+invalidation_bus.subscribe(instance_stream_hub.on_invalidate)
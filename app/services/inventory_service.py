@@ -0,0 +1,386 @@
+"""资源清单服务
+
+在后台定期为每个租户同步实例、VNIC、引导卷、块存储卷、VCN、子网和安全列表，
+写入本地资源清单（见 inventory_store），页面和API直接读取清单并附带同步时间，不再调用OCI：
+- 清单在 inventory.interval 内直接返回；
+- 超过后先返回旧清单，同时在后台重新同步；
+- 从未同步过的资源类型同步一次后返回。
+本应用的变更操作通过缓存失效总线通知清单立即重新同步相关类型。
+多个工作进程时，只有持有调度租约的进程执行定时巡检和历史清理，其余进程在租约过期后接管。
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.config import config
+from config.tenant_registry import tenant_registry
+from app.services.inventory_store import inventory_store
+from app.utils.invalidation import INSTANCE, SECURITY_LIST, VOLUME, ResourceKey, invalidation_bus
+from app.utils.lazy_import import oci
+from app.utils.pagination import list_all
+from app.utils.profiler import traced
+
+KIND_INSTANCES = 'instances'
+KIND_VNICS = 'vnics'
+KIND_BOOT_VOLUMES = 'boot_volumes'
+KIND_BLOCK_VOLUMES = 'block_volumes'
+KIND_VCNS = 'vcns'
+KIND_SUBNETS = 'subnets'
+KIND_SECURITY_LISTS = 'security_lists'
+
+# 资源类型 -> 采集器；实例和VNIC来自同一次查询，一起同步
+COLLECTORS = {
+    KIND_INSTANCES: 'instances',
+    KIND_VNICS: 'instances',
+    KIND_BOOT_VOLUMES: 'boot_volumes',
+    KIND_BLOCK_VOLUMES: 'block_volumes',
+    KIND_VCNS: 'vcns',
+    KIND_SUBNETS: 'subnets',
+    KIND_SECURITY_LISTS: 'security_lists',
+}
+KINDS = tuple(COLLECTORS)
+
+# 缓存失效总线的资源类型 -> 需要重新同步的采集器
+INVALIDATED_COLLECTORS = {
+    INSTANCE: ('instances',),
+    VOLUME: ('boot_volumes', 'block_volumes'),
+    SECURITY_LIST: ('security_lists',),
+}
+
+# 变更历史的保留时间
+HISTORY_DAYS = config.get('inventory.history_days', 90)
+
+# 定时巡检的租约名称；持有者每个间隔续期一次，租约有效期为两个间隔
+SCHEDULER_LEASE = 'scheduler'
+
+
+class InventoryService:
+    """资源清单的同步和读取"""
+
+    def __init__(self, interval: int = 600, max_workers: int = 4):
+        """
+        Args:
+            interval: 后台同步间隔（秒），也是清单的新鲜期
+            max_workers: 并发同步的线程数
+        """
+        self.interval = interval
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        # 同一租户的同一采集器同时只允许一次同步，其余调用等待其结果
+        self._sync_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._pending: set = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _ensure_started(self) -> None:
+        """
+        首次使用时才启动线程，避免在 fork 之前创建线程
+
+        每个进程都有自己的同步线程池，用于按需同步和失效后的重新同步；
+        调度线程也在每个进程中运行，但只有取得调度租约的进程执行定时巡检
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='inventory')
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='inventory-scheduler', daemon=True)
+            self._thread.start()
+            logging.info(f"资源清单同步已启动，间隔 {self.interval} 秒")
+
+    @staticmethod
+    def _owner() -> str:
+        # fork 之后进程号不同，每次调用时计算
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if not inventory_store.acquire_lease(SCHEDULER_LEASE, self._owner(), self.interval * 2):
+                    self._stop.wait(self.interval)
+                    continue
+                for tenant_id, tenant in tenant_registry.items():
+                    if not tenant.get('tenancy'):
+                        continue
+                    stale = [name for name in set(COLLECTORS.values())
+                             if self._is_stale(tenant['tenancy'], name)]
+                    if stale:
+                        self._submit(tenant_id, stale)
+                inventory_store.prune(time.time() - HISTORY_DAYS * 86400)
+            except Exception as e:
+                logging.error(f"资源清单巡检失败: {str(e)}")
+            self._stop.wait(self.interval)
+
+    def _is_stale(self, tenancy: str, collector: str) -> bool:
+        for kind, name in COLLECTORS.items():
+            if name != collector:
+                continue
+            info = inventory_store.snapshot_info(tenancy, kind)
+            if info is None or info['taken_at'] is None or time.time() - info['taken_at'] > self.interval:
+                return True
+        return False
+
+    def _submit(self, tenant_id: str, collectors) -> None:
+        """提交后台同步，已在排队或执行的采集器不重复提交"""
+        self._ensure_started()
+        with self._lock:
+            if self._executor is None:
+                return
+            for name in collectors:
+                key = (str(tenant_id), name)
+                if key in self._pending:
+                    continue
+                self._pending.add(key)
+                self._executor.submit(self._sync_in_background, key)
+
+    def _sync_in_background(self, key: Tuple[str, str]) -> None:
+        tenant_id, name = key
+        with self._lock:
+            # 开始执行后新的失效通知需要再同步一次
+            self._pending.discard(key)
+        try:
+            self._sync(tenant_id, name)
+        except Exception as e:
+            logging.warning(f"后台同步资源清单 {tenant_id}/{name} 失败: {str(e)}")
+
+    def _tenant(self, tenant_id: str) -> Dict[str, Any]:
+        tenant = tenant_registry.get_by_id(str(tenant_id))
+        if not tenant:
+            raise ValueError("租户不存在")
+        if not tenant.get('tenancy'):
+            raise ValueError(f"租户配置中缺少tenancy: {tenant_id}")
+        return tenant
+
+    def _sync_lock(self, tenant_id: str, name: str) -> threading.Lock:
+        with self._lock:
+            return self._sync_locks.setdefault((str(tenant_id), name), threading.Lock())
+
+    def _sync(self, tenant_id: str, name: str, since: Optional[float] = None) -> Dict[str, Dict[str, int]]:
+        """
+        执行一个采集器并写入清单
+
+        Args:
+            since: 等锁期间其他线程若已在该时间之后完成同步，则不再重复同步
+        """
+        tenant = self._tenant(tenant_id)
+        tenancy = tenant['tenancy']
+        kinds = [kind for kind, collector in COLLECTORS.items() if collector == name]
+        with self._sync_lock(tenant_id, name):
+            if since is not None:
+                infos = [inventory_store.snapshot_info(tenancy, kind) for kind in kinds]
+                if all(info and info['taken_at'] and info['taken_at'] >= since for info in infos):
+                    return {}
+
+            taken_at = time.time()
+            try:
+                snapshots = getattr(self, f'_collect_{name}')(tenant_id, tenant)
+            except Exception as e:
+                logging.error(f"同步资源清单 {tenant.get('name')}/{name} 失败: {str(e)}")
+                for kind in kinds:
+                    inventory_store.record_failure(tenancy, kind, str(e))
+                raise
+            return {kind: inventory_store.apply_snapshot(tenancy, kind, records, taken_at)
+                    for kind, records in snapshots.items()}
+
+    @traced()
+    def sync_tenant(self, tenant_id: str, kinds: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        同步租户的资源清单，某个类型失败时其余类型照常同步
+
+        Returns:
+            资源类型 -> 新增、变化和删除的资源数；失败的类型在 errors 中
+        """
+        names = dict.fromkeys(COLLECTORS[kind] for kind in (kinds or KINDS))
+        result, errors = {}, {}
+        for name in names:
+            try:
+                result.update(self._sync(tenant_id, name))
+            except Exception as e:
+                errors[name] = str(e)
+        return {'changes': result, 'errors': errors}
+
+    def get(self, tenant_id: str, kind: str, force: bool = False) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        读取某类资源的清单
+
+        Args:
+            force: 先同步再返回
+
+        Returns:
+            (资源列表, 元信息)，元信息包含 last_refreshed（同步时间戳）、stale（是否已过新鲜期）
+            和 error（最近一次同步失败的原因）
+        """
+        if kind not in COLLECTORS:
+            raise ValueError(f"不支持的资源类型: {kind}")
+        self._ensure_started()
+        tenancy = self._tenant(tenant_id)['tenancy']
+        info = inventory_store.snapshot_info(tenancy, kind)
+        if force or info is None or info['taken_at'] is None:
+            self._sync(tenant_id, COLLECTORS[kind], since=time.time())
+            info = inventory_store.snapshot_info(tenancy, kind)
+        stale = time.time() - info['taken_at'] > self.interval
+        if stale:
+            self._submit(tenant_id, [COLLECTORS[kind]])
+        return inventory_store.list_resources(tenancy, kind), {
+            'last_refreshed': info['taken_at'],
+            'stale': stale,
+            'error': info['error']
+        }
+
+    def get_changes(self, tenant_id: str, kind: Optional[str] = None, resource_id: Optional[str] = None,
+                    since: Optional[float] = None, limit: int = 200) -> List[Dict[str, Any]]:
+        """租户的变更历史，按时间倒序"""
+        tenancy = self._tenant(tenant_id)['tenancy']
+        return inventory_store.query_changes(tenancy, kind, resource_id, since, limit)
+
+    def get_address_history(self, address: str, limit: int = 200) -> List[Dict[str, Any]]:
+        """
+        某个IP地址的历史（跨租户），回答“这个IP什么时候分配给了谁、什么时候换掉的”
+
+        每条记录附带租户ID和名称，以及资源当前（或删除前）的名称
+        """
+        changes = inventory_store.query_address(address, limit)
+        names = {}
+        for change in changes:
+            tenant_id = tenant_registry.id_by_tenancy(change['tenancy'])
+            tenant = tenant_registry.get_by_id(tenant_id) if tenant_id else None
+            key = (change['tenancy'], change['kind'], change['resource_id'])
+            if key not in names:
+                resource = inventory_store.get_resource(*key)
+                names[key] = resource['data'].get('display_name') if resource else None
+            change.update(
+                tenant_id=tenant_id,
+                tenant_name=tenant.get('name') if tenant else None,
+                display_name=names[key]
+            )
+        return changes
+
+    def on_invalidate(self, keys: List[ResourceKey]) -> None:
+        """缓存失效总线回调：本应用变更资源后在后台重新同步相关类型"""
+        collectors: Dict[str, set] = {}
+        for key in keys:
+            names = INVALIDATED_COLLECTORS.get(key.kind)
+            if names:
+                collectors.setdefault(key.tenant_id, set()).update(names)
+        for tenant_id, names in collectors.items():
+            if tenant_registry.get_by_id(tenant_id):
+                self._submit(tenant_id, names)
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._lock:
+            if self._executor:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            self._pending.clear()
+        try:
+            inventory_store.release_lease(SCHEDULER_LEASE, self._owner())
+        except Exception as e:
+            logging.warning(f"释放资源清单调度租约失败: {str(e)}")
+
+    # 采集器：返回 资源类型 -> {资源ID: 记录}
+
+    @staticmethod
+    def _compartment_id(tenant: Dict[str, Any]) -> str:
+        return tenant.get('compartment_id') or tenant['tenancy']
+
+    def _client(self, tenant_id: str, service: str) -> Any:
+        from app.services.tenant_service import TenantService
+
+        client = TenantService().get_oci_client(tenant_id, service=service)
+        if not client:
+            raise ValueError("无法创建OCI客户端")
+        return client
+
+    def _collect_instances(self, tenant_id: str, tenant: Dict[str, Any]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        from app.services.instance_service import InstanceService
+
+        instances, vnics = {}, {}
+        for instance in InstanceService().iter_instances(tenant_id, include_vnics=True):
+            for vnic in instance.pop('vnics', []):
+                vnics[vnic['id']] = dict(vnic, instance_id=instance['id'])
+            instances[instance['id']] = instance
+        return {KIND_INSTANCES: instances, KIND_VNICS: vnics}
+
+    def _collect_boot_volumes(self, tenant_id: str, tenant: Dict[str, Any]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        from app.services.fleet_service import FleetService
+
+        volumes = FleetService().list_boot_volumes(tenant_id)
+        return {KIND_BOOT_VOLUMES: {volume['id']: volume for volume in volumes}}
+
+    def _collect_block_volumes(self, tenant_id: str, tenant: Dict[str, Any]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        compartment_id = self._compartment_id(tenant)
+        block_client = self._client(tenant_id, 'block_storage')
+        compute_client = self._client(tenant_id, 'compute')
+        volumes = list_all(block_client.list_volumes, compartment_id=compartment_id)
+        attachments = list_all(compute_client.list_volume_attachments, compartment_id=compartment_id)
+        instance_by_volume = {
+            attachment.volume_id: attachment.instance_id
+            for attachment in attachments
+            if attachment.lifecycle_state in ('ATTACHING', 'ATTACHED')
+        }
+        return {KIND_BLOCK_VOLUMES: {volume.id: {
+            'id': volume.id,
+            'display_name': volume.display_name,
+            'availability_domain': volume.availability_domain,
+            'size_in_gbs': volume.size_in_gbs,
+            'vpus_per_gb': volume.vpus_per_gb,
+            'lifecycle_state': volume.lifecycle_state,
+            'instance_id': instance_by_volume.get(volume.id)
+        } for volume in volumes if volume.lifecycle_state != 'TERMINATED'}}
+
+    def _collect_vcns(self, tenant_id: str, tenant: Dict[str, Any]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        network_client = self._client(tenant_id, 'network')
+        vcns = list_all(network_client.list_vcns, compartment_id=self._compartment_id(tenant))
+        return {KIND_VCNS: {vcn.id: {
+            'id': vcn.id,
+            'display_name': vcn.display_name,
+            'cidr_blocks': getattr(vcn, 'cidr_blocks', None) or [vcn.cidr_block],
+            'ipv6_cidr_blocks': getattr(vcn, 'ipv6_cidr_blocks', None) or [],
+            'lifecycle_state': vcn.lifecycle_state,
+            'time_created': vcn.time_created
+        } for vcn in vcns}}
+
+    def _collect_subnets(self, tenant_id: str, tenant: Dict[str, Any]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        network_client = self._client(tenant_id, 'network')
+        subnets = list_all(network_client.list_subnets, compartment_id=self._compartment_id(tenant))
+        return {KIND_SUBNETS: {subnet.id: {
+            'id': subnet.id,
+            'display_name': subnet.display_name,
+            'vcn_id': subnet.vcn_id,
+            'cidr_block': subnet.cidr_block,
+            'ipv6_cidr_block': getattr(subnet, 'ipv6_cidr_block', None),
+            'availability_domain': getattr(subnet, 'availability_domain', None),
+            'route_table_id': getattr(subnet, 'route_table_id', None),
+            'security_list_ids': getattr(subnet, 'security_list_ids', None) or [],
+            'prohibit_public_ip_on_vnic': getattr(subnet, 'prohibit_public_ip_on_vnic', None),
+            'lifecycle_state': subnet.lifecycle_state
+        } for subnet in subnets}}
+
+    def _collect_security_lists(self, tenant_id: str,
+                                tenant: Dict[str, Any]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        network_client = self._client(tenant_id, 'network')
+        security_lists = list_all(network_client.list_security_lists, compartment_id=self._compartment_id(tenant))
+        return {KIND_SECURITY_LISTS: {security_list.id: {
+            'id': security_list.id,
+            'display_name': security_list.display_name,
+            'vcn_id': security_list.vcn_id,
+            'lifecycle_state': security_list.lifecycle_state,
+            'ingress_security_rules': oci.util.to_dict(security_list.ingress_security_rules),
+            'egress_security_rules': oci.util.to_dict(security_list.egress_security_rules)
+        } for security_list in security_lists}}
+
+
+# 全局资源清单服务
+inventory_service = InventoryService(
+    interval=config.get('inventory.interval', 600),
+    max_workers=config.get('inventory.max_workers', 4)
+)
+invalidation_bus.subscribe(inventory_service.on_invalidate)
@@ -0,0 +1,379 @@
+"""本地资源清单仓库
+
+按租户（tenancy OCID）和资源类型保存最近一次同步到的资源，每次同步与上一次比较，
+把新增、删除和字段变化逐条写入变更历史，可以按资源、时间或IP地址查询。
+多个工作进程共用同一个数据库，定时同步由持有租约（inventory_leases）的进程执行。
+"""
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.config import config
+
+# 按IP查询历史时匹配的字段
+ADDRESS_FIELDS = ('public_ip', 'private_ip', 'ipv6_addresses')
+
+CHANGE_ADDED = 'added'
+CHANGE_CHANGED = 'changed'
+CHANGE_REMOVED = 'removed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS inventory_resources (
+    tenancy      TEXT NOT NULL,
+    kind         TEXT NOT NULL,
+    resource_id  TEXT NOT NULL,
+    data         TEXT NOT NULL,
+    first_seen   REAL NOT NULL,
+    last_seen    REAL NOT NULL,
+    deleted_at   REAL,
+    PRIMARY KEY (tenancy, kind, resource_id)
+);
+CREATE TABLE IF NOT EXISTS inventory_snapshots (
+    tenancy      TEXT NOT NULL,
+    kind         TEXT NOT NULL,
+    taken_at     REAL,
+    count        INTEGER NOT NULL DEFAULT 0,
+    error        TEXT,
+    error_at     REAL,
+    PRIMARY KEY (tenancy, kind)
+);
+CREATE TABLE IF NOT EXISTS inventory_changes (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    tenancy      TEXT NOT NULL,
+    kind         TEXT NOT NULL,
+    resource_id  TEXT NOT NULL,
+    changed_at   REAL NOT NULL,
+    change       TEXT NOT NULL,
+    field        TEXT,
+    old_value    TEXT,
+    new_value    TEXT
+);
+CREATE TABLE IF NOT EXISTS inventory_leases (
+    name         TEXT PRIMARY KEY,
+    owner        TEXT NOT NULL,
+    expires_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_inventory_changes_resource
+    ON inventory_changes (tenancy, kind, resource_id, changed_at);
+CREATE INDEX IF NOT EXISTS idx_inventory_changes_tenancy_time ON inventory_changes (tenancy, changed_at);
+CREATE INDEX IF NOT EXISTS idx_inventory_changes_old_value ON inventory_changes (old_value, field);
+CREATE INDEX IF NOT EXISTS idx_inventory_changes_new_value ON inventory_changes (new_value, field);
+"""
+
+# (变更类型, 字段, 旧值, 新值)
+ChangeRow = Tuple[str, Optional[str], Optional[str], Optional[str]]
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+def normalize(record: Dict[str, Any]) -> Dict[str, Any]:
+    """转换为JSON可表示的形式，保证与从数据库读回的记录可以直接比较"""
+    return json.loads(json.dumps(record, default=_json_default))
+
+
+def _encode(value: Any) -> Optional[str]:
+    """字符串原样保存，便于按IP等取值建立索引；其余类型保存为JSON"""
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, sort_keys=True, ensure_ascii=False)
+
+
+def _is_scalar_list(value: Any) -> bool:
+    return isinstance(value, list) and all(not isinstance(item, (dict, list)) for item in value)
+
+
+def diff_records(old: Dict[str, Any], new: Dict[str, Any],
+                 fields: Optional[Tuple[str, ...]] = None) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """
+    比较两条记录，返回 (字段, 旧值, 新值) 列表
+
+    由字符串等简单值组成的列表（如IPv6地址）按元素比较，每个增加或减少的元素一行，
+    这样查询某个地址的历史时可以直接按值匹配。
+    """
+    rows = []
+    for field in fields or sorted(set(old) | set(new)):
+        old_value, new_value = old.get(field), new.get(field)
+        if old_value == new_value:
+            continue
+        if (old_value is None or _is_scalar_list(old_value)) and (new_value is None or _is_scalar_list(new_value)):
+            old_items, new_items = old_value or [], new_value or []
+            rows.extend((field, _encode(item), None) for item in old_items if item not in new_items)
+            rows.extend((field, None, _encode(item)) for item in new_items if item not in old_items)
+        else:
+            rows.append((field, _encode(old_value), _encode(new_value)))
+    return rows
+
+
+class InventoryStore:
+    """基于SQLite的资源清单和变更历史"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程一个连接，首次使用时才打开，避免在 fork 之前打开数据库"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and getattr(self._local, 'pid', None) == os.getpid():
+            return conn
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        with self._init_lock:
+            if not self._initialized:
+                conn.executescript(SCHEMA)
+                self._initialized = True
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            yield conn
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def snapshot_info(self, tenancy: str, kind: str) -> Optional[Dict[str, Any]]:
+        """
+        返回某类资源最近一次同步的信息
+
+        Returns:
+            taken_at（最近一次成功同步的时间戳，从未成功时为None）、count、
+            error 和 error_at（最近一次失败），从未同步过时返回None
+        """
+        row = self._connect().execute(
+            'SELECT taken_at, count, error, error_at FROM inventory_snapshots WHERE tenancy = ? AND kind = ?',
+            (tenancy, kind)
+        ).fetchone()
+        if row is None:
+            return None
+        taken_at, count, error, error_at = row
+        return {'taken_at': taken_at, 'count': count, 'error': error, 'error_at': error_at}
+
+    def list_resources(self, tenancy: str, kind: str) -> List[Dict[str, Any]]:
+        """返回某类资源的当前清单（不含已删除的资源）"""
+        rows = self._connect().execute(
+            'SELECT data FROM inventory_resources WHERE tenancy = ? AND kind = ? AND deleted_at IS NULL '
+            'ORDER BY first_seen, resource_id',
+            (tenancy, kind)
+        ).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def get_resource(self, tenancy: str, kind: str, resource_id: str) -> Optional[Dict[str, Any]]:
+        """返回单个资源（包括已删除的），附带首次、最近发现时间和删除时间"""
+        row = self._connect().execute(
+            'SELECT data, first_seen, last_seen, deleted_at FROM inventory_resources '
+            'WHERE tenancy = ? AND kind = ? AND resource_id = ?',
+            (tenancy, kind, resource_id)
+        ).fetchone()
+        if row is None:
+            return None
+        data, first_seen, last_seen, deleted_at = row
+        return {'data': json.loads(data), 'first_seen': first_seen, 'last_seen': last_seen,
+                'deleted_at': deleted_at}
+
+    def apply_snapshot(self, tenancy: str, kind: str, records: Dict[str, Dict[str, Any]],
+                       taken_at: Optional[float] = None) -> Dict[str, int]:
+        """
+        用一次完整同步的结果替换某类资源的清单，并记录与上一次的差异
+
+        Args:
+            tenancy: tenancy OCID
+            kind: 资源类型
+            records: 资源ID -> 记录，必须是该类型在租户下的全部资源
+            taken_at: 同步时间，默认当前时间
+
+        Returns:
+            新增、变化和删除的资源数；清单已由更晚开始的同步写入时不做修改，全部为0
+        """
+        taken_at = taken_at or time.time()
+        records = {resource_id: normalize(record) for resource_id, record in records.items()}
+        counts = {CHANGE_ADDED: 0, CHANGE_CHANGED: 0, CHANGE_REMOVED: 0}
+        changes: List[Tuple[str, ChangeRow]] = []
+
+        with self._transaction() as conn:
+            # 并发的同步可能先开始后完成，不能用较旧的结果覆盖较新的清单
+            row = conn.execute(
+                'SELECT taken_at FROM inventory_snapshots WHERE tenancy = ? AND kind = ?', (tenancy, kind)
+            ).fetchone()
+            if row and row[0] is not None and taken_at < row[0]:
+                logging.info(f"忽略过期的资源清单同步结果: {tenancy} {kind}")
+                return counts
+
+            current = {
+                resource_id: json.loads(data)
+                for resource_id, data in conn.execute(
+                    'SELECT resource_id, data FROM inventory_resources '
+                    'WHERE tenancy = ? AND kind = ? AND deleted_at IS NULL',
+                    (tenancy, kind)
+                )
+            }
+
+            upserts = []
+            for resource_id, record in records.items():
+                previous = current.get(resource_id)
+                if previous is None:
+                    counts[CHANGE_ADDED] += 1
+                    changes.append((resource_id, (CHANGE_ADDED, None, None, None)))
+                    # 新资源的地址也写入历史，按IP查询时能找到它最初出现的时间
+                    changes.extend((resource_id, (CHANGE_ADDED,) + row)
+                                   for row in diff_records({}, record, ADDRESS_FIELDS))
+                elif previous != record:
+                    counts[CHANGE_CHANGED] += 1
+                    changes.extend((resource_id, (CHANGE_CHANGED,) + row)
+                                   for row in diff_records(previous, record))
+                upserts.append((tenancy, kind, resource_id, json.dumps(record, sort_keys=True, ensure_ascii=False),
+                                taken_at, taken_at))
+
+            removed = [resource_id for resource_id in current if resource_id not in records]
+            for resource_id in removed:
+                counts[CHANGE_REMOVED] += 1
+                changes.append((resource_id, (CHANGE_REMOVED, None, None, None)))
+                changes.extend((resource_id, (CHANGE_REMOVED,) + row)
+                               for row in diff_records(current[resource_id], {}, ADDRESS_FIELDS))
+
+            # 重新出现的已删除资源保留首次发现时间
+            conn.executemany(
+                'INSERT INTO inventory_resources (tenancy, kind, resource_id, data, first_seen, last_seen) '
+                'VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (tenancy, kind, resource_id) DO UPDATE SET '
+                'data = excluded.data, last_seen = excluded.last_seen, deleted_at = NULL',
+                upserts
+            )
+            conn.executemany(
+                'UPDATE inventory_resources SET deleted_at = ? WHERE tenancy = ? AND kind = ? AND resource_id = ?',
+                [(taken_at, tenancy, kind, resource_id) for resource_id in removed]
+            )
+            conn.executemany(
+                'INSERT INTO inventory_changes '
+                '(tenancy, kind, resource_id, changed_at, change, field, old_value, new_value) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(tenancy, kind, resource_id, taken_at) + row for resource_id, row in changes]
+            )
+            conn.execute(
+                'INSERT INTO inventory_snapshots (tenancy, kind, taken_at, count) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (tenancy, kind) DO UPDATE SET '
+                'taken_at = excluded.taken_at, count = excluded.count, error = NULL, error_at = NULL',
+                (tenancy, kind, taken_at, len(records))
+            )
+
+        if any(counts.values()):
+            logging.info(f"资源清单已更新: {tenancy} {kind}，新增 {counts[CHANGE_ADDED]}，"
+                         f"变化 {counts[CHANGE_CHANGED]}，删除 {counts[CHANGE_REMOVED]}")
+        return counts
+
+    def record_failure(self, tenancy: str, kind: str, error: str) -> None:
+        """记录一次失败的同步，保留上一次成功同步的清单"""
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT INTO inventory_snapshots (tenancy, kind, error, error_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (tenancy, kind) DO UPDATE SET error = excluded.error, error_at = excluded.error_at',
+                (tenancy, kind, error, time.time())
+            )
+
+    def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """
+        获取或续期租约
+
+        Args:
+            name: 租约名称
+            owner: 持有者标识（如 主机名:进程号）
+            ttl: 租约有效期（秒），持有者需在到期前续期
+
+        Returns:
+            租约由 owner 持有时返回True
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute('SELECT owner, expires_at FROM inventory_leases WHERE name = ?', (name,)).fetchone()
+            if row and row[0] != owner and row[1] > now:
+                return False
+            conn.execute(
+                'INSERT INTO inventory_leases (name, owner, expires_at) VALUES (?, ?, ?) '
+                'ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at',
+                (name, owner, now + ttl)
+            )
+            return True
+
+    def release_lease(self, name: str, owner: str) -> None:
+        """释放 owner 持有的租约，其他进程可以立即接管"""
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM inventory_leases WHERE name = ? AND owner = ?', (name, owner))
+
+    @staticmethod
+    def _change_dicts(rows) -> List[Dict[str, Any]]:
+        return [{
+            'tenancy': tenancy,
+            'kind': kind,
+            'resource_id': resource_id,
+            'changed_at': changed_at,
+            'change': change,
+            'field': field,
+            'old_value': old_value,
+            'new_value': new_value
+        } for tenancy, kind, resource_id, changed_at, change, field, old_value, new_value in rows]
+
+    def query_changes(self, tenancy: str, kind: Optional[str] = None, resource_id: Optional[str] = None,
+                      since: Optional[float] = None, limit: int = 200) -> List[Dict[str, Any]]:
+        """按时间倒序返回租户的变更历史，可按资源类型、资源ID和起始时间过滤"""
+        conditions, params = ['tenancy = ?'], [tenancy]
+        if kind:
+            conditions.append('kind = ?')
+            params.append(kind)
+        if resource_id:
+            conditions.append('resource_id = ?')
+            params.append(resource_id)
+        if since:
+            conditions.append('changed_at >= ?')
+            params.append(since)
+        rows = self._connect().execute(
+            'SELECT tenancy, kind, resource_id, changed_at, change, field, old_value, new_value '
+            f"FROM inventory_changes WHERE {' AND '.join(conditions)} ORDER BY changed_at DESC, id DESC LIMIT ?",
+            params + [limit]
+        ).fetchall()
+        return self._change_dicts(rows)
+
+    def query_address(self, address: str, limit: int = 200) -> List[Dict[str, Any]]:
+        """按时间倒序返回某个IP地址被分配或释放的全部记录（跨租户）"""
+        placeholders = ', '.join('?' for _ in ADDRESS_FIELDS)
+        rows = self._connect().execute(
+            'SELECT tenancy, kind, resource_id, changed_at, change, field, old_value, new_value '
+            'FROM inventory_changes '
+            f"WHERE (old_value = ? AND field IN ({placeholders})) OR (new_value = ? AND field IN ({placeholders})) "
+            'ORDER BY changed_at DESC, id DESC LIMIT ?',
+            (address,) + ADDRESS_FIELDS + (address,) + ADDRESS_FIELDS + (limit,)
+        ).fetchall()
+        return self._change_dicts(rows)
+
+    def prune(self, before: float) -> int:
+        """删除早于 before 的变更历史和删除时间早于 before 的资源，返回删除的变更条数"""
+        with self._transaction() as conn:
+            deleted = conn.execute('DELETE FROM inventory_changes WHERE changed_at < ?', (before,)).rowcount
+            conn.execute('DELETE FROM inventory_resources WHERE deleted_at < ?', (before,))
+        return deleted
+
+
+# 全局资源清单仓库
+inventory_store = InventoryStore(config.get(
+    'inventory.store_path',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'inventory.db')
+))
@@ -0,0 +1,210 @@
+"""公网IP更换服务
+
+释放实例主VNIC上的公网IP并分配新的临时公网IP。每一步都按OCI返回的IP状态等待，
+旧IP一释放就分配新IP，新IP一可用就返回，不再固定等待。
+更换在后台任务中执行，可以一次提交跨租户的多台实例，按 ip_rotation.max_workers 限制并发。
+"""
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.config import config
+from app.services.job_service import Job, job_manager
+from app.services.tenant_service import TenantService
+from app.utils.concurrency import iter_completed
+from app.utils.invalidation import instance_key, publishes
+from app.utils.lazy_import import oci
+from app.utils.pagination import list_all
+from app.utils.profiler import traced
+from app.utils.waiter import wait_for_state
+
+# 批量更换时同时处理的实例数
+IP_ROTATION_MAX_WORKERS = config.get('ip_rotation.max_workers', 8)
+# 单台实例更换的最长时间（秒）
+IP_ROTATION_TIMEOUT = config.get('ip_rotation.timeout', 300)
+# 状态轮询的初始间隔和间隔上限（秒）
+IP_ROTATION_POLL_INTERVAL = config.get('ip_rotation.poll_interval', 1)
+IP_ROTATION_MAX_POLL_INTERVAL = config.get('ip_rotation.max_poll_interval', 8)
+
+# 新IP可用的状态：临时IP分配给私有IP后通常直接是 ASSIGNED
+NEW_IP_READY_STATES = ('AVAILABLE', 'ASSIGNED')
+# 旧IP仍占用私有IP时创建新IP返回的状态码
+CONFLICT_STATUS = 409
+
+
+class IPRotationService:
+    def __init__(self):
+        self.tenant_service = TenantService()
+
+    def _poll(self, fetch_state, targets, deadline: float, description: str, **kwargs) -> Optional[str]:
+        return wait_for_state(
+            fetch_state, targets,
+            timeout=max(0.0, deadline - time.monotonic()),
+            initial_interval=IP_ROTATION_POLL_INTERVAL,
+            max_interval=IP_ROTATION_MAX_POLL_INTERVAL,
+            description=description,
+            **kwargs
+        )
+
+    def _find_primary_vnic(self, compute_client, network_client, compartment_id: str, instance_id: str):
+        """返回实例的主VNIC，每个附件只查询一次VNIC"""
+        vnic_attachments = list_all(
+            compute_client.list_vnic_attachments,
+            instance_id=instance_id,
+            compartment_id=compartment_id
+        )
+        for attachment in vnic_attachments:
+            if attachment.lifecycle_state != 'ATTACHED':
+                continue
+            vnic = network_client.get_vnic(attachment.vnic_id).data
+            if vnic.is_primary:
+                return vnic
+        raise Exception(f"找不到实例的主网络接口: {instance_id}")
+
+    @traced()
+    @publishes(lambda args: instance_key(args['tenant_id'], args['instance_id']))
+    def rotate(self, tenant_id: str, instance_id: str, job: Optional[Job] = None) -> Dict[str, Any]:
+        """
+        更换单台实例的公网IP
+
+        Args:
+            tenant_id: 租户ID
+            instance_id: 实例ID
+            job: 所在的后台任务，用于上报进度
+
+        Returns:
+            old_ip、new_ip 和耗时
+        """
+        def progress(message: str) -> None:
+            if job is not None:
+                job.update(progress=message)
+
+        started = time.monotonic()
+        deadline = started + IP_ROTATION_TIMEOUT
+
+        tenant = self.tenant_service.get_tenant_by_id(tenant_id)
+        if not tenant:
+            raise Exception(f"找不到租户: {tenant_id}")
+        compartment_id = tenant['compartment_id'] or tenant['tenancy']
+
+        compute_client = self.tenant_service.get_oci_client(tenant_id, service="compute")
+        network_client = self.tenant_service.get_oci_client(tenant_id, service="network")
+        if not compute_client or not network_client:
+            raise Exception("无法创建OCI客户端")
+
+        progress('查找主网络接口')
+        primary_vnic = self._find_primary_vnic(compute_client, network_client, compartment_id, instance_id)
+        old_ip = primary_vnic.public_ip
+
+        private_ips = list_all(network_client.list_private_ips, vnic_id=primary_vnic.id)
+        if not private_ips:
+            raise Exception(f"找不到实例的私有IP: {instance_id}")
+        private_ip = next((ip for ip in private_ips if getattr(ip, 'is_primary', False)), private_ips[0])
+
+        # 如果已有公共IP，先释放它，并等到它不再占用私有IP
+        if old_ip:
+            try:
+                public_ip = network_client.get_public_ip_by_ip_address(
+                    get_public_ip_by_ip_address_details=oci.core.models.GetPublicIpByIpAddressDetails(
+                        ip_address=old_ip
+                    )
+                ).data
+                if public_ip.lifecycle_state != 'TERMINATED':
+                    progress(f"释放旧公网IP {old_ip}")
+                    network_client.delete_public_ip(public_ip.id)
+                    self._poll(
+                        lambda: network_client.get_public_ip(public_ip.id).data.lifecycle_state,
+                        ('TERMINATED',), deadline, f"旧公网IP {old_ip}",
+                        succeed_on_not_found=True
+                    )
+            except Exception as e:
+                logging.error(f"释放旧公共IP时出错: {str(e)}")
+                raise Exception(f"释放旧公共IP失败: {str(e)}")
+
+        # 分配新的临时公共IP；旧IP刚释放时OCI偶尔仍返回冲突，按轮询间隔重试
+        progress('分配新公网IP')
+        details = oci.core.models.CreatePublicIpDetails(
+            compartment_id=compartment_id,
+            lifetime='EPHEMERAL',
+            private_ip_id=private_ip.id
+        )
+        interval = IP_ROTATION_POLL_INTERVAL
+        while True:
+            try:
+                new_public_ip = network_client.create_public_ip(create_public_ip_details=details).data
+                break
+            except oci.exceptions.ServiceError as e:
+                remaining = deadline - time.monotonic()
+                if e.status != CONFLICT_STATUS or remaining <= 0:
+                    logging.error(f"分配新公共IP时出错: {str(e)}")
+                    raise Exception(f"分配新公共IP失败: {str(e)}")
+                time.sleep(min(interval, remaining))
+                interval = min(interval * 1.5, IP_ROTATION_MAX_POLL_INTERVAL)
+
+        progress(f"等待新公网IP {new_public_ip.ip_address} 可用")
+        self._poll(
+            lambda: network_client.get_public_ip(new_public_ip.id).data.lifecycle_state,
+            NEW_IP_READY_STATES, deadline, f"新公网IP {new_public_ip.ip_address}"
+        )
+
+        elapsed = round(time.monotonic() - started, 1)
+        logging.info(f"实例 {instance_id} 公网IP已更换: {old_ip} -> {new_public_ip.ip_address}，耗时 {elapsed} 秒")
+        return {
+            'tenant_id': str(tenant_id),
+            'instance_id': instance_id,
+            'old_ip': old_ip,
+            'new_ip': new_public_ip.ip_address,
+            'elapsed': elapsed
+        }
+
+    def submit(self, tenant_id: str, instance_id: str) -> Job:
+        """在后台任务中更换单台实例的公网IP"""
+        return job_manager.submit(
+            'change_public_ip',
+            lambda job: self.rotate(tenant_id, instance_id, job),
+            tenant_id=tenant_id,
+            instance_id=instance_id
+        )
+
+    def submit_batch(self, targets: List[Tuple[str, str]]) -> Job:
+        """
+        在一个后台任务中更换多台实例（可跨租户）的公网IP
+
+        Args:
+            targets: (租户ID, 实例ID) 列表
+
+        Returns:
+            Job: 结果中的 results 按完成顺序记录每台实例的新旧IP或错误
+        """
+        targets = list(dict.fromkeys((str(tenant_id), instance_id) for tenant_id, instance_id in targets))
+        if not targets:
+            raise ValueError("没有需要更换IP的实例")
+
+        def run(job: Job) -> Dict[str, Any]:
+            results = []
+            failed = 0
+            for _, result in iter_completed(
+                    lambda target: self._rotate_safely(*target), targets, max_workers=IP_ROTATION_MAX_WORKERS):
+                results.append(result)
+                if result['error']:
+                    failed += 1
+                job.update(progress=f"已完成 {len(results)}/{len(targets)}，失败 {failed}",
+                           results=list(results), completed=len(results), failed=failed)
+            if failed == len(targets):
+                raise Exception(f"全部 {failed} 台实例更换公网IP失败")
+            return {}
+
+        return job_manager.submit('rotate_public_ips', run, total=len(targets), completed=0, failed=0, results=[])
+
+    def _rotate_safely(self, tenant_id: str, instance_id: str) -> Dict[str, Any]:
+        """批量更换中的单台实例，失败时返回错误而不中断其他实例"""
+        try:
+            return dict(self.rotate(tenant_id, instance_id), error=None)
+        except Exception as e:
+            logging.error(f"更换实例 {instance_id} 的公网IP失败: {str(e)}")
+            return {'tenant_id': tenant_id, 'instance_id': instance_id, 'old_ip': None, 'new_ip': None,
+                    'elapsed': None, 'error': str(e)}
+
+
+# 全局公网IP更换服务
+ip_rotation = IPRotationService()
@@ -0,0 +1,156 @@
+"""后台任务服务
+
+将需要长时间等待OCI资源状态变化的操作（创建、终止实例，分离VNIC等）
+放到有上限的后台线程池中执行，请求线程只负责提交任务并立即返回任务ID，
+前端通过 /instance/api/jobs/<job_id> 查询进度和结果。
+"""
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from config.config import config
+from app.utils.metrics import JOBS_IN_FLIGHT
+
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+
+
+class Job:
+    """单个后台任务的状态，任务函数通过 update 上报进度和阶段性结果"""
+
+    def __init__(self, kind: str, tenant_id: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.tenant_id = tenant_id
+        self.status = JOB_PENDING
+        self.progress: Optional[str] = None
+        self.result: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self._lock = threading.Lock()
+
+    def update(self, progress: Optional[str] = None, **result: Any) -> None:
+        """更新进度描述，并把关键字参数合并进结果"""
+        with self._lock:
+            if progress is not None:
+                self.progress = progress
+                logging.info(f"任务 {self.kind}:{self.id} {progress}")
+            self.result.update(result)
+            self.updated_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'id': self.id,
+                'kind': self.kind,
+                'tenant_id': self.tenant_id,
+                'status': self.status,
+                'done': self.status in (JOB_SUCCEEDED, JOB_FAILED),
+                'progress': self.progress,
+                'result': dict(self.result),
+                'error': self.error,
+                'created_at': self.created_at,
+                'updated_at': self.updated_at
+            }
+
+
+class JobManager:
+    """有上限的后台任务执行器"""
+
+    def __init__(self, max_workers: int = 8, retention: int = 3600):
+        """
+        Args:
+            max_workers: 同时执行的后台任务数上限，超出的任务排队等待
+            retention: 已结束任务的保留时间（秒）
+        """
+        self.max_workers = max_workers
+        self.retention = retention
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # 首次提交任务时才创建线程池，避免在 fork 之前创建线程
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='job')
+            return self._executor
+
+    def _purge(self) -> None:
+        """清理过期的已结束任务（调用方需持有锁）"""
+        deadline = time.time() - self.retention
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.status in (JOB_SUCCEEDED, JOB_FAILED) and job.updated_at < deadline]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def submit(self, kind: str, func: Callable[[Job], Any], tenant_id: Optional[str] = None,
+               **initial_result: Any) -> Job:
+        """
+        提交后台任务
+
+        Args:
+            kind: 任务类型，如 create_instance
+            func: 任务函数，参数为 Job；返回字典时合并进任务结果
+            tenant_id: 所属租户ID
+            initial_result: 提交时即可返回给前端的结果字段
+
+        Returns:
+            Job: 新建的任务
+        """
+        job = Job(kind, tenant_id)
+        job.update(progress='等待执行', **initial_result)
+        with self._lock:
+            self._purge()
+            self._jobs[job.id] = job
+        JOBS_IN_FLIGHT.labels(kind).inc()
+        self._get_executor().submit(self._run, job, func)
+        return job
+
+    def _run(self, job: Job, func: Callable[[Job], Any]) -> None:
+        job.status = JOB_RUNNING
+        job.update(progress='执行中')
+        try:
+            result = func(job)
+            if isinstance(result, dict):
+                job.update(**result)
+            job.status = JOB_SUCCEEDED
+            job.update(progress='已完成')
+        except Exception as e:
+            logging.error(f"后台任务 {job.kind}:{job.id} 失败: {str(e)}", exc_info=True)
+            job.error = str(e)
+            job.status = JOB_FAILED
+            job.update(progress='失败')
+        finally:
+            JOBS_IN_FLIGHT.labels(job.kind).dec()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job.to_dict() if job else None
+
+    def active_count(self) -> int:
+        """排队或执行中的任务数"""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status in (JOB_PENDING, JOB_RUNNING))
+
+    def shutdown(self, wait: bool = True) -> None:
+        """停止接收新任务；wait 为 True 时等待排队和执行中的任务结束"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait)
+
+
+# 全局后台任务管理器
+job_manager = JobManager(
+    max_workers=config.get('jobs.max_workers', 8),
+    retention=config.get('jobs.retention', 3600)
+)
@@ -1,7 +1,11 @@
-import oci
+from __future__ import annotations
 import logging
 from typing import Dict, Any, List, Optional, Tuple
 from app.services.tenant_service import TenantService
+from app.utils.concurrency import FANOUT_TIMEOUT, bounded_map
+from app.utils.invalidation import publishes, route_table_key, security_list_key
+from app.utils.lazy_import import oci
+from app.utils.pagination import list_all
 
 class NetworkService:
     def __init__(self):
@@ -27,7 +31,7 @@ class NetworkService:
                 raise ValueError("租户不存在")
             
             network_client = self.tenant_service.get_oci_client(tenant_id, service="network")
-            vcns = network_client.list_vcns(tenant['compartment_id']).data
+            vcns = list_all(network_client.list_vcns, tenant['compartment_id'])
             logging.info(f"找到 {len(vcns)} 个VCN")
             
             return [{
@@ -45,9 +49,10 @@ class NetworkService:
         """获取安全组列表"""
         try:
             network_client, compartment_id = self._get_clients(tenant_id)
-            security_groups = network_client.list_network_security_groups(
+            security_groups = list_all(
+                network_client.list_network_security_groups,
                 compartment_id=compartment_id
-            ).data
+            )
             return [{
                 'id': sg.id,
                 'display_name': sg.display_name,
@@ -63,9 +68,10 @@ class NetworkService:
         """根据区间ID获取安全组列表"""
         try:
             network_client = self.tenant_service.get_oci_client(tenant_id, service="network")
-            security_lists = network_client.list_security_lists(
+            security_lists = list_all(
+                network_client.list_security_lists,
                 compartment_id=compartment_id
-            ).data
+            )
             return [{
                 'id': sl.id,
                 'display_name': sl.display_name,
@@ -275,6 +281,7 @@ class NetworkService:
             logging.error(f"获取安全组规则失败: {str(e)}")
             raise
 
+    @publishes(lambda args: security_list_key(args['tenant_id'], args['security_list_id']))
     def update_security_list_rules(
         self,
         tenant_id: str,
@@ -351,10 +358,11 @@ class NetworkService:
         """获取路由表列表"""
         try:
             network_client, compartment_id = self._get_clients(tenant_id)
-            route_tables = network_client.list_route_tables(
+            route_tables = list_all(
+                network_client.list_route_tables,
                 compartment_id=compartment_id,
                 vcn_id=vcn_id
-            ).data
+            )
             return [{
                 'id': rt.id,
                 'display_name': rt.display_name,
@@ -394,6 +402,7 @@ class NetworkService:
             logging.error(f"获取路由表详情失败: {str(e)}")
             raise
 
+    @publishes(lambda args: route_table_key(args['tenant_id'], args['route_table_id']))
     def update_route_table(self, tenant_id: str, route_table_id: str, route_rules: List[Dict[str, Any]]) -> Dict[str, Any]:
         """更新路由表规则"""
         try:
@@ -446,59 +455,32 @@ class NetworkService:
             if not tenant:
                 raise ValueError("租户不存在")
 
-            entities = []
-            
-            # 获取互联网网关
-            internet_gateways = network_client.list_internet_gateways(
-                compartment_id=tenant['compartment_id'],
-                vcn_id=vcn_id
-            ).data
-            for ig in internet_gateways:
-                entities.append({
-                    'id': ig.id,
-                    'display_name': ig.display_name,
-                    'type': 'Internet Gateway',
-                    'lifecycle_state': ig.lifecycle_state
-                })
-
-            # 获取NAT网关
-            nat_gateways = network_client.list_nat_gateways(
-                compartment_id=tenant['compartment_id'],
-                vcn_id=vcn_id
-            ).data
-            for ng in nat_gateways:
-                entities.append({
-                    'id': ng.id,
-                    'display_name': ng.display_name,
-                    'type': 'NAT Gateway',
-                    'lifecycle_state': ng.lifecycle_state
-                })
-
-            # 获取服务网关
-            service_gateways = network_client.list_service_gateways(
-                compartment_id=tenant['compartment_id'],
-                vcn_id=vcn_id
-            ).data
-            for sg in service_gateways:
-                entities.append({
-                    'id': sg.id,
-                    'display_name': sg.display_name,
-                    'type': 'Service Gateway',
-                    'lifecycle_state': sg.lifecycle_state
-                })
+            # 四类网关相互独立，并发获取
+            gateway_types = [
+                (network_client.list_internet_gateways, 'Internet Gateway'),
+                (network_client.list_nat_gateways, 'NAT Gateway'),
+                (network_client.list_service_gateways, 'Service Gateway'),
+                (network_client.list_local_peering_gateways, 'Local Peering Gateway')
+            ]
+            results = bounded_map(
+                lambda item: list_all(
+                    item[0],
+                    compartment_id=tenant['compartment_id'],
+                    vcn_id=vcn_id
+                ),
+                gateway_types,
+                timeout=FANOUT_TIMEOUT
+            )
 
-            # 获取本地对等网关
-            local_peering_gateways = network_client.list_local_peering_gateways(
-                compartment_id=tenant['compartment_id'],
-                vcn_id=vcn_id
-            ).data
-            for lpg in local_peering_gateways:
-                entities.append({
-                    'id': lpg.id,
-                    'display_name': lpg.display_name,
-                    'type': 'Local Peering Gateway',
-                    'lifecycle_state': lpg.lifecycle_state
-                })
+            entities = []
+            for (_, entity_type), gateways in zip(gateway_types, results):
+                for gateway in gateways:
+                    entities.append({
+                        'id': gateway.id,
+                        'display_name': gateway.display_name,
+                        'type': entity_type,
+                        'lifecycle_state': gateway.lifecycle_state
+                    })
 
             return entities
 
@@ -1,29 +1,75 @@
-import oci
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Iterator, Optional, List, Tuple
+from config.config import config
+from config.tenant_registry import tenant_registry
 from .tenant_service import TenantService
+from app.utils.cache import SnapshotCache
+from app.utils.concurrency import bounded_map, iter_completed
+from app.utils.invalidation import LIMITS_USAGE, ResourceKey, invalidation_bus
+from app.utils.lazy_import import oci
+from app.utils.pagination import list_all
+from app.utils.profiler import traced
+
+# 并发查询资源可用性的线程数
+QUOTA_MAX_WORKERS = config.get('quota.max_workers', 8)
+# 余量汇总关注的限制项：(服务名, 限制名)
+HEADROOM_LIMITS = (
+    ("compute", "standard-a1-core-count"),
+    ("compute", "standard-a1-memory-count"),
+    ("compute", "standard-e2-micro-core-count"),
+    ("block-storage", "total-storage-gb"),
+)
+
+# 配额快照，按 (租户ID, 服务名, 可用性域) 缓存
+quota_snapshots = SnapshotCache(
+    'quota',
+    ttl=config.get('quota.cache_ttl', 600),
+    max_stale=config.get('quota.cache_max_stale', 86400)
+)
+# 可用性域和服务列表几乎不变，按 (租户ID, 类型) 缓存
+catalog_snapshots = SnapshotCache('quota-catalog', ttl=config.get('quota.catalog_ttl', 86400))
+
+# 租户ID是配置中的序号，租户配置变化后整体失效
+tenant_registry.add_listener(quota_snapshots.clear)
+tenant_registry.add_listener(catalog_snapshots.clear)
+
+
+def _evict_quotas(keys: List[ResourceKey]) -> None:
+    """创建、删除或扩容资源后清除该租户的配额快照"""
+    for tenant_id in {key.tenant_id for key in keys if key.kind == LIMITS_USAGE}:
+        quota_snapshots.invalidate(predicate=lambda k, tenant_id=tenant_id: k[0] == tenant_id)
+
+
+invalidation_bus.subscribe(_evict_quotas)
 
 class QuotaService:
     def __init__(self):
         self.tenant_service = TenantService()
 
+    def _get_client(self, tenant_id: str, service: str):
+        """从客户端池获取OCI客户端"""
+        client = self.tenant_service.get_oci_client(tenant_id, service=service)
+        if not client:
+            raise ValueError(f"无法创建 {service} 客户端")
+        return client
+
+    @traced()
     def get_availability_domains(self, tenant_id: str) -> List[Dict[str, str]]:
-        """获取租户的可用性域列表"""
+        """获取租户的可用性域列表（缓存）"""
+        domains, _ = catalog_snapshots.get(
+            (str(tenant_id), 'availability_domains'),
+            lambda: self._load_availability_domains(tenant_id)
+        )
+        return domains
+
+    def _load_availability_domains(self, tenant_id: str) -> List[Dict[str, str]]:
         tenant_config = self.tenant_service.get_tenant_by_id(tenant_id)
         if not tenant_config:
             logging.error(f"未找到租户配置: {tenant_id}")
             raise ValueError(f"未找到租户配置: {tenant_id}")
         
-        config = {
-            "user": tenant_config["user_ocid"],
-            "key_file": tenant_config["key_file"],
-            "fingerprint": tenant_config["fingerprint"],
-            "tenancy": tenant_config["tenancy"],
-            "region": tenant_config["region"]
-        }
-        
         try:
-            identity_client = oci.identity.IdentityClient(config)
+            identity_client = self._get_client(tenant_id, "identity")
             ad_list = identity_client.list_availability_domains(
                 compartment_id=tenant_config["compartment_id"]
             ).data
@@ -32,148 +78,277 @@ class QuotaService:
             logging.error(f"获取可用性域列表失败: {str(e)}")
             raise
 
+    @traced()
     def get_services(self, tenant_id: str) -> List[Dict[str, str]]:
-        """获取服务列表"""
+        """获取服务列表（缓存）"""
+        services, _ = catalog_snapshots.get(
+            (str(tenant_id), 'services'),
+            lambda: self._load_services(tenant_id)
+        )
+        return services
+
+    def _load_services(self, tenant_id: str) -> List[Dict[str, str]]:
         tenant_config = self.tenant_service.get_tenant_by_id(tenant_id)
         if not tenant_config:
             logging.error(f"未找到租户配置: {tenant_id}")
             raise ValueError(f"未找到租户配置: {tenant_id}")
         
-        config = {
-            "user": tenant_config["user_ocid"],
-            "key_file": tenant_config["key_file"],
-            "fingerprint": tenant_config["fingerprint"],
-            "tenancy": tenant_config["tenancy"],
-            "region": tenant_config["region"]
-        }
-        
         try:
-            limits_client = oci.limits.LimitsClient(config)
-            services = limits_client.list_services(
+            limits_client = self._get_client(tenant_id, "limits")
+            services = list_all(
+                limits_client.list_services,
                 compartment_id=tenant_config["tenancy"]
-            ).data
+            )
             
             return [{"name": service.name, "description": service.description} for service in services]
         except Exception as e:
             logging.error(f"获取服务列表失败: {str(e)}")
             raise
 
-    def get_service_quotas(self, tenant_id: str, service_name: str, availability_domain: Optional[str] = None) -> Dict[str, Any]:
-        """获取特定服务的配额信息"""
+    def _list_limit_values(self, limits_client, tenancy: str, service_name: str,
+                           availability_domain: Optional[str] = None) -> List[Any]:
+        """获取服务的全部限制值（处理分页）"""
+        kwargs = {
+            "compartment_id": tenancy,
+            "service_name": service_name
+        }
+        if availability_domain:
+            kwargs["availability_domain"] = availability_domain
+        return list_all(limits_client.list_limit_values, **kwargs)
+
+    def _build_limit_row(self, limits_client, tenancy: str, service_name: str, limit) -> Dict[str, Any]:
+        """查询单个限制值的资源使用情况并组装成一行配额数据"""
+        limit_data = {
+            "service_name": service_name,
+            "limit_name": limit.name,
+            "scope_type": limit.scope_type,
+            "availability_domain": limit.availability_domain or "全局",
+            "quota": int(limit.value)  # 确保配额是整数
+        }
+        
+        # 尝试获取资源使用情况（限流和重试由客户端统一处理）
+        try:
+            usage = limits_client.get_resource_availability(
+                compartment_id=tenancy,
+                service_name=service_name,
+                limit_name=limit.name,
+                availability_domain=limit.availability_domain
+            ).data
+            
+            if usage:
+                used = int(usage.used) if hasattr(usage, 'used') else 0
+                available = int(usage.available) if hasattr(usage, 'available') else limit.value
+                limit_data.update({
+                    "available": available,
+                    "used": used,
+                })
+            else:
+                limit_data.update({
+                    "available": int(limit.value),
+                    "used": 0
+                })
+        except Exception as e:
+            logging.debug(f"获取资源 {limit.name} 的使用情况失败（这可能是正常的）: {str(e)}")
+            limit_data.update({
+                "available": int(limit.value),
+                "used": 0
+            })
+        
+        # 添加使用率
+        if limit_data["quota"] > 0:
+            limit_data["usage_rate"] = (limit_data["used"] / limit_data["quota"]) * 100
+        else:
+            limit_data["usage_rate"] = 0
+        return limit_data
+
+    def iter_service_quotas(self, tenant_id: str, service_name: str,
+                            availability_domain: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        并发查询服务的配额信息，按完成顺序逐条产出
+
+        第一条产出为 {"total": 需要查询的限制数}，之后每条为一行配额数据。
+        """
         tenant_config = self.tenant_service.get_tenant_by_id(tenant_id)
         if not tenant_config:
             logging.error(f"未找到租户配置: {tenant_id}")
             raise ValueError(f"未找到租户配置: {tenant_id}")
         
-        config = {
-            "user": tenant_config["user_ocid"],
-            "key_file": tenant_config["key_file"],
-            "fingerprint": tenant_config["fingerprint"],
-            "tenancy": tenant_config["tenancy"],
-            "region": tenant_config["region"]
-        }
+        limits_client = self._get_client(tenant_id, "limits")
+        tenancy = tenant_config["tenancy"]
         
+        limits = self._list_limit_values(limits_client, tenancy, service_name, availability_domain)
+        logging.debug(f"获取到的限制值: {limits}")
+        
+        # 跳过配额为0的项目
+        limits = [limit for limit in limits if limit.value and int(limit.value) != 0]
+        yield {"total": len(limits)}
+        
+        for _, limit_data in iter_completed(
+            lambda limit: self._build_limit_row(limits_client, tenancy, service_name, limit),
+            limits,
+            max_workers=QUOTA_MAX_WORKERS
+        ):
+            yield limit_data
+
+    @staticmethod
+    def _quota_key(tenant_id: str, service_name: str, availability_domain: Optional[str]):
+        return str(tenant_id), service_name, availability_domain or ''
+
+    @traced()
+    def get_service_quotas(self, tenant_id: str, service_name: str, availability_domain: Optional[str] = None,
+                           force: bool = False) -> Dict[str, Any]:
+        """
+        获取特定服务的配额信息（快照缓存）
+
+        快照过期后先返回旧数据并在后台刷新，结果中的 last_refreshed 和 stale 表示数据的新鲜程度。
+        force 为 True 时忽略缓存重新查询。
+        """
+        result, meta = quota_snapshots.get(
+            self._quota_key(tenant_id, service_name, availability_domain),
+            lambda: self._load_service_quotas(tenant_id, service_name, availability_domain),
+            force=force
+        )
+        return dict(result, **meta)
+
+    def get_cached_service_quotas(self, tenant_id: str, service_name: str,
+                                  availability_domain: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """有可用快照时返回快照（过期则触发后台刷新），否则返回None"""
+        key = self._quota_key(tenant_id, service_name, availability_domain)
+        snapshot = quota_snapshots.peek(key)
+        if snapshot is None or (quota_snapshots.max_stale is not None and snapshot.age() > quota_snapshots.max_stale):
+            return None
+        return self.get_service_quotas(tenant_id, service_name, availability_domain)
+
+    def quota_generation(self, tenant_id: str, service_name: str,
+                         availability_domain: Optional[str] = None) -> Tuple[int, int]:
+        """在缓存之外查询（如流式查询）开始前取得快照代数，保存结果时传给 store_service_quotas"""
+        return quota_snapshots.generation(self._quota_key(tenant_id, service_name, availability_domain))
+
+    def store_service_quotas(self, tenant_id: str, service_name: str, availability_domain: Optional[str],
+                             service_limits: List[Dict[str, Any]],
+                             generation: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+        """
+        保存一次完整查询（如流式查询）的结果，返回带刷新时间的配额信息
+
+        查询期间配额快照被失效（例如创建或删除了实例）时，结果只返回给本次调用，不写入缓存
+        """
+        result = self._service_quota_result(service_name, service_limits)
+        meta = quota_snapshots.put(self._quota_key(tenant_id, service_name, availability_domain), result,
+                                   generation=generation)
+        return dict(result, **meta)
+
+    @traced()
+    def get_headroom(self, tenant_id: str, force: bool = False) -> Dict[str, Any]:
+        """
+        获取常用资源的配额余量（快照缓存）
+
+        只查询 HEADROOM_LIMITS 中的限制项，按限制名汇总所有可用性域的配额、已用和可用量。
+        """
+        result, meta = quota_snapshots.get(
+            self._quota_key(tenant_id, 'headroom', None),
+            lambda: self._load_headroom(tenant_id),
+            force=force
+        )
+        return dict(result, **meta)
+
+    def _load_headroom(self, tenant_id: str) -> Dict[str, Any]:
+        tenant_config = self.tenant_service.get_tenant_by_id(tenant_id)
+        if not tenant_config:
+            raise ValueError(f"未找到租户配置: {tenant_id}")
+
+        limits_client = self._get_client(tenant_id, "limits")
+        tenancy = tenant_config["tenancy"]
+
+        wanted = {}
+        for service_name, limit_name in HEADROOM_LIMITS:
+            wanted.setdefault(service_name, set()).add(limit_name)
+
+        def list_values(service_name):
+            values = self._list_limit_values(limits_client, tenancy, service_name)
+            return [(service_name, value) for value in values if value.name in wanted[service_name]]
+
+        values = [item for items in bounded_map(list_values, list(wanted), max_workers=QUOTA_MAX_WORKERS)
+                  for item in items]
+        rows = bounded_map(
+            lambda item: self._build_limit_row(limits_client, tenancy, item[0], item[1]),
+            values,
+            max_workers=QUOTA_MAX_WORKERS
+        )
+
+        # 按限制名汇总各可用性域
+        totals = {}
+        for row in rows:
+            total = totals.setdefault(row["limit_name"], {
+                "service_name": row["service_name"],
+                "limit_name": row["limit_name"],
+                "quota": 0,
+                "used": 0,
+                "available": 0
+            })
+            for field in ("quota", "used", "available"):
+                total[field] += row[field]
+        headroom = [totals[limit_name] for _, limit_name in HEADROOM_LIMITS if limit_name in totals]
+        return {"headroom": headroom}
+
+    @staticmethod
+    def _service_quota_result(service_name: str, service_limits: List[Dict[str, Any]]) -> Dict[str, Any]:
+        # 按使用率降序排序
+        service_limits.sort(key=lambda x: x["usage_rate"], reverse=True)
+        return {
+            "service_limits": service_limits,
+            "service_name": service_name,
+            "total_limits": len(service_limits)
+        }
+
+    def _load_service_quotas(self, tenant_id: str, service_name: str,
+                             availability_domain: Optional[str] = None) -> Dict[str, Any]:
         try:
-            limits_client = oci.limits.LimitsClient(config)
+            rows = self.iter_service_quotas(tenant_id, service_name, availability_domain)
+            next(rows)
+            service_limits = list(rows)
             
-            # 获取服务的限制值（处理分页）
-            kwargs = {
-                "compartment_id": tenant_config["tenancy"],
-                "service_name": service_name
+            logging.info(f"成功获取服务 {service_name} 的配额信息，共 {len(service_limits)} 条有效记录")
+            return self._service_quota_result(service_name, service_limits)
+            
+        except Exception as e:
+            logging.error(f"获取服务配额失败: {str(e)}")
+            raise
+
+    def _get_limit_availability(self, limits_client, tenancy: str, limit,
+                                availability_domain: Optional[str]) -> Optional[Dict[str, Any]]:
+        """查询单个限制定义的资源可用性，失败时返回None"""
+        try:
+            # 获取资源可用性
+            params = {
+                "service_name": limit.service_name,
+                "limit_name": limit.name,
+                "compartment_id": tenancy
             }
-            if availability_domain:
-                kwargs["availability_domain"] = availability_domain
-                
-            # 使用分页获取所有限制值
-            limits = []
-            next_page = None
-            while True:
-                if next_page:
-                    kwargs["page"] = next_page
-                    
-                response = limits_client.list_limit_values(**kwargs)
-                limits.extend(response.data)
-                
-                # 检查是否有下一页
-                if response.has_next_page:
-                    next_page = response.next_page
-                else:
-                    break
-                    
-            logging.debug(f"获取到的限制值: {limits}")
             
-            # 处理限制值
-            service_limits = []
-            for limit in limits:
-                # 跳过配额为0的项目
-                if not limit.value or int(limit.value) == 0:
-                    logging.debug(f"跳过配额为0的项目: {limit.name}")
-                    continue
-                    
-                limit_data = {
-                    "service_name": service_name,
-                    "limit_name": limit.name,
-                    "scope_type": limit.scope_type,
-                    "availability_domain": limit.availability_domain or "全局",
-                    "quota": int(limit.value)  # 确保配额是整数
-                }
-                
-                # 尝试获取资源使用情况
-                try:
-                    usage = limits_client.get_resource_availability(
-                        compartment_id=tenant_config["tenancy"],
-                        service_name=service_name,
-                        limit_name=limit.name,
-                        availability_domain=limit.availability_domain
-                    ).data
-                    
-                    if usage:
-                        used = int(usage.used) if hasattr(usage, 'used') else 0
-                        available = int(usage.available) if hasattr(usage, 'available') else limit.value
-                        
-                        # 只有当配额为0时才跳过，不再过滤使用量为0的项目
-                        if limit_data["quota"] == 0:
-                            logging.debug(f"跳过配额为0的项目: {limit.name}")
-                            continue
-                            
-                        limit_data.update({
-                            "available": available,
-                            "used": used,
-                        })
-                    else:
-                        limit_data.update({
-                            "available": int(limit.value),
-                            "used": 0
-                        })
-                except Exception as e:
-                    logging.debug(f"获取资源 {limit.name} 的使用情况失败（这可能是正常的）: {str(e)}")
-                    limit_data.update({
-                        "available": int(limit.value),
-                        "used": 0
-                    })
-                
-                # 添加使用率
-                if limit_data["quota"] > 0:
-                    limit_data["usage_rate"] = (limit_data["used"] / limit_data["quota"]) * 100
-                else:
-                    limit_data["usage_rate"] = 0
-                
-                service_limits.append(limit_data)
+            # 只有当scope_type为AD时才添加availability_domain参数
+            if limit.scope_type == "AD" and availability_domain:
+                params["availability_domain"] = availability_domain
             
-            # 按使用率降序排序
-            service_limits.sort(key=lambda x: x["usage_rate"], reverse=True)
+            availability = limits_client.get_resource_availability(**params).data
             
-            logging.info(f"成功获取服务 {service_name} 的配额信息，共 {len(service_limits)} 条有效记录")
             return {
-                "service_limits": service_limits,
-                "service_name": service_name,
-                "total_limits": len(service_limits)
+                "service_name": limit.service_name,
+                "limit_name": limit.name,
+                "description": limit.description,
+                "scope_type": limit.scope_type,
+                "available": availability.available,
+                "used": getattr(availability, 'used', 0),
+                "quota": getattr(availability, 'fractional_availability', 0),
+                "availability_domain": availability_domain if availability_domain and limit.scope_type == "AD" else "全局"
             }
-            
+        except oci.exceptions.ServiceError as se:
+            # 记录详细错误但继续处理其他限制
+            logging.warning(f"获取资源 {limit.name} 的使用量失败 (ServiceError): {str(se)}")
         except Exception as e:
-            logging.error(f"获取服务配额失败: {str(e)}")
-            raise
+            logging.warning(f"处理资源 {limit.name} 时发生错误: {str(e)}")
+        return None
 
+    @traced()
     def get_tenant_quotas(self, tenant_id: str, availability_domain: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """获取租户的配额信息"""
         tenant_config = self.tenant_service.get_tenant_by_id(tenant_id)
@@ -181,24 +356,17 @@ class QuotaService:
             logging.error(f"未找到租户配置: {tenant_id}")
             raise ValueError(f"未找到租户配置: {tenant_id}")
         
-        config = {
-            "user": tenant_config["user_ocid"],
-            "key_file": tenant_config["key_file"],
-            "fingerprint": tenant_config["fingerprint"],
-            "tenancy": tenant_config["tenancy"],
-            "region": tenant_config["region"]
-        }
-        
         try:
             # 创建Limits客户端
-            limits_client = oci.limits.LimitsClient(config)
+            limits_client = self._get_client(tenant_id, "limits")
+            tenancy = tenant_config["tenancy"]
             
             # 获取服务限制定义
-            service_limits = []
             try:
-                limit_definitions = limits_client.list_limit_definitions(
-                    compartment_id=tenant_config["tenancy"]
-                ).data
+                limit_definitions = list_all(
+                    limits_client.list_limit_definitions,
+                    compartment_id=tenancy
+                )
                 logging.info(f"成功获取到 {len(limit_definitions)} 个限制定义")
             except oci.exceptions.ServiceError as se:
                 logging.error(f"获取限制定义失败 (ServiceError): {str(se)}")
@@ -207,43 +375,15 @@ class QuotaService:
                 logging.error(f"获取限制定义失败: {str(e)}")
                 raise
             
-            # 获取每个限制的具体值
-            error_count = 0
-            for limit in limit_definitions:
-                try:
-                    # 获取资源可用性
-                    params = {
-                        "service_name": limit.service_name,
-                        "limit_name": limit.name,
-                        "compartment_id": tenant_config["tenancy"]
-                    }
-                    
-                    # 只有当scope_type为AD时才添加availability_domain参数
-                    if limit.scope_type == "AD" and availability_domain:
-                        params["availability_domain"] = availability_domain
-                    
-                    availability = limits_client.get_resource_availability(**params).data
-                    
-                    service_limits.append({
-                        "service_name": limit.service_name,
-                        "limit_name": limit.name,
-                        "description": limit.description,
-                        "scope_type": limit.scope_type,
-                        "available": availability.available,
-                        "used": getattr(availability, 'used', 0),
-                        "quota": getattr(availability, 'fractional_availability', 0),
-                        "availability_domain": availability_domain if availability_domain and limit.scope_type == "AD" else "全局"
-                    })
-                except oci.exceptions.ServiceError as se:
-                    # 记录详细错误但继续处理其他限制
-                    error_count += 1
-                    logging.warning(f"获取资源 {limit.name} 的使用量失败 (ServiceError): {str(se)}")
-                    continue
-                except Exception as e:
-                    error_count += 1
-                    logging.warning(f"处理资源 {limit.name} 时发生错误: {str(e)}")
-                    continue
+            # 并发获取每个限制的具体值，保持限制定义的顺序
+            results = bounded_map(
+                lambda limit: self._get_limit_availability(limits_client, tenancy, limit, availability_domain),
+                limit_definitions,
+                max_workers=QUOTA_MAX_WORKERS
+            )
+            service_limits = [row for row in results if row]
             
+            error_count = len(results) - len(service_limits)
             if error_count > 0:
                 logging.warning(f"处理过程中有 {error_count} 个资源发生错误")
             
@@ -252,12 +392,13 @@ class QuotaService:
                 return {"service_limits": [], "custom_quotas": []}
             
             # 获取自定义配额
-            quotas_client = oci.limits.QuotasClient(config)
+            quotas_client = self._get_client(tenant_id, "quotas")
             custom_quotas = []
             try:
-                quotas = quotas_client.list_quotas(
+                quotas = list_all(
+                    quotas_client.list_quotas,
                     compartment_id=tenant_config["compartment_id"]
-                ).data
+                )
                 
                 for quota in quotas:
                     custom_quotas.append({
@@ -0,0 +1,61 @@
+"""服务注册表
+
+路由模块在导入时只拿到服务的代理，第一次调用服务方法时才创建服务实例，
+同一个服务类在进程内只创建一次，由所有路由模块共享。这样注册蓝图时不会创建任何服务，
+也不会因此在 fork 之前创建目录、读取文件或导入OCI SDK。
+
+    from app.services.registry import services
+    instance_service = services.lazy(InstanceService)
+"""
+import threading
+from typing import Any, Dict, Type, TypeVar
+
+T = TypeVar('T')
+
+
+class LazyService:
+    """服务代理，首次访问属性时从注册表取得（必要时创建）服务实例"""
+
+    def __init__(self, registry: 'ServiceRegistry', cls: Type[Any]):
+        self._registry = registry
+        self._cls = cls
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._registry.get(self._cls), name)
+
+    def __repr__(self) -> str:
+        return f"<lazy service {self._cls.__name__}>"
+
+
+class ServiceRegistry:
+    """按类创建并缓存服务实例"""
+
+    def __init__(self):
+        # 服务的构造函数可能再通过注册表取得其他服务，使用可重入锁
+        self._lock = threading.RLock()
+        self._instances: Dict[Type[Any], Any] = {}
+
+    def get(self, cls: Type[T]) -> T:
+        """返回 cls 的共享实例，首次调用时创建"""
+        instance = self._instances.get(cls)
+        if instance is not None:
+            return instance
+        with self._lock:
+            instance = self._instances.get(cls)
+            if instance is None:
+                instance = cls()
+                self._instances[cls] = instance
+            return instance
+
+    def lazy(self, cls: Type[T]) -> T:
+        """返回 cls 的代理，用于模块级变量"""
+        return LazyService(self, cls)  # type: ignore[return-value]
+
+    def clear(self) -> None:
+        """丢弃已创建的服务实例（例如 fork 之后）"""
+        with self._lock:
+            self._instances.clear()
+
+
+# 全局服务注册表
+services = ServiceRegistry()
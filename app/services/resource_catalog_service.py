@@ -0,0 +1,181 @@
+"""实例资源目录
+
+创建实例和修改网络时需要的可用性域、镜像、子网和规格列表。
+四类资源并发查询，并按类型使用不同的缓存时间：
+可用性域几乎不变，规格很少变化，镜像每天更新，子网可能随时被修改。
+"""
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Tuple
+
+from config.config import config
+from config.tenant_registry import tenant_registry
+from app.services.quota_service import QuotaService
+from app.services.tenant_service import TenantService
+from app.utils.cache import SnapshotCache
+from app.utils.concurrency import FANOUT_TIMEOUT, bounded_map, run_parallel
+from app.utils.pagination import list_all
+from app.utils.profiler import traced
+
+# 镜像列表包含的操作系统
+IMAGE_OPERATING_SYSTEMS = ["Oracle Linux", "CentOS", "Canonical Ubuntu"]
+
+# 各类资源的缓存，按租户ID缓存；可用性域复用配额服务的目录缓存
+image_snapshots = SnapshotCache('resource-images', ttl=config.get('resources.images_ttl', 21600))
+subnet_snapshots = SnapshotCache('resource-subnets', ttl=config.get('resources.subnets_ttl', 300))
+shape_snapshots = SnapshotCache('resource-shapes', ttl=config.get('resources.shapes_ttl', 86400))
+
+for _cache in (image_snapshots, subnet_snapshots, shape_snapshots):
+    tenant_registry.add_listener(_cache.clear)
+
+
+class ResourceCatalogService:
+    def __init__(self):
+        self.tenant_service = TenantService()
+        self.quota_service = QuotaService()
+
+    def _get_tenant(self, tenant_id: str) -> Dict[str, Any]:
+        tenant = self.tenant_service.get_tenant_by_id(tenant_id)
+        if not tenant:
+            raise Exception("租户不存在")
+        return tenant
+
+    def _get_client(self, tenant_id: str, service: str):
+        client = self.tenant_service.get_oci_client(tenant_id, service=service)
+        if not client:
+            raise Exception(f"无法创建 {service} 客户端")
+        return client
+
+    @traced()
+    def _load_images(self, tenant_id: str) -> List[Dict[str, Any]]:
+        """并发获取各操作系统的镜像"""
+        tenant = self._get_tenant(tenant_id)
+        compute_client = self._get_client(tenant_id, "compute")
+
+        results = bounded_map(
+            lambda os_name: list_all(
+                compute_client.list_images,
+                compartment_id=tenant['compartment_id'],
+                operating_system=os_name,
+                sort_by="TIMECREATED",
+                sort_order="DESC"
+            ),
+            IMAGE_OPERATING_SYSTEMS,
+            timeout=FANOUT_TIMEOUT
+        )
+        images = [image for os_images in results for image in os_images]
+        logging.debug(f"获取到系统镜像: {[image.display_name for image in images]}")
+
+        return [
+            {
+                'id': image.id,
+                'name': f"{image.operating_system} {image.operating_system_version} - {image.display_name}",
+                'size': image.size_in_mbs // 1024  # 转换为GB
+            } for image in sorted(images, key=lambda x: (x.operating_system, x.operating_system_version))
+        ]
+
+    @traced()
+    def _load_subnets(self, tenant_id: str) -> List[Dict[str, Any]]:
+        """获取所有VCN，再并发获取每个VCN的子网"""
+        tenant = self._get_tenant(tenant_id)
+        network_client = self._get_client(tenant_id, "network")
+
+        vcns = list_all(
+            network_client.list_vcns,
+            compartment_id=tenant['compartment_id']
+        )
+        logging.debug(f"获取到VCN: {[vcn.display_name for vcn in vcns]}")
+
+        def list_vcn_subnets(vcn):
+            try:
+                return list_all(
+                    network_client.list_subnets,
+                    compartment_id=tenant['compartment_id'],
+                    vcn_id=vcn.id
+                )
+            except Exception as e:
+                logging.error(f"获取VCN {vcn.display_name} 的子网失败: {str(e)}", exc_info=True)
+                return []
+
+        subnets = []
+        for vcn, vcn_subnets in zip(vcns, bounded_map(list_vcn_subnets, vcns, timeout=FANOUT_TIMEOUT)):
+            for subnet in vcn_subnets:
+                name = f"{vcn.display_name} - {subnet.display_name}"
+                subnets.append({
+                    'id': subnet.id,
+                    'name': name,
+                    'cidr_block': f"{name} ({subnet.cidr_block})"
+                })
+        return subnets
+
+    @traced()
+    def _load_shapes(self, tenant_id: str) -> List[Dict[str, Any]]:
+        tenant = self._get_tenant(tenant_id)
+        compute_client = self._get_client(tenant_id, "compute")
+
+        shapes = list_all(
+            compute_client.list_shapes,
+            compartment_id=tenant['compartment_id']
+        )
+        logging.debug(f"获取到实例规格: {[shape.shape for shape in shapes]}")
+
+        return [
+            {
+                'name': shape.shape,
+                'ocpus': shape.ocpus,
+                'memory_in_gbs': shape.memory_in_gbs,
+                'networking_bandwidth_in_gbps': shape.networking_bandwidth_in_gbps,
+                'processor_description': shape.processor_description,
+                'is_flex': shape.shape.endswith('.Flex')
+            } for shape in shapes
+        ]
+
+    def _get_subnets(self, tenant_id: str, force: bool) -> List[Dict[str, Any]]:
+        try:
+            subnets, _ = subnet_snapshots.get(str(tenant_id), lambda: self._load_subnets(tenant_id), force=force)
+            return subnets
+        except Exception as e:
+            # 与原实现一致：获取VCN失败时返回空的子网列表，不影响其他资源
+            logging.error(f"获取VCN列表失败: {str(e)}", exc_info=True)
+            return []
+
+    @traced()
+    def get_resources(self, tenant_id: str, force: bool = False) -> Tuple[Dict[str, Any], str]:
+        """
+        获取可用性域、镜像、子网和规格
+
+        Args:
+            tenant_id: 租户ID
+            force: 忽略缓存重新查询（可用性域除外）
+
+        Returns:
+            (资源目录, ETag)，ETag 由内容计算，内容不变时保持不变
+        """
+        self._get_tenant(tenant_id)
+        key = str(tenant_id)
+
+        availability_domains, images, subnets, shapes = run_parallel(
+            lambda: self.quota_service.get_availability_domains(tenant_id),
+            lambda: image_snapshots.get(key, lambda: self._load_images(tenant_id), force=force)[0],
+            lambda: self._get_subnets(tenant_id, force),
+            lambda: shape_snapshots.get(key, lambda: self._load_shapes(tenant_id), force=force)[0],
+            timeout=FANOUT_TIMEOUT
+        )
+
+        result = {
+            'availability_domains': availability_domains,
+            'images': images,
+            'subnets': subnets,
+            'shapes': shapes
+        }
+        return result, self.compute_etag(result)
+
+    @staticmethod
+    def compute_etag(result: Dict[str, Any]) -> str:
+        payload = json.dumps(result, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+# 全局资源目录
+resource_catalog = ResourceCatalogService()
@@ -1,7 +1,8 @@
 """订阅服务模块"""
-import oci
 from typing import List, Dict, Any
 from app.services.tenant_service import TenantService
+from app.utils.lazy_import import oci
+from app.utils.pagination import list_all
 
 class SubscriptionService:
     """订阅服务类"""
@@ -25,26 +26,21 @@ class SubscriptionService:
             if not tenant_config:
                 raise ValueError(f"未找到租户配置: {tenant_name}")
             
-            # 创建 OCI 客户端
-            config = {
-                "user": tenant_config["user_ocid"],
-                "key_file": tenant_config["key_file"],
-                "fingerprint": tenant_config["fingerprint"],
-                "tenancy": tenant_config["tenancy"],
-                "region": tenant_config["region"]
-            }
-            
-            # 初始化订阅客户端
-            subscription_client = oci.tenant_manager_control_plane.SubscriptionClient(config)
+            # 从客户端池获取订阅客户端
+            tenant_id = self.tenant_service.get_tenant_id_by_name(tenant_name)
+            subscription_client = self.tenant_service.get_oci_client(tenant_id, service="subscription")
+            if not subscription_client:
+                raise ValueError(f"无法创建订阅客户端: {tenant_name}")
             
             # 获取订阅列表
-            response = subscription_client.list_subscriptions(
+            subscriptions = list_all(
+                subscription_client.list_subscriptions,
                 compartment_id=tenant_config["tenancy"]
-            ).data
+            )
             
             # 处理订阅信息
             subscribed_services = []
-            for subscription in response.items:
+            for subscription in subscriptions:
                 # 格式化日期
                 start_date = subscription.start_date.strftime('%Y-%m-%d') if subscription.start_date else '未知'
                 end_date = subscription.end_date.strftime('%Y-%m-%d') if subscription.end_date else '永久'
@@ -0,0 +1,138 @@
+"""租户健康检查服务
+
+在后台线程池中定期验证租户配置，缓存每个租户最近一次的检查结果，
+页面渲染时直接读取缓存，不再同步调用OCI。
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from config.config import config
+from config.tenant_registry import tenant_registry
+from app.utils.oci_client_pool import credential_signature
+
+STATUS_VALID = 'valid'
+STATUS_INVALID = 'invalid'
+STATUS_CHECKING = 'checking'
+
+STATUS_LABELS = {
+    STATUS_VALID: '有效',
+    STATUS_INVALID: '无效',
+    STATUS_CHECKING: '检测中',
+}
+
+
+class TenantHealthMonitor:
+    """租户健康状态后台检查器"""
+
+    def __init__(self, interval: int = 300, ttl: int = 600, max_workers: int = 4):
+        """
+        Args:
+            interval: 后台巡检间隔（秒）
+            ttl: 检查结果的有效期（秒），过期后在下一轮巡检或下一次读取时重新检查
+            max_workers: 并发检查的线程数
+        """
+        self.interval = interval
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        # 凭据签名 -> 状态，租户ID会因删除而变化，因此不用ID作键
+        self._statuses: Dict[Tuple, Dict[str, Any]] = {}
+        self._pending: Dict[Tuple, Any] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _ensure_started(self) -> None:
+        """首次使用时才启动线程，避免在 fork 之前创建线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix='tenant-health')
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='tenant-health-scheduler', daemon=True)
+            self._thread.start()
+            logging.info(f"租户健康检查已启动，间隔 {self.interval} 秒")
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                for _, tenant in tenant_registry.items():
+                    if self._is_stale(credential_signature(tenant)):
+                        self._submit(tenant)
+            except Exception as e:
+                logging.error(f"租户健康巡检失败: {str(e)}")
+            self._stop.wait(self.interval)
+
+    def _is_stale(self, key: Tuple) -> bool:
+        status = self._statuses.get(key)
+        return status is None or time.time() - status['checked_at'] > self.ttl
+
+    def _submit(self, tenant: Dict[str, Any]) -> None:
+        """提交一次异步检查，同一租户同时只有一个检查在执行"""
+        key = credential_signature(tenant)
+        with self._lock:
+            if key in self._pending or self._executor is None:
+                return
+            self._pending[key] = self._executor.submit(self._check, key, tenant)
+
+    def _check(self, key: Tuple, tenant: Dict[str, Any]) -> Dict[str, Any]:
+        from app.services.tenant_service import TenantService
+
+        started = time.monotonic()
+        try:
+            is_valid, error = TenantService().check_tenant_config(tenant)
+        except Exception as e:
+            is_valid, error = False, str(e)
+        status = {
+            'status': STATUS_VALID if is_valid else STATUS_INVALID,
+            'latency_ms': round((time.monotonic() - started) * 1000, 1),
+            'error': error,
+            'checked_at': time.time(),
+        }
+        with self._lock:
+            self._statuses[key] = status
+            self._pending.pop(key, None)
+        return status
+
+    def get_status(self, tenant: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        立即返回租户的缓存状态
+
+        尚未检查过的租户返回“检测中”并触发异步检查；
+        结果已过期时返回旧结果，同时在后台重新检查。
+        """
+        self._ensure_started()
+        key = credential_signature(tenant)
+        status = self._statuses.get(key)
+        if self._is_stale(key):
+            self._submit(tenant)
+        if status is None:
+            return {'status': STATUS_CHECKING, 'latency_ms': None, 'error': None, 'checked_at': None}
+        return dict(status)
+
+    def revalidate(self, tenant: Dict[str, Any]) -> Dict[str, Any]:
+        """同步重新检查单个租户并返回最新状态"""
+        key = credential_signature(tenant)
+        return dict(self._check(key, tenant))
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._lock:
+            if self._executor:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            self._pending.clear()
+
+
+# 全局租户健康检查器
+health_monitor = TenantHealthMonitor(
+    interval=config.get('tenant_health.interval', 300),
+    ttl=config.get('tenant_health.ttl', 600),
+    max_workers=config.get('tenant_health.max_workers', 4)
+)
@@ -1,10 +1,33 @@
-import oci
 import logging
 import os
-from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Any, Optional, Tuple
+from config.config import config
+from app.utils.lazy_import import oci
 from app.services.tenant_service import TenantService
-from oci.usage_api.models import RequestSummarizedUsagesDetails, Filter, Dimension
+from app.services.usage_store import usage_store
+from app.utils.pagination import list_all
+from app.utils.usage_aggregation import UsageFrame, aggregate_usage
+from app.utils.profiler import traced
+
+# 最近几天的使用量仍可能被OCI更新，早于此天数的数据入库后视为已结算
+USAGE_SETTLE_DAYS = config.get('usage.settle_days', 3)
+# 未结算日期的数据重新拉取的最短间隔（秒）
+USAGE_REFRESH_INTERVAL = config.get('usage.refresh_interval', 3600)
+# request_summarized_usages 每页条数
+USAGE_PAGE_SIZE = config.get('usage.page_size', 500)
+
+# 同一tenancy同时只有一个入库过程
+_ingest_locks: Dict[str, threading.Lock] = {}
+_ingest_locks_guard = threading.Lock()
+
+
+def _ingest_lock(tenancy: str) -> threading.Lock:
+    with _ingest_locks_guard:
+        return _ingest_locks.setdefault(tenancy, threading.Lock())
+
 
 class UsageService:
     """使用量查询服务"""
@@ -12,14 +35,18 @@ class UsageService:
     def __init__(self):
         self.tenant_service = TenantService()
 
+    @traced()
     def get_usage(self, tenant_id: str, start_time: str = None, end_time: str = None) -> List[Dict]:
         """
         获取资源使用量数据
         
+        先把查询范围内尚未入库（或未结算且已过刷新间隔）的日期从OCI增量拉取到本地仓库，
+        再从本地按 (服务, SKU, 单位) 聚合。
+        
         Args:
             tenant_id: 租户ID
             start_time: 开始时间，ISO格式
-            end_time: 结束时间，ISO格式
+            end_time: 结束时间，ISO格式（不含当天）
             
         Returns:
             List[Dict]: 使用量数据列表
@@ -34,148 +61,175 @@ class UsageService:
             if not tenant_ocid:
                 raise ValueError(f"租户配置中缺少tenancy: {tenant_id}")
 
-            # 创建OCI配置
-            config = {
-                "user": tenant.get("user_ocid"),
-                "key_file": tenant.get("key_file"),
-                "fingerprint": tenant.get("fingerprint"),
-                "tenancy": tenant.get("tenancy"),
-                "region": tenant.get("region")
-            }
-
-            # 创建Usage API客户端
-            usage_client = oci.usage_api.UsageapiClient(config)
-
-            # 将时间字符串转换为UTC datetime对象
-            start_dt = datetime.strptime(start_time[:10], "%Y-%m-%d")
-            start_dt = start_dt.replace(hour=0, minute=0, second=0, microsecond=0).isoformat() + "Z"
-            
-            end_dt = datetime.strptime(end_time[:10], "%Y-%m-%d")
-            end_dt = end_dt.replace(hour=0, minute=0, second=0, microsecond=0).isoformat() + "Z"
-
-            all_items = []
-            next_page = None
-
-            while True:
-                # 构建查询请求
-                request = oci.usage_api.models.RequestSummarizedUsagesDetails(
-                    tenant_id=tenant_ocid,
-                    time_usage_started=start_dt,
-                    time_usage_ended=end_dt,
-                    granularity="DAILY",
-                    query_type="COST",
-                    group_by=["service", "skuName", "unit"],  # 最多4个字段，我们只需要这3个
-                    is_aggregate_by_time=True,
-                    compartment_depth=1
-                )
-
-                # 发送请求
-                response = usage_client.request_summarized_usages(
-                    request_summarized_usages_details=request,
-                    page=next_page,
-                    limit=50
-                )
-
-                if response.data.items:
-                    all_items.extend(response.data.items)
-
-                next_page = response.next_page
-                if not next_page:
-                    break
+            start_day = datetime.strptime(start_time[:10], "%Y-%m-%d").date()
+            end_day = datetime.strptime(end_time[:10], "%Y-%m-%d").date()
+
+            self.sync_usage(tenant_id, tenant_ocid, start_day, end_day)
 
-            # 格式化数据
-            return self._format_usage_data(all_items)
+            rows = usage_store.query_totals(tenant_ocid, start_day.isoformat(), end_day.isoformat())
+            return self._aggregate_rows(rows)
 
         except Exception as e:
             logging.error(f"获取使用量数据失败: {str(e)}")
             raise
 
-    def _format_usage_data(self, items):
-        """格式化使用量数据"""
-        formatted_data = []
+    @traced()
+    def sync_usage(self, tenant_id: str, tenant_ocid: str, start_day: date, end_day: date) -> int:
+        """
+        增量拉取 [start_day, end_day) 内本地缺失的每日使用量
         
-        # 创建SKU到单位的映射
-        sku_unit_map = {}
+        Returns:
+            int: 本次向OCI拉取的天数
+        """
+        # 未来的日期没有数据
+        end_day = min(end_day, date.today() + timedelta(days=1))
+        if start_day >= end_day:
+            return 0
+
+        with _ingest_lock(tenant_ocid):
+            missing = self._missing_days(tenant_ocid, start_day, end_day)
+            if not missing:
+                return 0
+
+            usage_client = self.tenant_service.get_oci_client(tenant_id, service="usage_api")
+            if not usage_client:
+                raise ValueError(f"无法创建Usage API客户端: {tenant_id}")
+
+            complete_before = (date.today() - timedelta(days=USAGE_SETTLE_DAYS)).isoformat()
+            for range_start, range_end in self._contiguous_ranges(missing):
+                items = self._fetch_daily_usage(usage_client, tenant_ocid, range_start, range_end)
+                days = [(range_start + timedelta(days=i)).isoformat()
+                        for i in range((range_end - range_start).days)]
+                usage_store.replace_days(tenant_ocid, days, self._daily_rows(items), complete_before)
+            return len(missing)
+
+    def _missing_days(self, tenant_ocid: str, start_day: date, end_day: date) -> List[date]:
+        """需要拉取的日期：从未入库的，以及未结算且距上次拉取超过刷新间隔的"""
+        stored = usage_store.stored_days(tenant_ocid, start_day.isoformat(), end_day.isoformat())
+        refresh_before = time.time() - USAGE_REFRESH_INTERVAL
+        missing = []
+        day = start_day
+        while day < end_day:
+            entry = stored.get(day.isoformat())
+            if entry is None or (not entry[0] and entry[1] < refresh_before):
+                missing.append(day)
+            day += timedelta(days=1)
+        return missing
+
+    @staticmethod
+    def _contiguous_ranges(days: List[date]) -> List[Tuple[date, date]]:
+        """把有序日期合并为若干个 [开始, 结束) 连续区间，每个区间只需一次查询"""
+        ranges = []
+        for day in days:
+            if ranges and ranges[-1][1] == day:
+                ranges[-1][1] = day + timedelta(days=1)
+            else:
+                ranges.append([day, day + timedelta(days=1)])
+        return [(start, end) for start, end in ranges]
+
+    def _fetch_daily_usage(self, usage_client, tenant_ocid: str, start_day: date, end_day: date) -> List[Any]:
+        """按天拉取 [start_day, end_day) 的汇总使用量（处理分页）"""
+        request = oci.usage_api.models.RequestSummarizedUsagesDetails(
+            tenant_id=tenant_ocid,
+            time_usage_started=f"{start_day.isoformat()}T00:00:00Z",
+            time_usage_ended=f"{end_day.isoformat()}T00:00:00Z",
+            granularity="DAILY",
+            query_type="COST",
+            group_by=["service", "skuName", "unit"],  # 最多4个字段，我们只需要这3个
+            is_aggregate_by_time=False,
+            compartment_depth=1
+        )
+
+        all_items = list_all(
+            usage_client.request_summarized_usages,
+            request_summarized_usages_details=request,
+            page_size=USAGE_PAGE_SIZE
+        )
+        logging.info(f"从OCI拉取使用量: {tenant_ocid} {start_day} ~ {end_day}，共 {len(all_items)} 条")
+        return all_items
+
+    def _item_fields(self, item) -> Tuple[str, str, Optional[str], float, float]:
+        """从OCI汇总项中取出 (服务, SKU名称, 单位, 使用量, 费用)"""
+        service = None
+        sku_name = None
+        unit = None
         
-        for item in items:
-            # 确保数值字段不为None
-            computed_quantity = getattr(item, 'computed_quantity', 0)
-            if computed_quantity is None:
-                computed_quantity = 0
-                
-            # 只处理有实际使用量的数据
-            if float(computed_quantity) > 0:
-                service = None
-                sku_name = None
-                unit = None
-                
-                # 从维度中获取信息
-                if hasattr(item, 'dimensions'):
-                    for dim in item.dimensions:
-                        if dim.key == 'service':
-                            service = dim.value
-                        elif dim.key == 'skuName':
-                            sku_name = dim.value
-                        elif dim.key in ['unit', 'billingUnit', 'unitOfMeasure']:
-                            unit = dim.value
-                            break
-
-                # 使用备用字段
-                service = service or getattr(item, 'service', 'Unknown')
-                sku_name = sku_name or getattr(item, 'sku_name', 'Unknown SKU')
-                
-                # 如果这个SKU已经有确定的单位，就使用它
-                if sku_name in sku_unit_map:
-                    unit = sku_unit_map[sku_name]
-                # 否则，如果找到了新的单位，就记录下来
-                elif unit:
-                    sku_unit_map[sku_name] = unit
-                # 如果还是没有单位，根据SKU名称推断
-                else:
-                    sku_name_upper = (sku_name or '').upper()
-                    if any(word in sku_name_upper for word in ['OCPU', 'CPU']):
-                        unit = 'OCPU Hours'
-                    elif 'MEMORY' in sku_name_upper:
-                        unit = 'GB Hours'
-                    elif any(word in sku_name_upper for word in ['STORAGE', 'VOLUME', 'BACKUP']):
-                        unit = 'GB Months'
-                    elif any(word in sku_name_upper for word in ['BANDWIDTH', 'DATA TRANSFER', 'OUTBOUND']):
-                        unit = 'GB'
-                    elif 'DATABASE' in sku_name_upper:
-                        unit = 'Instance Hours'
-                    else:
-                        unit = 'Units'  # 默认单位
-                    sku_unit_map[sku_name] = unit
-                
-                # 处理费用
-                computed_amount = getattr(item, 'computed_amount', 0)
-                if computed_amount is None:
-                    computed_amount = 0
-                
-                formatted_item = {
-                    'service': service,
-                    'sku_name': sku_name,
-                    'quantity': float(computed_quantity),
-                    'unit': unit,
-                    'cost': float(computed_amount)
-                }
-                formatted_data.append(formatted_item)
+        # 从维度中获取信息
+        if hasattr(item, 'dimensions'):
+            for dim in item.dimensions:
+                if dim.key == 'service':
+                    service = dim.value
+                elif dim.key == 'skuName':
+                    sku_name = dim.value
+                elif dim.key in ['unit', 'billingUnit', 'unitOfMeasure']:
+                    unit = dim.value
+                    break
+
+        # 使用备用字段
+        service = service or getattr(item, 'service', 'Unknown')
+        sku_name = sku_name or getattr(item, 'sku_name', 'Unknown SKU')
+        unit = unit or getattr(item, 'unit', None)
         
-        # 按SKU名称分组汇总
-        grouped_data = {}
-        for item in formatted_data:
-            key = (item['sku_name'], item['unit'])  # 使用SKU名称和单位作为键
-            if key not in grouped_data:
-                grouped_data[key] = {
-                    'service': item['service'],
-                    'sku_name': item['sku_name'],
-                    'total_quantity': 0,
-                    'total_cost': 0,
-                    'unit': item['unit']
-                }
-            grouped_data[key]['total_quantity'] += item['quantity']
-            grouped_data[key]['total_cost'] += item['cost']
+        # 确保数值字段不为None
+        computed_quantity = getattr(item, 'computed_quantity', 0) or 0
+        computed_amount = getattr(item, 'computed_amount', 0) or 0
+        return service or 'Unknown', sku_name or 'Unknown SKU', unit, float(computed_quantity), float(computed_amount)
+
+    def _daily_rows(self, items) -> List[Tuple[str, str, str, Optional[str], float, float]]:
+        """把按天返回的OCI汇总项转换为仓库行，只保留有实际使用量的数据"""
+        rows = []
+        for item in items:
+            service, sku_name, unit, quantity, cost = self._item_fields(item)
+            if quantity <= 0:
+                continue
+            started = item.time_usage_started
+            day = started.date().isoformat() if isinstance(started, datetime) else str(started)[:10]
+            rows.append((day, service, sku_name, unit, quantity, cost))
+        return rows
+
+    def _format_usage_data(self, items):
+        """格式化使用量数据"""
+        return self._aggregate_rows(map(self._item_fields, items))
+
+    def _aggregate_rows(self, rows, group_by=('sku_name', 'unit'), top_n=None):
+        """
+        按SKU名称和单位（或其他字段）汇总使用量
+        :param rows: (服务, SKU名称, 单位, 使用量, 费用) 序列，单位可能为空
+        :return: 按费用降序排列的汇总列表
+        """
+        frame = UsageFrame.from_rows(rows, fields=('service', 'sku_name', 'unit', 'quantity', 'cost'))
+        return aggregate_usage(frame, group_by=group_by, top_n=top_n)
+
+    @traced()
+    def get_usage_breakdown(self, tenant_ids: List[str], start_time: str, end_time: str,
+                            group_by=('service',), top_n: Optional[int] = None) -> List[Dict]:
+        """
+        跨租户按指定维度汇总使用量
         
-        # 转换为列表并排序
-        result = list(grouped_data.values())
-        return sorted(result, key=lambda x: (-x['total_cost'], x['service'], x['sku_name']))
+        Args:
+            tenant_ids: 租户ID列表
+            start_time: 开始时间，ISO格式
+            end_time: 结束时间，ISO格式（不含当天）
+            group_by: 分组字段，可选 day、tenant、service、sku_name、unit
+            top_n: 只返回费用最高的前N组
+            
+        Returns:
+            List[Dict]: 分组汇总列表，tenant 字段为租户名称
+        """
+        start_day = datetime.strptime(start_time[:10], "%Y-%m-%d").date()
+        end_day = datetime.strptime(end_time[:10], "%Y-%m-%d").date()
+
+        frames = []
+        for tenant_id in tenant_ids:
+            tenant = self.tenant_service.get_tenant_by_id(tenant_id)
+            if not tenant or not tenant.get('tenancy'):
+                raise ValueError(f"找不到租户: {tenant_id}")
+            tenant_ocid = tenant['tenancy']
+            self.sync_usage(tenant_id, tenant_ocid, start_day, end_day)
+            rows = usage_store.query_rows(tenant_ocid, start_day.isoformat(), end_day.isoformat())
+            frames.append(UsageFrame.from_rows(
+                rows,
+                fields=('day', 'service', 'sku_name', 'unit', 'quantity', 'cost'),
+                tenant=tenant.get('name') or tenant_id
+            ))
+        return aggregate_usage(UsageFrame.concat(frames), group_by=group_by, top_n=top_n)
@@ -0,0 +1,149 @@
+"""本地使用量仓库
+
+按租户（tenancy OCID）和日期保存每日汇总的使用量与费用，
+已入库且已结算的日期不再向OCI查询，任意日期范围的统计直接在本地聚合。
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config.config import config
+
+# 每日汇总行：(日期, 服务, SKU名称, 单位, 使用量, 费用)
+UsageRow = Tuple[str, str, str, Optional[str], float, float]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage_daily (
+    tenancy   TEXT NOT NULL,
+    day       TEXT NOT NULL,
+    service   TEXT NOT NULL,
+    sku_name  TEXT NOT NULL,
+    unit      TEXT,
+    quantity  REAL NOT NULL,
+    cost      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_usage_daily_tenancy_day ON usage_daily (tenancy, day);
+CREATE TABLE IF NOT EXISTS usage_days (
+    tenancy     TEXT NOT NULL,
+    day         TEXT NOT NULL,
+    complete    INTEGER NOT NULL,
+    fetched_at  REAL NOT NULL,
+    PRIMARY KEY (tenancy, day)
+);
+"""
+
+
+class UsageStore:
+    """基于SQLite的每日使用量存储"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程一个连接，首次使用时才打开，避免在 fork 之前打开数据库"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and getattr(self._local, 'pid', None) == os.getpid():
+            return conn
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        with self._init_lock:
+            if not self._initialized:
+                conn.executescript(SCHEMA)
+                self._initialized = True
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            yield conn
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def stored_days(self, tenancy: str, start_day: str, end_day: str) -> Dict[str, Tuple[bool, float]]:
+        """
+        返回 [start_day, end_day) 内已入库的日期
+
+        Returns:
+            日期 -> (是否已结算, 入库时间戳)
+        """
+        rows = self._connect().execute(
+            'SELECT day, complete, fetched_at FROM usage_days WHERE tenancy = ? AND day >= ? AND day < ?',
+            (tenancy, start_day, end_day)
+        ).fetchall()
+        return {day: (bool(complete), fetched_at) for day, complete, fetched_at in rows}
+
+    def replace_days(self, tenancy: str, days: Iterable[str], rows: Sequence[UsageRow],
+                     complete_before: str) -> None:
+        """
+        在一个事务内替换若干天的数据，并记录这些天已入库
+
+        Args:
+            tenancy: tenancy OCID
+            days: 本次拉取覆盖的全部日期（包括没有使用量的日期）
+            rows: 这些日期的每日汇总行
+            complete_before: 早于该日期的数据视为已结算，之后不再拉取
+        """
+        days = sorted(set(days))
+        if not days:
+            return
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany(
+                'DELETE FROM usage_daily WHERE tenancy = ? AND day = ?',
+                [(tenancy, day) for day in days]
+            )
+            conn.executemany(
+                'INSERT INTO usage_daily (tenancy, day, service, sku_name, unit, quantity, cost) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(tenancy,) + tuple(row) for row in rows]
+            )
+            conn.executemany(
+                'INSERT OR REPLACE INTO usage_days (tenancy, day, complete, fetched_at) VALUES (?, ?, ?, ?)',
+                [(tenancy, day, int(day < complete_before), now) for day in days]
+            )
+        logging.info(f"使用量已入库: {tenancy} {days[0]} ~ {days[-1]}，共 {len(rows)} 条")
+
+    def query_totals(self, tenancy: str, start_day: str, end_day: str) -> List[Tuple[str, str, Optional[str], float, float]]:
+        """
+        按 (服务, SKU, 单位) 汇总 [start_day, end_day) 内的使用量和费用
+
+        Returns:
+            (服务, SKU名称, 单位, 总使用量, 总费用) 列表
+        """
+        return self._connect().execute(
+            'SELECT service, sku_name, unit, SUM(quantity), SUM(cost) FROM usage_daily '
+            'WHERE tenancy = ? AND day >= ? AND day < ? '
+            'GROUP BY service, sku_name, unit',
+            (tenancy, start_day, end_day)
+        ).fetchall()
+
+    def query_rows(self, tenancy: str, start_day: str, end_day: str) -> List[UsageRow]:
+        """返回 [start_day, end_day) 内的每日汇总行"""
+        return self._connect().execute(
+            'SELECT day, service, sku_name, unit, quantity, cost FROM usage_daily '
+            'WHERE tenancy = ? AND day >= ? AND day < ? ORDER BY day',
+            (tenancy, start_day, end_day)
+        ).fetchall()
+
+
+# 全局使用量仓库
+usage_store = UsageStore(config.get(
+    'usage.store_path',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'usage.db')
+))
@@ -248,11 +248,8 @@ createInstanceForm.addEventListener('submit', async function(e) {
         
         if (result.success) {
             // 显示实例信息
-            document.getElementById('resultInstanceName').textContent = result.instance.display_name;
-            document.getElementById('resultInstanceId').textContent = result.instance.id;
-            document.getElementById('resultInstanceState').textContent = result.instance.lifecycle_state;
-            
-            // 如果是密码登录，显示密码
+            showCreateResult(result.instance, null);
+            // 密码直接随创建结果返回，不依赖后台任务
             if (formData.login_method === 'password' && result.password) {
                 document.getElementById('passwordSection').style.display = 'block';
                 document.getElementById('instancePassword').value = result.password;
@@ -260,6 +257,11 @@ createInstanceForm.addEventListener('submit', async function(e) {
                 document.getElementById('passwordSection').style.display = 'none';
             }
             
+            // 后台任务会持续更新实例状态和公网IP
+            if (result.job_id) {
+                pollCreateJob(result.job_id);
+            }
+            
             // 重置表单
             this.reset();
             resetSelections();
@@ -284,6 +286,47 @@ createInstanceForm.addEventListener('submit', async function(e) {
     }
 });
 
+// 显示创建结果中的实例信息
+function showCreateResult(instance, progress) {
+    document.getElementById('resultInstanceName').textContent = instance.display_name;
+    document.getElementById('resultInstanceId').textContent = instance.id;
+    document.getElementById('resultInstanceState').textContent = instance.lifecycle_state;
+    document.getElementById('resultInstancePublicIp').textContent = instance.public_ip || '-';
+    document.getElementById('resultJobProgress').textContent = progress || '-';
+}
+
+// 轮询失败后的重试次数上限和最长间隔（毫秒）
+const JOB_POLL_MAX_FAILURES = 8;
+const JOB_POLL_MAX_DELAY = 60000;
+
+// 轮询创建实例的后台任务，请求失败时按指数退避重试
+async function pollCreateJob(jobId, failures = 0) {
+    try {
+        const response = await fetch(`/instance/api/jobs/${jobId}`);
+        if (!response.ok) {
+            throw new Error('获取创建进度失败');
+        }
+        const job = await response.json();
+        
+        if (job.result && job.result.instance) {
+            showCreateResult(job.result.instance, job.error || job.progress);
+        }
+        
+        if (!job.done) {
+            setTimeout(() => pollCreateJob(jobId), 5000);
+        }
+    } catch (error) {
+        console.error('获取创建进度失败:', error);
+        if (failures < JOB_POLL_MAX_FAILURES) {
+            const delay = Math.min(5000 * 2 ** failures, JOB_POLL_MAX_DELAY);
+            document.getElementById('resultJobProgress').textContent = `${error.message}，${Math.round(delay / 1000)} 秒后重试`;
+            setTimeout(() => pollCreateJob(jobId, failures + 1), delay);
+        } else {
+            document.getElementById('resultJobProgress').textContent = `${error.message}，请稍后在实例列表中查看`;
+        }
+    }
+}
+
 // 复制密码到剪贴板
 function copyPassword(button) {
     const passwordInput = document.getElementById('instancePassword');
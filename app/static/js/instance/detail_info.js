@@ -11,13 +11,17 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     
     loadInstanceDetail();
-    startPolling();
-    startPollingVnics();
+    updateVnicList();
+    openInstanceStream();
 });
 
-let pollingTimer = 45000;
-let vnicPollingInterval = 60000;
-const POLLING_INTERVAL = 45000; // 45秒轮询一次
+// 实例状态推送：服务端按租户共享轮询，只推送发生变化的实例
+let instanceStream = null;
+
+// 服务端推送连接数已满（503）时改为定时查询实例详情（服务端有缓存，变更后立即失效）
+const INSTANCE_POLL_INTERVAL = 10000;
+let instancePollTimer = null;
+let lastPolledState = null;
 
 // 加载实例详情
 function loadInstanceDetail() {
@@ -145,8 +149,6 @@ async function attachVnic() {
             // 关闭模态框
             const modal = bootstrap.Modal.getInstance(document.getElementById('attachVnicModal'));
             modal.hide();
-            // 开始轮询VNIC状态
-            startPollingVnics();
         }
     })
     .catch(error => {
@@ -182,8 +184,6 @@ function detachVnic(attachmentId) {
                     showToast(data.error, 'error');
                 } else {
                     showToast('VNIC分离操作已开始，请等待状态更新');
-                    // 开始轮询VNIC状态
-                    startPollingVnics();
                 }
             })
             .catch(error => {
@@ -197,30 +197,73 @@ function detachVnic(attachmentId) {
     });
 }
 
-// 开始轮询VNIC状态
-function startPollingVnics() {
-    // 如果已经在轮询，先停止
-    if (vnicPollingInterval) {
-        clearInterval(vnicPollingInterval);
-    }
-
-    // 立即执行一次
-    updateVnicList();
+// 订阅实例状态推送，实例信息和VNIC列表随推送更新
+function openInstanceStream() {
+    closeInstanceStream();
+    instanceStream = new EventSource(`/instance/api/stream/${tenantId}`);
+    
+    const applyInstances = event => {
+        const instance = JSON.parse(event.data).find(item => item.id === instanceId);
+        if (instance) {
+            updateInstanceInfo(instance);
+            renderVnicList(instance.vnics || []);
+        }
+    };
+    instanceStream.addEventListener('snapshot', applyInstances);
+    instanceStream.addEventListener('changed', applyInstances);
+    
+    instanceStream.addEventListener('removed', event => {
+        if (JSON.parse(event.data).includes(instanceId)) {
+            showToast('实例已不存在', 'warning');
+            closeInstanceStream();
+        }
+    });
+    
+    // 网络中断时浏览器会自动重连；服务端拒绝（如503）时连接被关闭，不再重连
+    instanceStream.onerror = () => {
+        if (instanceStream && instanceStream.readyState === EventSource.CLOSED) {
+            closeInstanceStream();
+            pollInstance();
+        }
+    };
+}
 
-    // 开始定时轮询
-    vnicPollingInterval = setInterval(() => {
-        updateVnicList();
-    }, POLLING_INTERVAL);
+// 定时查询实例详情，用于无法使用推送的情况；状态变化时同时刷新VNIC列表
+async function pollInstance() {
+    try {
+        const response = await fetch(`/instance/api/instance/${tenantId}/${instanceId}`);
+        const instance = await response.json();
+        if (response.status === 404) {
+            showToast('实例已不存在', 'warning');
+            return;
+        }
+        if (!response.ok) {
+            throw new Error(instance.error || '获取实例详情失败');
+        }
+        updateInstanceInfo(instance);
+        updatePowerButtons(instance.lifecycle_state);
+        if (lastPolledState && lastPolledState !== instance.lifecycle_state) {
+            updateVnicList();
+        }
+        lastPolledState = instance.lifecycle_state;
+    } catch (error) {
+        console.error('Error:', error);
+    }
+    instancePollTimer = setTimeout(pollInstance, INSTANCE_POLL_INTERVAL);
 }
 
-// 停止轮询VNIC状态
-function stopPollingVnics() {
-    if (vnicPollingInterval) {
-        clearInterval(vnicPollingInterval);
-        vnicPollingInterval = null;
+// 取消实例状态推送
+function closeInstanceStream() {
+    if (instanceStream) {
+        instanceStream.close();
+        instanceStream = null;
     }
+    clearTimeout(instancePollTimer);
+    instancePollTimer = null;
 }
 
+window.addEventListener('beforeunload', closeInstanceStream);
+
 // 更新VNIC列表
 function updateVnicList() {
     fetch(`/instance/api/instance/${tenantId}/${instanceId}/vnics`)
@@ -232,40 +275,41 @@ function updateVnicList() {
             }
             return response.json();
         })
-        .then(vnics => {
-            const vnicList = document.getElementById('vnic-list');
-            vnicList.innerHTML = '';
-
-            vnics.forEach(vnic => {
-                const tr = document.createElement('tr');
-                tr.innerHTML = `
-                    <td>${vnic.display_name || '-'}</td>
-                    <td>${vnic.private_ip || '-'}</td>
-                    <td>${vnic.public_ip || '-'}</td>
-                    <td>${vnic.mac_address || '-'}</td>
-                    <td>
-                        <span class="badge ${vnic.is_primary ? 'bg-success' : 'bg-secondary'}">
-                            ${vnic.is_primary ? '是' : '否'}
-                        </span>
-                    </td>
-                    <td>${getVnicStateLabel(vnic.state)}</td>
-                    <td>
-                        ${!vnic.is_primary ? 
-                            `<button class="btn btn-sm btn-danger" onclick="detachVnic('${vnic.attachment_id}')">分离</button>` : 
-                            '-'}
-                    </td>
-                `;
-                vnicList.appendChild(tr);
-            });
-        })
+        .then(vnics => renderVnicList(vnics))
         .catch(error => {
             console.error('Error:', error);
             showToast(error.message, 'error');
-            // 如果发生错误，停止轮询
-            stopPollingVnics();
         });
 }
 
+// 渲染VNIC列表
+function renderVnicList(vnics) {
+    const vnicList = document.getElementById('vnic-list');
+    vnicList.innerHTML = '';
+
+    vnics.forEach(vnic => {
+        const tr = document.createElement('tr');
+        tr.innerHTML = `
+            <td>${vnic.display_name || '-'}</td>
+            <td>${vnic.private_ip || '-'}</td>
+            <td>${vnic.public_ip || '-'}</td>
+            <td>${vnic.mac_address || '-'}</td>
+            <td>
+                <span class="badge ${vnic.is_primary ? 'bg-success' : 'bg-secondary'}">
+                    ${vnic.is_primary ? '是' : '否'}
+                </span>
+            </td>
+            <td>${getVnicStateLabel(vnic.state)}</td>
+            <td>
+                ${!vnic.is_primary ? 
+                    `<button class="btn btn-sm btn-danger" onclick="detachVnic('${vnic.attachment_id}')">分离</button>` : 
+                    '-'}
+            </td>
+        `;
+        vnicList.appendChild(tr);
+    });
+}
+
 function updateInstanceInfo(instance) {
     // 基本信息
     document.getElementById('instance-name').textContent = instance.display_name || '-';
@@ -348,7 +392,6 @@ function performInstanceAction(action) {
                         throw new Error(data.error);
                     }
                     showToast(`实例${actionMap[action]}操作已发送`);
-                    startPolling();
                 })
                 .catch(error => {
                     console.error('Error:', error);
@@ -361,40 +404,6 @@ function performInstanceAction(action) {
         });
 }
 
-function startPolling() {
-    if (pollingTimer) {
-        clearInterval(pollingTimer);
-    }
-    
-    pollingTimer = setInterval(() => {
-        fetch(`/instance/api/instance/${tenantId}/${instanceId}`)
-            .then(response => response.json())
-            .then(data => {
-                if (data.error) {
-                    throw new Error(data.error);
-                }
-                updateInstanceInfo(data);
-                updatePowerButtons(data.lifecycle_state);
-                
-                // 如果实例状态为RUNNING或STOPPED，停止轮询
-                if (['RUNNING', 'STOPPED'].includes(data.lifecycle_state)) {
-                    stopPolling();
-                }
-            })
-            .catch(error => {
-                console.error('Error:', error);
-                stopPolling();
-            });
-    }, 5000);
-}
-
-function stopPolling() {
-    if (pollingTimer) {
-        clearInterval(pollingTimer);
-        pollingTimer = null;
-    }
-}
-
 function getStateLabel(state) {
     const stateMap = {
         'PROVISIONING': '<span class="badge bg-info">配置中</span>',
@@ -602,8 +611,6 @@ async function updateShape() {
         if (result.status === 'success') {
             showToast('实例形状更新已开始，请等待几分钟');
             bootstrap.Modal.getInstance(document.getElementById('shapeModal')).hide();
-            // 开始轮询实例状态
-            startPolling();
         } else {
             throw new Error(result.message);
         }
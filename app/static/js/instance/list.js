@@ -3,53 +3,135 @@ const confirmModal = new bootstrap.Modal(document.getElementById('confirmModal')
 const toast = new bootstrap.Toast(document.getElementById('toast'));
 let currentTenantId = '';
 
-// 全局变量用于跟踪轮询状态
-const pollingInstances = new Set();
-const pollingIntervals = {};
+// 实例状态推送：同一租户的所有页面共享服务端的一个轮询
+let instanceStream = null;
+const currentInstances = new Map();
 
-// 开始轮询实例状态
-function startPolling(instanceId) {
-    if (pollingInstances.has(instanceId)) {
-        return;
-    }
+// 服务端推送连接数已满（503）时改为定时轮询实例列表
+const INSTANCE_POLL_INTERVAL = 30000;
+let instancePollTimer = null;
+let instancePollTenant = null;
+
+// 订阅租户的实例状态推送
+function openInstanceStream(tenantId, refresh = false) {
+    closeInstanceStream();
+    currentInstances.clear();
     
-    pollingInstances.add(instanceId);
-    pollingIntervals[instanceId] = setInterval(async () => {
-        try {
-            const response = await fetch(`/instance/api/instance/${currentTenantId}/${instanceId}`);
-            if (!response.ok) {
-                throw new Error('获取实例状态失败');
+    instanceStream = new EventSource(`/instance/api/stream/${tenantId}${refresh ? '?refresh=1' : ''}`);
+    
+    // 订阅时收到完整的实例列表
+    instanceStream.addEventListener('snapshot', event => {
+        currentInstances.clear();
+        JSON.parse(event.data).forEach(instance => currentInstances.set(instance.id, instance));
+        showInstanceTable(Array.from(currentInstances.values()));
+        showLoading(false);
+    });
+    
+    // 之后只推送发生变化的实例
+    instanceStream.addEventListener('changed', event => {
+        const changed = JSON.parse(event.data);
+        const hasNew = changed.some(instance => !currentInstances.has(instance.id));
+        changed.forEach(instance => currentInstances.set(instance.id, instance));
+        if (hasNew) {
+            showInstanceTable(Array.from(currentInstances.values()));
+        } else {
+            changed.forEach(instance => updateInstanceRow(instance));
+            updateInstanceStats(Array.from(currentInstances.values()));
+        }
+    });
+    
+    instanceStream.addEventListener('removed', event => {
+        JSON.parse(event.data).forEach(instanceId => currentInstances.delete(instanceId));
+        showInstanceTable(Array.from(currentInstances.values()));
+    });
+    
+    instanceStream.addEventListener('failure', event => {
+        showLoading(false);
+        showToast(JSON.parse(event.data).error || '加载实例列表失败', 'danger');
+    });
+    
+    // 网络中断时浏览器会自动重连；服务端拒绝（如503）时连接被关闭，不再重连
+    instanceStream.onerror = () => {
+        if (instanceStream && instanceStream.readyState === EventSource.CLOSED) {
+            closeInstanceStream();
+            instancePollTenant = tenantId;
+            pollInstances(tenantId);
+        }
+    };
+}
+
+// 逐行读取 NDJSON 响应，每收到一批完整的行调用一次 onRows；服务端中途出错时最后一行为 {"error": ...}
+async function readNdjson(response, onRows) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+        const { done, value } = await reader.read();
+        buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+        const lines = buffer.split('\n');
+        buffer = done ? '' : lines.pop();
+        const rows = lines.filter(line => line.trim()).map(line => JSON.parse(line));
+        const failed = rows.find(row => row.error);
+        if (failed) {
+            throw new Error(failed.error);
+        }
+        if (rows.length) {
+            onRows(rows);
+        }
+        if (done) {
+            return;
+        }
+    }
+}
+
+// 定时轮询实例列表，用于无法使用推送的情况；以流式读取，首次加载时边收边显示
+async function pollInstances(tenantId) {
+    try {
+        const response = await fetch(`/instance/api/instances/${tenantId}?format=ndjson`);
+        if (!response.ok) {
+            const result = await response.json().catch(() => ({}));
+            throw new Error(result.error || '加载实例列表失败');
+        }
+        const firstLoad = currentInstances.size === 0;
+        const instances = new Map();
+        await readNdjson(response, rows => {
+            if (tenantId !== instancePollTenant) {
+                return;
             }
-            
-            const instance = await response.json();
-            updateInstanceRow(instance);
-            
-            // 如果实例状态已稳定，停止轮询
-            if (!['PROVISIONING', 'STARTING', 'STOPPING', 'TERMINATING'].includes(instance.lifecycle_state)) {
-                stopPolling(instanceId);
+            rows.forEach(instance => instances.set(instance.id, instance));
+            if (firstLoad) {
+                showInstanceTable(Array.from(instances.values()));
+                showLoading(false);
             }
-        } catch (error) {
-            console.error('轮询实例状态失败:', error);
-            stopPolling(instanceId);
+        });
+        if (tenantId !== instancePollTenant) {
+            return;
         }
-    }, 5000); // 每5秒轮询一次
+        currentInstances.clear();
+        instances.forEach((instance, id) => currentInstances.set(id, instance));
+        showInstanceTable(Array.from(currentInstances.values()));
+    } catch (error) {
+        showToast(error.message, 'danger');
+    } finally {
+        showLoading(false);
+    }
+    if (tenantId === instancePollTenant) {
+        instancePollTimer = setTimeout(() => pollInstances(tenantId), INSTANCE_POLL_INTERVAL);
+    }
 }
 
-// 停止轮询实例状态
-function stopPolling(instanceId) {
-    if (pollingIntervals[instanceId]) {
-        clearInterval(pollingIntervals[instanceId]);
-        delete pollingIntervals[instanceId];
-        pollingInstances.delete(instanceId);
+// 取消实例状态推送
+function closeInstanceStream() {
+    if (instanceStream) {
+        instanceStream.close();
+        instanceStream = null;
     }
+    clearTimeout(instancePollTimer);
+    instancePollTimer = null;
+    instancePollTenant = null;
 }
 
-// 停止所有轮询
-function stopAllPolling() {
-    pollingInstances.forEach(instanceId => {
-        stopPolling(instanceId);
-    });
-}
+window.addEventListener('beforeunload', closeInstanceStream);
 
 document.addEventListener('DOMContentLoaded', function() {
     const tenantSelect = document.getElementById('tenantSelect');
@@ -66,9 +148,10 @@ document.addEventListener('DOMContentLoaded', function() {
 });
 
 // 加载实例列表
-async function loadInstances() {
+function loadInstances(refresh = false) {
     const tenantId = document.getElementById('tenantSelect').value;
     if (!tenantId) {
+        closeInstanceStream();
         showInstanceTable([]);
         return;
     }
@@ -76,28 +159,8 @@ async function loadInstances() {
     currentTenantId = tenantId;
     showLoading(true);
     
-    try {
-        // 停止所有现有的轮询
-        stopAllPolling();
-        
-        const response = await fetch(`/instance/api/instances/${tenantId}`);
-        if (!response.ok) {
-            throw new Error('加载实例列表失败');
-        }
-        const instances = await response.json();
-        showInstanceTable(instances);
-        
-        // 对所有处于过渡状态的实例开始轮询
-        instances.forEach(instance => {
-            if (['PROVISIONING', 'STARTING', 'STOPPING', 'TERMINATING'].includes(instance.lifecycle_state)) {
-                startPolling(instance.id);
-            }
-        });
-    } catch (error) {
-        showToast(error.message, 'danger');
-    } finally {
-        showLoading(false);
-    }
+    // 实例列表和后续的状态变化都通过推送获取
+    openInstanceStream(tenantId, refresh);
 }
 
 // 显示实例表格
@@ -274,8 +337,6 @@ async function performInstanceAction(instanceId, action) {
             if (result.instance) {
                 updateInstanceRow(result.instance);
             }
-            // 开始轮询实例状态
-            startPolling(instanceId);
         } else {
             throw new Error(result.error || `${actionMap[action]}操作失败`);
         }
@@ -306,8 +367,8 @@ async function changePublicIP(instanceId) {
     
     if (result.isConfirmed) {
         try {
-            // 发送更换IP请求
-            fetch('/instance/api/instance/public-ip', {
+            // 发送更换IP请求，更换在后台任务中执行
+            const response = await fetch('/instance/api/instance/public-ip', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
@@ -317,14 +378,19 @@ async function changePublicIP(instanceId) {
                     instance_id: instanceId
                 })
             });
+            const data = await response.json();
+            if (!response.ok || !data.success) {
+                throw new Error(data.error || '无法发送更换IP请求');
+            }
             
-            // 显示操作已发送的提示
-            await Swal.fire({
+            // 显示操作已发送的提示，完成后再通知结果
+            Swal.fire({
                 icon: 'info',
                 title: '更换IP请求已发送',
-                text: '请稍后刷新实例列表查看结果',
+                text: '正在更换公网IP，完成后会自动提示',
                 confirmButtonText: '确定'
             });
+            pollPublicIPJob(data.job_id);
             
         } catch (error) {
             console.error('Error changing IP:', error);
@@ -337,9 +403,53 @@ async function changePublicIP(instanceId) {
     }
 }
 
+// 轮询失败后的重试次数上限和最长间隔（毫秒）
+const JOB_POLL_MAX_FAILURES = 8;
+const JOB_POLL_MAX_DELAY = 60000;
+
+// 轮询更换公网IP的后台任务，请求失败时按指数退避重试
+async function pollPublicIPJob(jobId, failures = 0) {
+    try {
+        const response = await fetch(`/instance/api/jobs/${jobId}`);
+        if (!response.ok) {
+            throw new Error('获取更换进度失败');
+        }
+        const job = await response.json();
+        
+        if (!job.done) {
+            setTimeout(() => pollPublicIPJob(jobId), 3000);
+            return;
+        }
+        
+        if (job.status === 'succeeded') {
+            await Swal.fire({
+                icon: 'success',
+                title: '公网IP更换成功',
+                text: `${job.result.old_ip || '-'} → ${job.result.new_ip}`,
+                confirmButtonText: '确定'
+            });
+            loadInstances(true);
+        } else {
+            await Swal.fire({
+                icon: 'error',
+                title: '公网IP更换失败',
+                text: job.error || '未知错误'
+            });
+        }
+    } catch (error) {
+        console.error('获取更换进度失败:', error);
+        if (failures < JOB_POLL_MAX_FAILURES) {
+            setTimeout(() => pollPublicIPJob(jobId, failures + 1),
+                       Math.min(3000 * 2 ** failures, JOB_POLL_MAX_DELAY));
+        } else {
+            showToast('无法获取更换公网IP的进度，请刷新实例列表查看结果', 'warning');
+        }
+    }
+}
+
 // 刷新实例列表
 function refreshInstanceList() {
-    loadInstances();
+    loadInstances(true);
 }
 
 // 显示确认对话框
@@ -0,0 +1,217 @@
+"""快照缓存
+
+为变化缓慢的OCI查询结果（配额、可用性域、服务列表等）提供进程内缓存：
+- 在 ttl 内直接返回缓存；
+- 超过 ttl 但未超过 max_stale 时先返回旧快照，同时在后台刷新（stale-while-revalidate）；
+- 没有快照或快照过旧时同步加载。
+每个快照记录最后刷新时间，便于页面展示数据的新鲜程度。
+invalidate() 会使进行中的加载作废：加载开始之后键被失效时，结果照常返回给调用方但不写入缓存，
+避免把变更前读到的数据当作新快照保存。
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from app.utils.metrics import count_cache_event
+
+
+class Snapshot:
+    """一次加载结果及其刷新时间"""
+
+    __slots__ = ('value', 'refreshed_at')
+
+    def __init__(self, value: Any, refreshed_at: float):
+        self.value = value
+        self.refreshed_at = refreshed_at
+
+    def age(self) -> float:
+        return time.time() - self.refreshed_at
+
+
+class SnapshotCache:
+    """带TTL和后台刷新的线程安全快照缓存"""
+
+    def __init__(self, name: str, ttl: float, max_stale: Optional[float] = None, max_workers: int = 2):
+        """
+        Args:
+            name: 缓存名称，用于日志和统计
+            ttl: 快照的新鲜期（秒）
+            max_stale: 快照可作为旧数据返回的最长时间（秒），默认不限
+            max_workers: 后台刷新线程数
+        """
+        self.name = name
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._snapshots: Dict[Hashable, Snapshot] = {}
+        # 同一个键同时只允许一个加载，其余调用等待其结果
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._refreshing: set = set()
+        # 失效代数：invalidate 递增对应键的代数，clear 递增全局代数；加载前后代数不同则丢弃结果
+        self._generations: Dict[Hashable, int] = {}
+        self._epoch = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'refreshes': 0, 'discarded': 0, 'errors': 0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # 首次需要后台刷新时才创建线程池，避免在 fork 之前创建线程
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix=f'cache-{self.name}')
+            return self._executor
+
+    def _record(self, event: str) -> None:
+        with self._lock:
+            self._stats[event] += 1
+        count_cache_event(self.name, event)
+
+    def _key_lock(self, key: Hashable) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _generation(self, key: Hashable) -> Tuple[int, int]:
+        """键当前的失效代数（调用方需持有锁）"""
+        return self._epoch, self._generations.get(key, 0)
+
+    def generation(self, key: Hashable) -> Tuple[int, int]:
+        """键当前的失效代数，在缓存之外加载数据前取得，写入时传给 put"""
+        with self._lock:
+            # 记下这个键，按条件失效时即使它还没有快照也会递增代数
+            self._generations.setdefault(key, 0)
+            return self._generation(key)
+
+    def _load(self, key: Hashable, loader: Callable[[], Any]) -> Snapshot:
+        with self._key_lock(key):
+            with self._lock:
+                # 等锁期间其他线程可能已经加载完成
+                snapshot = self._snapshots.get(key)
+                if snapshot is not None and snapshot.age() <= self.ttl:
+                    return snapshot
+                generation = self._generation(key)
+            value = loader()
+            snapshot = Snapshot(value, time.time())
+            with self._lock:
+                stored = self._generation(key) == generation
+                if stored:
+                    self._snapshots[key] = snapshot
+            # 加载期间键被失效：读到的可能是变更前的数据，只返回给本次调用
+            self._record('refreshes' if stored else 'discarded')
+            return snapshot
+
+    def _refresh_in_background(self, key: Hashable, loader: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._load(key, loader)
+            except Exception as e:
+                self._record('errors')
+                logging.warning(f"后台刷新缓存 {self.name}:{key} 失败: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._get_executor().submit(refresh)
+
+    def get(self, key: Hashable, loader: Callable[[], Any], force: bool = False) -> Tuple[Any, Dict[str, Any]]:
+        """
+        获取快照，必要时调用 loader 加载
+
+        Args:
+            key: 缓存键
+            loader: 无参加载函数，异常会在同步加载时原样抛出
+            force: 忽略缓存立即重新加载
+
+        Returns:
+            (值, 元信息)，元信息包含 last_refreshed（时间戳）和 stale（是否为过期数据）
+        """
+        snapshot = None if force else self.peek(key)
+        if snapshot is not None:
+            age = snapshot.age()
+            if age <= self.ttl:
+                self._record('hits')
+                return snapshot.value, self._meta(snapshot, stale=False)
+            if self.max_stale is None or age <= self.max_stale:
+                self._record('stale_hits')
+                self._refresh_in_background(key, loader)
+                return snapshot.value, self._meta(snapshot, stale=True)
+
+        self._record('misses')
+        if force:
+            self.invalidate(key)
+        try:
+            snapshot = self._load(key, loader)
+        except Exception:
+            self._record('errors')
+            raise
+        return snapshot.value, self._meta(snapshot, stale=False)
+
+    def peek(self, key: Hashable) -> Optional[Snapshot]:
+        """返回当前快照（可能已过期），不触发加载"""
+        with self._lock:
+            return self._snapshots.get(key)
+
+    def put(self, key: Hashable, value: Any, generation: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+        """
+        直接写入快照，返回其元信息
+
+        Args:
+            generation: 开始加载 value 之前由 generation() 取得的代数；之后键被失效时不写入，
+                        与 get 丢弃加载期间被失效的结果一致
+        """
+        snapshot = Snapshot(value, time.time())
+        with self._lock:
+            stored = generation is None or self._generation(key) == generation
+            if stored:
+                self._snapshots[key] = snapshot
+        self._record('refreshes' if stored else 'discarded')
+        return self._meta(snapshot, stale=False)
+
+    def invalidate(self, key: Optional[Hashable] = None,
+                   predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """
+        删除快照，并使这些键上进行中的加载结果不再写入缓存
+
+        Args:
+            key: 要删除的键；与 predicate 都为空时清空全部
+            predicate: 对键返回 True 时删除
+
+        Returns:
+            删除的快照数
+        """
+        with self._lock:
+            if key is not None:
+                self._generations[key] = self._generations.get(key, 0) + 1
+                return 1 if self._snapshots.pop(key, None) is not None else 0
+            if predicate is None:
+                self._epoch += 1
+                self._generations.clear()
+                count = len(self._snapshots)
+                self._snapshots.clear()
+                return count
+            # 正在首次加载的键还没有快照，同样需要递增代数
+            for k in set(self._snapshots) | set(self._key_locks) | set(self._generations):
+                if predicate(k):
+                    self._generations[k] = self._generations.get(k, 0) + 1
+            keys = [k for k in self._snapshots if predicate(k)]
+            for k in keys:
+                del self._snapshots[k]
+            return len(keys)
+
+    def clear(self) -> None:
+        self.invalidate()
+
+    @staticmethod
+    def _meta(snapshot: Snapshot, stale: bool) -> Dict[str, Any]:
+        return {'last_refreshed': snapshot.refreshed_at, 'stale': stale}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, name=self.name, size=len(self._snapshots), refreshing=len(self._refreshing))
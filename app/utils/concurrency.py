@@ -0,0 +1,75 @@
+"""并发工具
+
+为相互独立的OCI调用提供有上限的线程池并发执行，总耗时接近其中最慢的一次调用。
+可以为整批调用设置超时，超时后不再等待，尚未开始的调用被取消。
+"""
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from config.config import config
+from app.utils.profiler import propagate
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+# 单次批量调用的默认最大并发数，避免触发OCI限流
+DEFAULT_MAX_WORKERS = 8
+# 页面上一组并发OCI查询的默认超时（秒）
+FANOUT_TIMEOUT = config.get('oci_calls.fanout_timeout', 60)
+
+
+class FanoutTimeoutError(TimeoutError):
+    """并发调用未在超时时间内全部完成"""
+
+
+def bounded_map(func: Callable[[T], R], items: Iterable[T], max_workers: int = DEFAULT_MAX_WORKERS,
+                timeout: Optional[float] = None) -> List[R]:
+    """
+    使用有上限的线程池并发执行 func，按输入顺序返回结果
+
+    任一调用抛出的异常会原样向上抛出，需要容错时应在 func 内部处理。
+    设置 timeout 时，超过 timeout 秒仍未全部完成则抛出 FanoutTimeoutError，不等待仍在执行的调用。
+    """
+    items = list(items)
+    if not items:
+        return []
+    if len(items) == 1 and timeout is None:
+        return [func(items[0])]
+
+    workers = max(1, min(max_workers, len(items)))
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        return list(executor.map(propagate(func), items, timeout=timeout))
+    except FutureTimeoutError:
+        raise FanoutTimeoutError(f"{len(items)} 个并发调用未在 {timeout} 秒内全部完成")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_completed(func: Callable[[T], R], items: Iterable[T],
+                   max_workers: int = DEFAULT_MAX_WORKERS) -> Iterator[Tuple[T, R]]:
+    """
+    使用有上限的线程池并发执行 func，按完成顺序逐个产出 (输入, 结果)
+
+    适合需要边计算边返回部分结果的场景。调用方提前停止迭代时，
+    尚未开始的调用会被取消。
+    """
+    items = list(items)
+    if not items:
+        return
+
+    workers = max(1, min(max_workers, len(items)))
+    executor = ThreadPoolExecutor(max_workers=workers)
+    func = propagate(func)
+    try:
+        futures = {executor.submit(func, item): item for item in items}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def run_parallel(*calls: Callable[[], Any], max_workers: int = DEFAULT_MAX_WORKERS,
+                 timeout: Optional[float] = None) -> List[Any]:
+    """并发执行若干个无参调用，按传入顺序返回结果"""
+    return bounded_map(lambda call: call(), calls, max_workers=max_workers, timeout=timeout)
@@ -0,0 +1,93 @@
+"""受保护的OCI客户端
+
+包装 OCI SDK 客户端，使所有服务对客户端方法的调用都经过同一层保护：
+- 同一租户共享令牌桶限制请求速率，只读调用和变更调用可以使用不同的令牌桶；
+- 429 对任何调用退避重试，5xx 和网络错误只对只读调用重试，避免重复创建资源；
+- 同一租户、区域共享熔断器；
+- 按服务记录调用、重试和失败次数，按服务、操作和结果记录调用耗时（租户只出现在剖析的span中）。
+服务代码照常调用 client.list_xxx(...)，也可以把方法交给 app.utils.pagination 分页。
+"""
+import time
+from typing import Any, Optional
+
+from app.utils.lazy_import import oci
+from app.utils.metrics import observe_oci_call
+from app.utils.profiler import span
+from app.utils.throttle import CircuitBreaker, CircuitOpenError, TokenBucket, call_with_retry
+
+# 只读调用的方法名前缀，这些调用在 5xx 时可以安全重试
+IDEMPOTENT_PREFIXES = ('get_', 'list_', 'head_', 'summarize_', 'request_summarized_')
+
+
+def is_idempotent(method_name: str) -> bool:
+    return method_name.startswith(IDEMPOTENT_PREFIXES)
+
+
+def call_status(error: Exception) -> str:
+    """调用结果标签：HTTP状态码、circuit_open 或异常类型"""
+    if isinstance(error, oci.exceptions.ServiceError):
+        return str(error.status)
+    if isinstance(error, CircuitOpenError):
+        return 'circuit_open'
+    return type(error).__name__
+
+
+class GuardedClient:
+    """OCI客户端代理，方法调用经过限流、重试和熔断"""
+
+    def __init__(self, client: Any, service: str, limiter: TokenBucket, breaker: CircuitBreaker,
+                 max_attempts: int = 5, base_delay: float = 0.5, max_delay: float = 8.0, tenant: str = '',
+                 read_limiter: Optional[TokenBucket] = None):
+        """
+        Args:
+            limiter: 变更调用的令牌桶；未指定 read_limiter 时所有调用都使用它
+            read_limiter: 只读调用（见 IDEMPOTENT_PREFIXES）的令牌桶
+        """
+        self._client = client
+        self._service = service
+        self._tenant = tenant
+        self._limiter = limiter
+        self._read_limiter = read_limiter or limiter
+        self._breaker = breaker
+        self._retry_options = {'max_attempts': max_attempts, 'base_delay': base_delay, 'max_delay': max_delay}
+
+    @property
+    def wrapped(self) -> Any:
+        """原始的SDK客户端"""
+        return self._client
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        retry_server_errors = is_idempotent(name)
+        limiter = self._read_limiter if retry_server_errors else self._limiter
+
+        def guarded(*args, **kwargs):
+            started = time.perf_counter()
+            status = 'ok'
+            with span(f"oci {self._service}.{name}", tenant=self._tenant) as node:
+                try:
+                    return call_with_retry(
+                        lambda: attr(*args, **kwargs),
+                        limiter=limiter,
+                        breaker=self._breaker,
+                        retry_server_errors=retry_server_errors,
+                        metric_key=self._service,
+                        **self._retry_options
+                    )
+                except Exception as e:
+                    status = call_status(e)
+                    raise
+                finally:
+                    observe_oci_call(self._service, name, status, time.perf_counter() - started)
+                    if node is not None:
+                        node.attrs['status'] = status
+
+        guarded.__name__ = name
+        guarded.__doc__ = attr.__doc__
+        return guarded
+
+    def __repr__(self) -> str:
+        return f"GuardedClient({self._client!r})"
@@ -0,0 +1,128 @@
+"""缓存失效总线
+
+本应用自己的变更操作（实例操作、更换IP、附加/分离VNIC和卷、修改安全列表和路由表等）
+在完成后发布它涉及的资源键，各个缓存订阅总线并只清除受影响的条目，
+例如某台实例的详情和该租户的实例列表。这样缓存可以使用较长的TTL，
+用户在自己操作之后也不会看到旧数据；OCI侧的其他变化仍按TTL刷新。
+
+总线只在进程内广播，多个 gunicorn 工作进程各自清除自己的缓存。
+
+    class InstanceService:
+        @publishes(lambda args: instance_key(args['tenant_id'], args['instance_id']))
+        def instance_action(self, tenant_id, instance_id, action): ...
+
+    invalidation_bus.subscribe(on_invalidate)  # on_invalidate(keys: List[ResourceKey])
+"""
+import functools
+import inspect
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Union
+
+# 资源类型
+INSTANCE = 'instance'
+VOLUME = 'volume'
+SECURITY_LIST = 'security_list'
+ROUTE_TABLE = 'route_table'
+# 租户的配额使用量（实例、卷的创建、删除或扩容会改变它）
+LIMITS_USAGE = 'limits_usage'
+
+
+class ResourceKey(NamedTuple):
+    """
+    发生变化的资源
+
+    resource_id 为None表示该租户下这类资源的集合发生了变化（新增、删除或无法确定具体资源）
+    """
+    kind: str
+    tenant_id: str
+    resource_id: Optional[str] = None
+
+
+def instance_key(tenant_id: Any, instance_id: Optional[str] = None) -> ResourceKey:
+    return ResourceKey(INSTANCE, str(tenant_id), instance_id)
+
+
+def volume_key(tenant_id: Any, volume_id: Optional[str] = None) -> ResourceKey:
+    return ResourceKey(VOLUME, str(tenant_id), volume_id)
+
+
+def security_list_key(tenant_id: Any, security_list_id: str) -> ResourceKey:
+    return ResourceKey(SECURITY_LIST, str(tenant_id), security_list_id)
+
+
+def route_table_key(tenant_id: Any, route_table_id: str) -> ResourceKey:
+    return ResourceKey(ROUTE_TABLE, str(tenant_id), route_table_id)
+
+
+def limits_key(tenant_id: Any) -> ResourceKey:
+    return ResourceKey(LIMITS_USAGE, str(tenant_id))
+
+
+Subscriber = Callable[[List[ResourceKey]], None]
+
+
+class InvalidationBus:
+    """进程内的资源变更广播"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: List[Subscriber] = []
+
+    def subscribe(self, callback: Subscriber) -> None:
+        """注册回调，每次发布时收到去重后的资源键列表"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def publish(self, keys: Iterable[ResourceKey]) -> None:
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return
+        logging.debug(f"缓存失效: {keys}")
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(keys)
+            except Exception as e:
+                logging.error(f"缓存失效回调执行失败: {str(e)}")
+
+
+# 全局缓存失效总线
+invalidation_bus = InvalidationBus()
+
+KeySpec = Callable[[Dict[str, Any]], Union[ResourceKey, Iterable[ResourceKey], None]]
+
+
+def publishes(*specs: KeySpec) -> Callable:
+    """
+    变更方法执行后（无论成功与否）发布涉及的资源键
+
+    Args:
+        specs: 接收方法参数（按参数名，含默认值）并返回资源键或资源键列表的函数
+    """
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            finally:
+                # 失败的操作也可能已部分生效，同样清除
+                try:
+                    bound = signature.bind(*args, **kwargs)
+                    bound.apply_defaults()
+                    keys: List[ResourceKey] = []
+                    for spec in specs:
+                        result = spec(bound.arguments)
+                        if isinstance(result, ResourceKey):
+                            keys.append(result)
+                        elif result:
+                            keys.extend(result)
+                    invalidation_bus.publish(keys)
+                except Exception as e:
+                    logging.error(f"发布缓存失效失败: {str(e)}")
+
+        return wrapper
+    return decorator
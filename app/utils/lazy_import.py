@@ -0,0 +1,52 @@
+"""延迟导入
+
+`import oci` 默认会导入SDK中上百个服务包，单这一步就要一到数秒，
+而启动应用、响应健康检查时一个OCI客户端都用不到。这里的 oci 是一个模块代理：
+第一次访问属性时才真正导入 oci，并且关闭SDK对全部服务包的自动导入，
+oci.core、oci.identity 等服务包在首次访问时才单独导入。
+
+    from app.utils.lazy_import import oci
+    oci.core.ComputeClient  # 此时才导入 oci 和 oci.core
+
+类型注解中引用 oci 的模块需要 `from __future__ import annotations`，否则定义函数时就会触发导入。
+"""
+import importlib
+import os
+from types import ModuleType
+from typing import Any, Optional
+
+
+class LazyModule:
+    """首次访问属性时才导入的模块代理"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            # 导入由解释器的导入锁保护，多个线程同时首次访问时只会导入一次
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str) -> Any:
+        module = self._load()
+        try:
+            return getattr(module, attr)
+        except AttributeError:
+            pass
+        # 未随父包一起导入的子模块
+        try:
+            return importlib.import_module(f"{self._name}.{attr}")
+        except ModuleNotFoundError:
+            raise AttributeError(f"module '{self._name}' has no attribute '{attr}'") from None
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+# 只导入 oci 的公共部分（配置、签名、异常、重试等），服务包按需导入；
+# SDK 版本不支持该开关时仍会导入全部服务包，行为不变
+os.environ.setdefault('OCI_PYTHON_SDK_NO_SERVICE_IMPORTS', 'True')
+oci = LazyModule('oci')
@@ -0,0 +1,127 @@
+"""Prometheus 指标
+
+集中定义应用导出的指标，并提供 Flask 请求计时钩子和 /metrics 输出：
+- oci_web_request_seconds：按蓝图、端点、方法和状态码统计的请求耗时；
+- oci_web_oci_call_seconds：按服务、操作和结果统计的OCI调用耗时（含重试）；
+  不按租户区分，避免序列数随租户数增长，也不在指标中暴露租户名称；
+- oci_web_oci_call_events_total：OCI调用的重试、限流、熔断等事件；
+- oci_web_cache_events_total：快照缓存的命中、过期命中、未命中等事件；
+- oci_web_coalesced_calls_total：按操作统计实际执行和合并到进行中调用的次数；
+- oci_web_jobs_in_flight：排队或执行中的后台任务数。
+
+使用 gunicorn 多进程时设置 PROMETHEUS_MULTIPROC_DIR，/metrics 会汇总所有工作进程的指标。
+/metrics 只允许 metrics.allowed_networks 中的地址（默认只有本机）和已登录的管理员访问。
+"""
+import ipaddress
+import logging
+import os
+import time
+
+from flask import Flask, Response, g, request
+from flask_login import current_user
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest)
+
+# 请求和OCI调用耗时的分桶（秒），OCI调用常在数百毫秒到数十秒之间
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+REQUEST_LATENCY = Histogram(
+    'oci_web_request_seconds', 'HTTP请求耗时',
+    ['blueprint', 'endpoint', 'method', 'status'],
+    buckets=LATENCY_BUCKETS
+)
+OCI_CALL_LATENCY = Histogram(
+    'oci_web_oci_call_seconds', 'OCI SDK调用耗时（含重试）',
+    ['service', 'operation', 'status'],
+    buckets=LATENCY_BUCKETS
+)
+OCI_CALL_EVENTS = Counter(
+    'oci_web_oci_call_events_total', 'OCI SDK调用事件（calls/retries/throttled/server_errors/failures/rejected）',
+    ['service', 'event']
+)
+CACHE_EVENTS = Counter(
+    'oci_web_cache_events_total', '快照缓存事件（hits/stale_hits/misses/refreshes/discarded/errors）',
+    ['cache', 'event']
+)
+COALESCED_CALLS = Counter(
+    'oci_web_coalesced_calls_total', '相同的并发读取调用（executed：实际执行；shared：合并到进行中的调用）',
+    ['operation', 'result']
+)
+JOBS_IN_FLIGHT = Gauge(
+    'oci_web_jobs_in_flight', '排队或执行中的后台任务数',
+    ['kind'],
+    multiprocess_mode='livesum'
+)
+
+
+def observe_oci_call(service: str, operation: str, status: str, seconds: float) -> None:
+    OCI_CALL_LATENCY.labels(service, operation, status).observe(seconds)
+
+
+def count_oci_event(service: str, event: str) -> None:
+    OCI_CALL_EVENTS.labels(service, event).inc()
+
+
+def count_cache_event(cache: str, event: str) -> None:
+    CACHE_EVENTS.labels(cache, event).inc()
+
+
+def count_coalesced_call(operation: str, result: str) -> None:
+    COALESCED_CALLS.labels(operation, result).inc()
+
+
+def _before_request() -> None:
+    g.metrics_started = time.perf_counter()
+
+
+def _after_request(response: Response) -> Response:
+    started = g.pop('metrics_started', None)
+    if started is not None:
+        # 按端点而不是路径统计，避免实例ID等路径参数造成标签爆炸
+        REQUEST_LATENCY.labels(
+            request.blueprint or '',
+            request.endpoint or 'unmatched',
+            request.method,
+            str(response.status_code)
+        ).observe(time.perf_counter() - started)
+    return response
+
+
+def init_metrics(app: Flask) -> None:
+    """注册请求计时钩子"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+
+def _allowed_networks():
+    from config.config import config
+
+    networks = []
+    for network in config.get('metrics.allowed_networks', ['127.0.0.1/32', '::1/128']) or []:
+        try:
+            networks.append(ipaddress.ip_network(str(network), strict=False))
+        except ValueError:
+            logging.warning(f"忽略无效的 metrics.allowed_networks 配置: {network}")
+    return networks
+
+
+def metrics_allowed() -> bool:
+    """请求来自允许的网络，或当前用户是已登录的管理员"""
+    try:
+        address = ipaddress.ip_address(request.remote_addr or '')
+    except ValueError:
+        address = None
+    if address is not None and any(address in network for network in _allowed_networks()):
+        return True
+    return current_user.is_authenticated and current_user.is_admin
+
+
+def render_metrics() -> Response:
+    """以 Prometheus 文本格式输出当前指标"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,33 @@
+"""NDJSON 流式响应
+
+每行一个 JSON 对象，生成器产出一行就立即发送，客户端不必等全部结果就能开始渲染。
+中途出错时最后一行为 {"error": "..."}。
+"""
+import logging
+from typing import Any, Iterable
+
+from flask import Response, current_app, stream_with_context
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def wants_ndjson(request) -> bool:
+    """请求是否要求流式返回：?format=ndjson 或 Accept: application/x-ndjson"""
+    return request.args.get('format') == 'ndjson' or request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+
+def ndjson_response(rows: Iterable[Any]) -> Response:
+    def generate():
+        try:
+            for row in rows:
+                # 与 jsonify 使用同一套序列化规则（如日期格式）
+                yield current_app.json.dumps(row) + '\n'
+        except Exception as e:
+            logging.error(f"流式返回失败: {str(e)}", exc_info=True)
+            yield current_app.json.dumps({'error': str(e)}) + '\n'
+
+    response = Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+    response.headers['Cache-Control'] = 'no-cache'
+    # 禁止反向代理缓冲
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,175 @@
+"""OCI客户端池
+
+进程级共享的OCI客户端缓存，按 (租户, 服务, 区域) 复用客户端。
+同一租户的所有服务共用一个签名器，避免每次调用都重新读取和解析私钥；
+客户端内部的HTTP会话（连接池）也随客户端一起被复用。
+池中的客户端都包装为 GuardedClient：同一租户的只读调用和变更调用各自共享一个令牌桶，
+同一租户、区域共享熔断器，
+SDK 自带的重试被关闭，由 GuardedClient 统一重试。
+"""
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config.config import config
+from app.utils.guarded_client import GuardedClient
+from app.utils.lazy_import import oci
+from app.utils.profiler import span
+from app.utils.throttle import get_circuit_breaker, get_rate_limiter
+
+# 每个租户每秒最多发出的变更请求（创建、更新、删除等）数及允许的突发量
+OCI_RATE_LIMIT = config.get('oci_calls.rate_limit', 20)
+OCI_BURST = config.get('oci_calls.burst', 40)
+# 只读请求（get/list 等）单独限流：OCI对只读接口的限额高于变更接口，
+# 列表页对每个实例查询VNIC的并发请求不应与变更请求抢同一个令牌桶
+OCI_READ_RATE_LIMIT = config.get('oci_calls.read_rate_limit', 50)
+OCI_READ_BURST = config.get('oci_calls.read_burst', 100)
+# 单次调用的最大尝试次数
+OCI_MAX_ATTEMPTS = config.get('oci_calls.max_attempts', 5)
+# 连续失败多少次后熔断，以及熔断持续时间（秒）
+OCI_FAILURE_THRESHOLD = config.get('oci_calls.failure_threshold', 5)
+OCI_RESET_TIMEOUT = config.get('oci_calls.reset_timeout', 30)
+
+# 服务类型到客户端类（相对 oci 包的路径）的映射，创建客户端时才导入对应的服务包
+SERVICE_CLIENTS: Dict[str, str] = {
+    "compute": "core.ComputeClient",
+    "network": "core.VirtualNetworkClient",
+    "identity": "identity.IdentityClient",
+    "object_storage": "object_storage.ObjectStorageClient",
+    "block_storage": "core.BlockstorageClient",
+    "limits": "limits.LimitsClient",
+    "quotas": "limits.QuotasClient",
+    "usage_api": "usage_api.UsageapiClient",
+    "subscription": "tenant_manager_control_plane.SubscriptionClient",
+}
+
+
+def client_class(service: str) -> Callable[..., Any]:
+    """返回服务类型对应的OCI客户端类"""
+    package, name = SERVICE_CLIENTS[service].rsplit('.', 1)
+    return getattr(getattr(oci, package), name)
+
+# 参与签名的租户字段，任一字段变化都需要重建签名器和客户端
+CREDENTIAL_FIELDS = ('user_ocid', 'fingerprint', 'key_file', 'tenancy', 'region')
+
+
+def credential_signature(tenant: Dict[str, Any]) -> Tuple:
+    """租户凭据签名，可用作与租户ID编号无关的稳定键"""
+    return tuple(tenant.get(field) for field in CREDENTIAL_FIELDS)
+
+
+class OCIClientPool:
+    """线程安全的OCI客户端池"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # (tenant_key, service, region) -> client
+        self._clients: Dict[Tuple[str, str, str], Any] = {}
+        # tenant_key -> (凭据签名, signer)
+        self._signers: Dict[str, Tuple[Tuple, Any]] = {}
+
+    @staticmethod
+    def build_config(tenant: Dict[str, Any]) -> Dict[str, Any]:
+        """根据租户配置构建OCI配置字典"""
+        return {
+            "user": tenant['user_ocid'],
+            "key_file": tenant['key_file'],
+            "fingerprint": tenant['fingerprint'],
+            "tenancy": tenant['tenancy'],
+            "region": tenant['region']
+        }
+
+    def _get_signer(self, tenant_key: str, tenant: Dict[str, Any]) -> Any:
+        """获取租户的签名器，凭据变化时丢弃该租户的全部客户端"""
+        signature = credential_signature(tenant)
+        cached = self._signers.get(tenant_key)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        if cached:
+            logging.info(f"租户 {tenant_key} 的凭据已变化，重建OCI客户端")
+            self._evict_clients(tenant_key)
+
+        with span('读取私钥文件', key_file=tenant['key_file']):
+            signer = oci.signer.Signer(
+                tenancy=tenant['tenancy'],
+                user=tenant['user_ocid'],
+                fingerprint=tenant['fingerprint'],
+                private_key_file_location=tenant['key_file']
+            )
+        self._signers[tenant_key] = (signature, signer)
+        return signer
+
+    def get_client(self, tenant_key: str, service: str, tenant: Dict[str, Any],
+                   region: Optional[str] = None) -> Any:
+        """
+        获取（必要时创建）OCI客户端
+
+        Args:
+            tenant_key: 租户标识
+            service: 服务类型，见 SERVICE_CLIENTS
+            tenant: 租户配置
+            region: 区域，默认使用租户配置中的区域
+
+        Returns:
+            OCI客户端实例
+        """
+        service = service.lower()
+        if service not in SERVICE_CLIENTS:
+            raise ValueError(f"不支持的服务类型: {service}")
+
+        region = region or tenant['region']
+        key = (str(tenant_key), service, region)
+        with self._lock:
+            signer = self._get_signer(str(tenant_key), tenant)
+            client = self._clients.get(key)
+            if client is None:
+                client_config = self.build_config(tenant)
+                client_config['region'] = region
+                logging.info(f"创建 {service} 客户端: 租户 {tenant_key}, 区域 {region}")
+                client = self._guard(client_class(service)(client_config, signer=signer,
+                                                           retry_strategy=oci.retry.NoneRetryStrategy()),
+                                     service, tenant, region)
+                self._clients[key] = client
+            return client
+
+    @staticmethod
+    def _guard(client: Any, service: str, tenant: Dict[str, Any], region: str) -> GuardedClient:
+        """限流和熔断按 tenancy OCID 共享，租户编号变化后仍然沿用"""
+        tenancy = tenant['tenancy']
+        return GuardedClient(
+            client,
+            service=service,
+            limiter=get_rate_limiter(f"oci:{tenancy}", rate=OCI_RATE_LIMIT, capacity=OCI_BURST),
+            read_limiter=get_rate_limiter(f"oci-read:{tenancy}", rate=OCI_READ_RATE_LIMIT,
+                                          capacity=OCI_READ_BURST),
+            breaker=get_circuit_breaker((tenancy, region), failure_threshold=OCI_FAILURE_THRESHOLD,
+                                        reset_timeout=OCI_RESET_TIMEOUT),
+            max_attempts=OCI_MAX_ATTEMPTS,
+            tenant=tenant.get('name') or tenancy
+        )
+
+    def _evict_clients(self, tenant_key: str) -> None:
+        for key in [k for k in self._clients if k[0] == tenant_key]:
+            del self._clients[key]
+
+    def evict(self, tenant_key: str) -> None:
+        """移除某个租户的全部客户端和签名器"""
+        with self._lock:
+            self._evict_clients(str(tenant_key))
+            self._signers.pop(str(tenant_key), None)
+
+    def clear(self) -> None:
+        """清空客户端池"""
+        with self._lock:
+            self._clients.clear()
+            self._signers.clear()
+        logging.info("OCI客户端池已清空")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'clients': len(self._clients), 'signers': len(self._signers)}
+
+
+# 全局客户端池
+client_pool = OCIClientPool()
@@ -0,0 +1,74 @@
+"""OCI列表调用分页
+
+OCI 的 list_* 调用每次只返回一页，后续页通过响应中的 opc-next-page 获取。
+这里统一按 oci_calls.page_size 请求每页条数，并逐页跟随 next_page：
+- iter_pages / iter_items 按页或按条惰性产出，拿到第一页即可开始处理；
+  prefetch 为 True 时，调用方处理当前页的同时在后台请求下一页；
+- list_all 取回全部结果。
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator, List, Optional
+
+from config.config import config
+from app.utils.profiler import propagate
+
+# 每页请求的条数，OCI 多数列表接口的上限为 1000
+OCI_PAGE_SIZE = config.get('oci_calls.page_size', 100)
+
+
+def _page_items(response: Any) -> List[Any]:
+    # 少数接口（如订阅、使用量汇总）返回带 items 的集合对象
+    return response.data if isinstance(response.data, list) else response.data.items or []
+
+
+def iter_pages(list_func: Callable[..., Any], *args: Any, page_size: Optional[int] = None,
+               prefetch: bool = False, **kwargs: Any) -> Iterator[List[Any]]:
+    """
+    逐页调用 list_func，产出每一页的数据
+
+    Args:
+        list_func: OCI客户端的列表方法，如 compute_client.list_instances
+        page_size: 每页条数，默认取 oci_calls.page_size
+        prefetch: 产出当前页之前先在后台请求下一页
+        args, kwargs: 传给 list_func 的参数
+    """
+    kwargs.setdefault('limit', page_size or OCI_PAGE_SIZE)
+    page = kwargs.pop('page', None)
+
+    def fetch(page: Optional[str]) -> Any:
+        return list_func(*args, page=page, **kwargs)
+
+    if not prefetch:
+        while True:
+            response = fetch(page)
+            yield _page_items(response)
+            page = response.next_page
+            if not page:
+                return
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='oci-page')
+    try:
+        fetch_next = propagate(fetch)
+        response = fetch(page)
+        while True:
+            future = executor.submit(fetch_next, response.next_page) if response.next_page else None
+            yield _page_items(response)
+            if future is None:
+                return
+            response = future.result()
+    finally:
+        # 调用方提前停止迭代时不再等待已发出的请求
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_items(list_func: Callable[..., Any], *args: Any, page_size: Optional[int] = None,
+               **kwargs: Any) -> Iterator[Any]:
+    """逐条产出 list_func 的全部结果，需要时才请求下一页"""
+    for items in iter_pages(list_func, *args, page_size=page_size, **kwargs):
+        yield from items
+
+
+def list_all(list_func: Callable[..., Any], *args: Any, page_size: Optional[int] = None,
+             **kwargs: Any) -> List[Any]:
+    """取回 list_func 所有页的结果"""
+    return list(iter_items(list_func, *args, page_size=page_size, **kwargs))
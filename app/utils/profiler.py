@@ -0,0 +1,223 @@
+"""请求级性能剖析
+
+按请求记录耗时树（路由 → 服务方法 → OCI调用、YAML和私钥文件读取）。
+配置 profiling.enabled 为 true 时剖析所有请求，否则只剖析管理员带 X-Profile: 1 请求头的请求
+（其他用户的请求头被忽略，避免任何人都能让服务器做额外的记录）；
+耗时超过 profiling.slow_threshold 的请求（以及带请求头的请求）保存在环形缓冲区中，供管理页面查看。
+
+未开启剖析时，span 只读取一次 contextvar 就返回，几乎没有额外开销。
+线程池中的任务通过 propagate 继承提交者的剖析上下文。
+"""
+import contextvars
+import functools
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from flask import g, request
+from flask_login import current_user
+
+from config.config import config
+
+PROFILE_HEADER = 'X-Profile'
+TRACE_HEADER = 'X-Trace-Id'
+
+# 当前线程（上下文）所在的span，为None表示未开启剖析
+_current_span: contextvars.ContextVar = contextvars.ContextVar('profiler_span', default=None)
+
+
+class Span:
+    """耗时树中的一个节点"""
+
+    __slots__ = ('name', 'attrs', 'start', 'end', 'children', 'error', 'thread')
+
+    def __init__(self, name: str, attrs: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.children: List['Span'] = []
+        self.error: Optional[str] = None
+        self.thread = threading.current_thread().name
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def to_dict(self, origin: Optional[float] = None) -> Dict[str, Any]:
+        origin = self.start if origin is None else origin
+        return {
+            'name': self.name,
+            'attrs': self.attrs,
+            'offset_ms': round((self.start - origin) * 1000, 2),
+            'duration_ms': round(self.duration * 1000, 2),
+            'error': self.error,
+            'thread': self.thread,
+            # 子span可能来自多个线程，按开始时间排列
+            'children': [child.to_dict(origin) for child in sorted(self.children, key=lambda s: s.start)]
+        }
+
+
+@contextmanager
+def span(name: str, **attrs: Any):
+    """在当前剖析上下文中记录一个子span；未开启剖析时直接执行"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    node = Span(name, attrs)
+    parent.children.append(node)
+    token = _current_span.set(node)
+    try:
+        yield node
+    except BaseException as e:
+        node.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        node.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """把函数或方法的每次调用记录为一个span"""
+    def decorator(func: Callable) -> Callable:
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with span(label):
+                return func(*args, **kwargs)
+
+        return wrapper
+    return decorator
+
+
+def propagate(func: Callable) -> Callable:
+    """
+    让提交到线程池的函数继承当前剖析上下文
+
+    每次调用使用上下文的独立副本，多个线程可以同时执行；未开启剖析时原样返回 func。
+    """
+    if _current_span.get() is None:
+        return func
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+
+    return wrapper
+
+
+def is_active() -> bool:
+    return _current_span.get() is not None
+
+
+class TraceBuffer:
+    """保存最近的慢请求耗时树的环形缓冲区"""
+
+    def __init__(self, size: int = 50):
+        self._traces: deque = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, trace: Dict[str, Any]) -> None:
+        with self._lock:
+            self._traces.appendleft(trace)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """按时间倒序返回摘要（不含耗时树）"""
+        with self._lock:
+            traces = list(self._traces)
+        return [{k: v for k, v in trace.items() if k != 'root'} for trace in traces]
+
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return next((trace for trace in self._traces if trace['id'] == trace_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._traces.clear()
+
+
+class RequestProfiler:
+    """Flask 请求剖析钩子"""
+
+    def __init__(self, enabled: bool = False, slow_threshold: float = 2.0, buffer_size: int = 50):
+        """
+        Args:
+            enabled: 是否剖析所有请求
+            slow_threshold: 保存耗时树的阈值（秒）
+            buffer_size: 环形缓冲区保存的请求数
+        """
+        self.enabled = enabled
+        self.slow_threshold = slow_threshold
+        self.buffer = TraceBuffer(buffer_size)
+
+    def init_app(self, app) -> None:
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _before_request(self) -> None:
+        # 只在带请求头时才加载当前用户
+        forced = request.headers.get(PROFILE_HEADER) == '1' and (self.enabled or self._is_admin())
+        if not (self.enabled or forced):
+            return
+        root = Span(f"{request.method} {request.endpoint or request.path}", {'path': request.full_path.rstrip('?')})
+        g.profiler_root = root
+        g.profiler_forced = forced
+        g.profiler_token = _current_span.set(root)
+
+    @staticmethod
+    def _is_admin() -> bool:
+        try:
+            return current_user.is_authenticated and current_user.is_admin
+        except Exception:
+            return False
+
+    def _after_request(self, response):
+        root = g.pop('profiler_root', None)
+        if root is None:
+            return response
+        root.end = time.perf_counter()
+        root.attrs['status'] = response.status_code
+        if g.pop('profiler_forced', False) or root.duration >= self.slow_threshold:
+            trace_id = uuid.uuid4().hex[:16]
+            self.buffer.add({
+                'id': trace_id,
+                'method': request.method,
+                'path': root.attrs['path'],
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                'duration_ms': round(root.duration * 1000, 2),
+                'started_at': time.time() - root.duration,
+                'root': root
+            })
+            response.headers[TRACE_HEADER] = trace_id
+        return response
+
+    def _teardown_request(self, exc) -> None:
+        token = g.pop('profiler_token', None)
+        if token is not None:
+            _current_span.reset(token)
+
+    def get_trace(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        """返回包含耗时树的完整记录"""
+        trace = self.buffer.get(trace_id)
+        if trace is None:
+            return None
+        return dict(trace, root=trace['root'].to_dict())
+
+
+# 全局请求剖析器
+request_profiler = RequestProfiler(
+    enabled=config.get('profiling.enabled', False),
+    slow_threshold=config.get('profiling.slow_threshold', 2.0),
+    buffer_size=config.get('profiling.buffer_size', 50)
+)
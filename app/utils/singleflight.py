@@ -0,0 +1,144 @@
+"""合并相同的并发调用（single-flight）
+
+多个用户或页面轮询同时请求同一租户的同一数据时，只有第一个调用真正访问OCI，
+其余调用等待它完成并取得同一份结果（各自拿到深拷贝，互不影响）；调用失败时所有等待者得到同一个异常。
+只合并正在进行的调用，不缓存结果：前一次调用结束后的新请求会重新访问OCI。
+数据被变更后调用 forget()，之后的请求不再加入变更前开始的调用，而是重新访问OCI。
+
+    class InstanceService:
+        @coalesced()
+        def get_instance(self, tenant_id, instance_id): ...
+"""
+import copy
+import functools
+import inspect
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from app.utils.metrics import count_coalesced_call
+from app.utils.profiler import span
+
+
+class _Call:
+    """一次正在进行的调用"""
+
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """按键合并并发调用"""
+
+    def __init__(self, name: str):
+        """
+        Args:
+            name: 名称，用于统计和剖析
+        """
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._stats = {'executed': 0, 'shared': 0}
+
+    def _record(self, result: str) -> None:
+        with self._lock:
+            self._stats[result] += 1
+        count_coalesced_call(self.name, result)
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """
+        执行 func，同一个键已有调用在进行时等待并共享它的结果
+
+        Args:
+            key: 调用的键，相同的键视为相同的调用
+            func: 无参函数
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            self._record('shared')
+            with span(f"等待合并调用 {self.name}"):
+                call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        self._record('executed')
+        try:
+            result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                # 调用已被 forget 时，键可能已经属于新的调用
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            # 移出之后不会再有新的等待者；调用方可能修改返回值，等待者从单独的副本复制
+            try:
+                if call.error is None and call.waiters:
+                    call.result = copy.deepcopy(result)
+            finally:
+                call.done.set()
+        return result
+
+    def forget(self, key: Optional[Hashable] = None,
+               predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """
+        让之后的调用不再加入进行中的调用；已在等待的调用仍取得原结果
+
+        Args:
+            key: 要遗忘的键；与 predicate 都为空时遗忘全部
+            predicate: 对键返回 True 时遗忘
+
+        Returns:
+            遗忘的调用数
+        """
+        with self._lock:
+            if key is not None:
+                return 1 if self._calls.pop(key, None) is not None else 0
+            keys = [k for k in self._calls if predicate is None or predicate(k)]
+            for k in keys:
+                del self._calls[k]
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, name=self.name, in_flight=len(self._calls))
+
+
+def coalesced(name: Optional[str] = None) -> Callable:
+    """
+    合并服务方法的并发调用，键为方法名和除 self 以外的全部参数（含默认值）
+
+    参数不可哈希时直接执行，不做合并。键是 (参数名, 值) 组成的元组，可用 dict(key) 取参数；
+    包装后的函数通过 flight 属性暴露 SingleFlight，用于 forget。
+    """
+    def decorator(func: Callable) -> Callable:
+        flight = SingleFlight(name or func.__qualname__)
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            key = tuple(bound.arguments.items())[1:]
+            try:
+                hash(key)
+            except TypeError:
+                return func(self, *args, **kwargs)
+            return flight.do(key, lambda: func(self, *args, **kwargs))
+
+        wrapper.flight = flight
+        return wrapper
+    return decorator
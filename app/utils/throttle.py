@@ -0,0 +1,259 @@
+"""OCI调用限流、重试与熔断
+
+按租户共享的令牌桶，限制并发批量调用对OCI的请求速率；
+遇到 429（TooManyRequests）或 5xx 时按指数退避加随机抖动重试；
+同一租户、区域连续失败时熔断一段时间，快速失败而不是继续堆积请求。
+重试、限流和熔断次数记录在进程内计数器中，见 call_metrics。
+"""
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from app.utils.lazy_import import oci
+from app.utils.metrics import count_oci_event
+
+# 被限流的HTTP状态码，请求未被执行，任何调用都可以安全重试
+THROTTLED_STATUS = {429}
+# 服务端错误，只对幂等（只读）调用重试
+SERVER_ERROR_STATUS = {500, 502, 503, 504}
+
+
+class TokenBucket:
+    """线程安全的令牌桶"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 桶容量，即允许的突发请求数，默认等于 rate
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """取得令牌，令牌不足时阻塞等待"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_rate_limiter(key: str, rate: float = 10.0, capacity: Optional[float] = None) -> TokenBucket:
+    """
+    获取（必要时创建）指定键的共享令牌桶
+
+    同一个键在进程内只有一个令牌桶，第一次创建时的速率生效。
+    """
+    key = str(key)
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(rate, capacity)
+            _buckets[key] = bucket
+        return bucket
+
+
+def is_throttled(error: Exception) -> bool:
+    return isinstance(error, oci.exceptions.ServiceError) and error.status in THROTTLED_STATUS
+
+
+def is_server_error(error: Exception) -> bool:
+    """5xx 或网络层错误（连接失败、超时）"""
+    if isinstance(error, oci.exceptions.ServiceError):
+        return error.status in SERVER_ERROR_STATUS
+    return isinstance(error, (oci.exceptions.RequestException, oci.exceptions.ConnectTimeout, ConnectionError))
+
+
+class CircuitOpenError(Exception):
+    """熔断期间直接拒绝的调用"""
+
+
+class CircuitBreaker:
+    """
+    线程安全的熔断器
+
+    连续 failure_threshold 次失败（5xx、网络错误或重试耗尽的限流）后打开，
+    reset_timeout 秒内的调用直接抛出 CircuitOpenError；之后放行一次试探调用，
+    成功则关闭，失败则重新打开。
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def before_call(self) -> None:
+        """调用前检查，熔断期间抛出 CircuitOpenError"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._trial_running = False
+            if self._state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return
+            remaining = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+        raise CircuitOpenError(f"{self.name} 连续调用失败，已暂停请求，约 {remaining:.0f} 秒后重试")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                logging.info(f"熔断器 {self.name} 已恢复")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logging.warning(f"熔断器 {self.name} 打开，连续失败 {self._failures} 次")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_running = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'name': self.name, 'state': self._state, 'failures': self._failures}
+
+
+_breakers: Dict[Hashable, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(key: Hashable, failure_threshold: int = 5, reset_timeout: float = 30.0) -> CircuitBreaker:
+    """获取（必要时创建）指定键的共享熔断器"""
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            name = ':'.join(str(part) for part in key) if isinstance(key, tuple) else str(key)
+            breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+            _breakers[key] = breaker
+        return breaker
+
+
+def circuit_breakers() -> Dict[Hashable, Dict[str, Any]]:
+    """所有熔断器的当前状态"""
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {key: breaker.snapshot() for key, breaker in breakers.items()}
+
+
+# 调用计数：(服务, 事件) -> 次数；事件为 calls/retries/throttled/server_errors/failures/rejected
+_metrics: Counter = Counter()
+_metrics_lock = threading.Lock()
+
+
+def _count(metric_key: Optional[str], event: str) -> None:
+    if metric_key is None:
+        return
+    with _metrics_lock:
+        _metrics[(metric_key, event)] += 1
+    count_oci_event(metric_key, event)
+
+
+def call_metrics() -> Dict[Tuple[str, str], int]:
+    """返回 (服务, 事件) -> 次数 的计数快照"""
+    with _metrics_lock:
+        return dict(_metrics)
+
+
+def call_with_retry(func: Callable[[], Any], limiter: Optional[TokenBucket] = None,
+                    max_attempts: int = 5, base_delay: float = 0.5, max_delay: float = 8.0,
+                    breaker: Optional[CircuitBreaker] = None, retry_server_errors: bool = False,
+                    metric_key: Optional[str] = None) -> Any:
+    """
+    执行一次OCI调用，被限流（以及可选的服务端错误）时退避重试
+
+    Args:
+        func: 无参调用
+        limiter: 每次尝试前需要取得令牌的令牌桶
+        max_attempts: 最大尝试次数
+        base_delay: 第一次重试前的基础等待时间（秒）
+        max_delay: 单次等待时间上限（秒）
+        breaker: 熔断器，打开时直接抛出 CircuitOpenError
+        retry_server_errors: 是否对 5xx 和网络错误重试，只应对幂等调用开启
+        metric_key: 计数使用的名称，为空时不计数
+
+    Returns:
+        func 的返回值；不可重试的异常或重试耗尽后原样抛出
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        # 只在第一次尝试前检查熔断：半开状态下放行的试探调用由本次调用持有，重试时不能再被自己拒绝；
+        # 之后的每条退出路径都会调用 record_success 或 record_failure，释放试探名额
+        if breaker and attempt == 1:
+            try:
+                breaker.before_call()
+            except CircuitOpenError:
+                _count(metric_key, 'rejected')
+                raise
+        if limiter:
+            limiter.acquire()
+        _count(metric_key, 'calls')
+        try:
+            result = func()
+        except Exception as e:
+            throttled = is_throttled(e)
+            server_error = is_server_error(e)
+            if throttled:
+                _count(metric_key, 'throttled')
+            elif server_error:
+                _count(metric_key, 'server_errors')
+            retryable = throttled or (server_error and retry_server_errors)
+            if not retryable or attempt >= max_attempts:
+                if breaker:
+                    # 其他4xx说明服务可达，不计入熔断
+                    if throttled or server_error:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                if throttled or server_error:
+                    _count(metric_key, 'failures')
+                raise
+            # 全抖动退避，避免并发请求同时重试
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** (attempt - 1))))
+            reason = '被限流' if throttled else f"失败（{getattr(e, 'status', type(e).__name__)}）"
+            logging.warning(f"OCI请求{reason}，{delay:.2f} 秒后第 {attempt} 次重试")
+            _count(metric_key, 'retries')
+            time.sleep(delay)
+        else:
+            if breaker:
+                breaker.record_success()
+            return result
@@ -0,0 +1,173 @@
+"""列式使用量聚合
+
+把使用量数据一次性拆成若干列（日期、租户、服务、SKU、单位、使用量、费用），
+单位推断按不同的SKU只做一次，分组时先把分组键编码为整数，再按编码批量累加和排序，
+避免逐条构造字典。
+"""
+from itertools import compress
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+# 列名，顺序与 from_rows 接收的行一致
+COLUMNS = ('day', 'tenant', 'service', 'sku_name', 'unit', 'quantity', 'cost')
+# 可作为分组键的列
+GROUP_KEYS = ('day', 'tenant', 'service', 'sku_name', 'unit')
+
+# 单位推断规则，按顺序匹配SKU名称（大写）中的关键字
+UNIT_RULES = (
+    (('OCPU', 'CPU'), 'OCPU Hours'),
+    (('MEMORY',), 'GB Hours'),
+    (('STORAGE', 'VOLUME', 'BACKUP'), 'GB Months'),
+    (('BANDWIDTH', 'DATA TRANSFER', 'OUTBOUND'), 'GB'),
+    (('DATABASE',), 'Instance Hours'),
+)
+DEFAULT_UNIT = 'Units'
+
+
+def infer_unit(sku_name: Optional[str]) -> str:
+    """根据SKU名称推断计量单位"""
+    sku_name_upper = (sku_name or '').upper()
+    for words, unit in UNIT_RULES:
+        if any(word in sku_name_upper for word in words):
+            return unit
+    return DEFAULT_UNIT
+
+
+class UsageFrame:
+    """按列存储的使用量数据"""
+
+    def __init__(self, columns: Dict[str, List[Any]]):
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.columns['quantity'])
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence[Any]], fields: Sequence[str] = COLUMNS,
+                  **constants: Any) -> 'UsageFrame':
+        """
+        由行构建
+
+        Args:
+            rows: 每行按 fields 顺序排列的序列
+            fields: 行中各列的名称，缺少的列用 constants 中的常量或None填充
+            constants: 整列相同的值，如 tenant='1'
+        """
+        rows = rows if isinstance(rows, list) else list(rows)
+        columns = {name: list(map(itemgetter(i), rows)) for i, name in enumerate(fields)}
+        size = len(rows)
+        for name in COLUMNS:
+            if name not in columns:
+                columns[name] = [constants.get(name)] * size
+        for name in ('quantity', 'cost'):
+            values = columns[name]
+            columns[name] = list(map(float, values)) if None not in values else [float(v or 0) for v in values]
+        return cls(columns)
+
+    @classmethod
+    def concat(cls, frames: Iterable['UsageFrame']) -> 'UsageFrame':
+        columns = {name: [] for name in COLUMNS}
+        for frame in frames:
+            for name in COLUMNS:
+                columns[name].extend(frame.columns[name])
+        return cls(columns)
+
+    def positive(self, names: Sequence[str] = COLUMNS) -> 'UsageFrame':
+        """只保留使用量大于0的行，names 指定需要保留的列"""
+        quantities = self.columns['quantity']
+        names = set(names) | {'quantity', 'cost'}
+        if not quantities or min(quantities) > 0:
+            return UsageFrame({name: self.columns[name] for name in names})
+        mask = [quantity > 0 for quantity in quantities]
+        return UsageFrame({name: list(compress(self.columns[name], mask)) for name in names})
+
+    def resolve_units(self, infer: Callable[[Optional[str]], str] = infer_unit) -> 'UsageFrame':
+        """
+        统一每个SKU的单位
+
+        每个SKU以第一次出现时的单位为准，第一次出现时没有单位则按名称推断；
+        推断对每个不同的SKU只执行一次。
+        """
+        sku_units: Dict[Any, str] = {}
+        for sku_name, unit in zip(self.columns['sku_name'], self.columns['unit']):
+            if sku_name not in sku_units:
+                sku_units[sku_name] = unit or infer(sku_name)
+        columns = dict(self.columns)
+        columns['unit'] = [sku_units[sku_name] for sku_name in self.columns['sku_name']]
+        return UsageFrame(columns)
+
+    def group(self, by: Sequence[str], carry: Sequence[str] = ()) -> List[Dict[str, Any]]:
+        """
+        按列分组汇总使用量和费用
+
+        Args:
+            by: 分组键列名
+            carry: 额外携带的列，取每组第一次出现的值
+
+        Returns:
+            每组一个字典，包含分组键、carry 列、total_quantity 和 total_cost
+        """
+        for name in list(by) + list(carry):
+            if name not in GROUP_KEYS:
+                raise ValueError(f"不支持的分组字段: {name}")
+
+        size = len(self)
+        keys = list(zip(*(self.columns[name] for name in by))) if by else [()] * size
+        # 分组键编码为该组第一次出现的行号
+        codes_by_key: Dict[tuple, int] = {}
+        codes = list(map(codes_by_key.setdefault, keys, range(size)))
+
+        quantities = dict.fromkeys(codes_by_key.values(), 0.0)
+        costs = dict.fromkeys(codes_by_key.values(), 0.0)
+        for code, quantity in zip(codes, self.columns['quantity']):
+            quantities[code] += quantity
+        for code, cost in zip(codes, self.columns['cost']):
+            costs[code] += cost
+
+        carry_columns = [self.columns[name] for name in carry]
+        result = []
+        for key, code in codes_by_key.items():
+            group = dict(zip(by, key))
+            for name, values in zip(carry, carry_columns):
+                group.setdefault(name, values[code])
+            group['total_quantity'] = quantities[code]
+            group['total_cost'] = costs[code]
+            result.append(group)
+        return result
+
+
+def sort_groups(groups: List[Dict[str, Any]], tie_breakers: Sequence[str] = ()) -> List[Dict[str, Any]]:
+    """按费用降序排序，费用相同时按 tie_breakers 升序"""
+    if tie_breakers:
+        # 稳定排序：先按次要键升序，再按费用降序
+        groups = sorted(groups, key=itemgetter(*tie_breakers))
+    return sorted(groups, key=itemgetter('total_cost'), reverse=True)
+
+
+def aggregate_usage(frame: UsageFrame, group_by: Sequence[str] = ('sku_name', 'unit'),
+                    top_n: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    汇总使用量
+
+    Args:
+        frame: 使用量数据
+        group_by: 分组字段，默认按SKU和单位，也可以按日期、服务、租户等组合
+        top_n: 只返回费用最高的前N组
+
+    Returns:
+        按费用降序排列的分组列表；包含日期分组且未指定 top_n 时按日期排列
+    """
+    # 按SKU分组时携带服务和单位；跨SKU分组时它们没有意义
+    carry = [name for name in ('service', 'unit') if name not in group_by] if 'sku_name' in group_by else []
+    frame = frame.positive(list(group_by) + carry + ['sku_name'])
+    if 'unit' in group_by or 'unit' in carry:
+        frame = frame.resolve_units()
+    groups = frame.group(group_by, carry=carry)
+    tie_breakers = [name for name in ('day', 'tenant', 'service', 'sku_name') if name in group_by or name in carry]
+    groups = sort_groups(groups, tie_breakers)
+    if top_n:
+        return groups[:top_n]
+    if 'day' in group_by:
+        # 按日期分组时按时间顺序排列，同一天内仍按费用降序
+        groups.sort(key=itemgetter('day'))
+    return groups
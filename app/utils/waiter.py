@@ -0,0 +1,53 @@
+"""按资源状态等待
+
+代替固定时长的 sleep 和 oci.wait_until 的固定轮询间隔：开始时频繁查询，
+之后逐步拉长间隔，资源一到达目标状态就返回。状态查询同样经过客户端的限流层。
+"""
+import time
+from typing import Callable, Iterable, Optional
+
+from app.utils.lazy_import import oci
+
+
+class WaitTimeoutError(TimeoutError):
+    """资源未在超时时间内到达目标状态"""
+
+
+def wait_for_state(fetch_state: Callable[[], Optional[str]], targets: Iterable[str], timeout: float = 300,
+                   initial_interval: float = 1.0, max_interval: float = 8.0, factor: float = 1.5,
+                   succeed_on_not_found: bool = False, description: str = '资源') -> Optional[str]:
+    """
+    轮询 fetch_state 直到返回的状态属于 targets
+
+    Args:
+        fetch_state: 返回资源当前状态的函数
+        targets: 目标状态
+        timeout: 最长等待时间（秒）
+        initial_interval: 首次轮询间隔（秒）
+        max_interval: 轮询间隔上限（秒）
+        factor: 每次轮询后间隔的放大倍数
+        succeed_on_not_found: 查询返回 404 时视为成功（等待删除时使用）
+        description: 超时错误信息中的资源描述
+
+    Returns:
+        到达的状态；资源已不存在且 succeed_on_not_found 时返回None
+    """
+    targets = set(targets)
+    deadline = time.monotonic() + timeout
+    interval = initial_interval
+    state = None
+    while True:
+        try:
+            state = fetch_state()
+        except oci.exceptions.ServiceError as e:
+            if e.status == 404 and succeed_on_not_found:
+                return None
+            raise
+        if state in targets:
+            return state
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise WaitTimeoutError(f"{description}在 {timeout} 秒内未变为 {'/'.join(sorted(targets))}，当前状态: {state}")
+        time.sleep(min(interval, remaining))
+        interval = min(interval * factor, max_interval)
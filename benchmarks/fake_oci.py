@@ -0,0 +1,481 @@
+"""模拟的OCI后端
+
+在内存中生成合成租户（实例、VNIC、引导卷、镜像、子网、规格、配额和使用量），
+并实现服务层用到的 compute、network、blockstorage、identity、limits、quotas、usage_api 调用。
+创建、终止实例和分离VNIC后，资源在之后的几次查询中依次经过中间状态再到达最终状态，
+用于测试按状态等待的后台任务。
+每次调用按配置注入延迟、分页、限流（429）和服务端错误（500），并按 (服务, 操作) 计数。
+
+install() 会把全局租户注册表指向临时的 tenants.yml，并让客户端池返回包装在 GuardedClient 中的模拟客户端，
+因此限流、重试、熔断和指标与生产环境走同一条路径。
+"""
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import oci
+import yaml
+
+AVAILABILITY_DOMAINS = ['AD-1', 'AD-2', 'AD-3']
+OPERATING_SYSTEMS = ['Oracle Linux', 'CentOS', 'Canonical Ubuntu']
+SHAPES = [
+    ('VM.Standard.A1.Flex', 4, 24),
+    ('VM.Standard.E2.1.Micro', 1, 1),
+    ('VM.Standard.E4.Flex', 2, 16),
+    ('VM.Standard3.Flex', 2, 32),
+]
+USAGE_SKUS = [
+    ('COMPUTE', 'Oracle Cloud Infrastructure Compute - OCPU', 'OCPU Hours'),
+    ('COMPUTE', 'Oracle Cloud Infrastructure Compute - Memory', 'GB Hours'),
+    ('BLOCK_STORAGE', 'Block Volume - Storage', None),
+    ('NETWORK', 'Outbound Data Transfer', None),
+    ('OBJECT_STORAGE', 'Object Storage - Storage', 'GB Months'),
+]
+LIMIT_SERVICES = {
+    'compute': ['standard-a1-core-count', 'standard-a1-memory-count', 'standard-e2-micro-core-count',
+                'standard-e4-core-count', 'vm-standard3-core-count'],
+    'block-storage': ['total-storage-gb', 'volume-count', 'backup-count'],
+    'vcn': ['vcn-count', 'subnet-count', 'reserved-public-ip-count'],
+}
+
+
+def make_tenants(count: int, region: str = 'ap-tokyo-1') -> List[Dict[str, Any]]:
+    """生成合成租户配置（私钥文件不存在，客户端由模拟后端提供）"""
+    return [{
+        'name': f'bench-{i + 1}',
+        'user_ocid': f'ocid1.user.oc1..bench{i + 1}',
+        'fingerprint': '00:00:00:00',
+        'key_file': '/nonexistent/bench.pem',
+        'tenancy': f'ocid1.tenancy.oc1..bench{i + 1}',
+        'compartment_id': f'ocid1.tenancy.oc1..bench{i + 1}',
+        'region': region,
+    } for i in range(count)]
+
+
+class Tenancy:
+    """单个合成租户的资源数据"""
+
+    def __init__(self, tenancy: str, instances: int, rng: random.Random):
+        self.tenancy = tenancy
+        created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.instances = []
+        self.vnic_attachments = []
+        self.vnics = {}
+        self.boot_volumes = []
+        self.boot_volume_attachments = []
+        for i in range(instances):
+            shape, ocpus, memory = rng.choice(SHAPES)
+            ad = AVAILABILITY_DOMAINS[i % len(AVAILABILITY_DOMAINS)]
+            instance_id = f'ocid1.instance.{tenancy}.{i}'
+            state = rng.choices(['RUNNING', 'STOPPED', 'TERMINATED'], weights=[80, 15, 5])[0]
+            self.instances.append(SimpleNamespace(
+                id=instance_id, display_name=f'instance-{i}', lifecycle_state=state,
+                availability_domain=ad, shape=shape, time_created=created + timedelta(hours=i),
+                shape_config=SimpleNamespace(ocpus=ocpus, memory_in_gbs=memory),
+                compartment_id=tenancy, region='ap-tokyo-1', dedicated_vm_host_id=None
+            ))
+            if state == 'TERMINATED':
+                continue
+            vnic_id = f'ocid1.vnic.{tenancy}.{i}'
+            self.vnic_attachments.append(SimpleNamespace(
+                id=f'ocid1.vnicattachment.{tenancy}.{i}', instance_id=instance_id, vnic_id=vnic_id,
+                lifecycle_state='ATTACHED', availability_domain=ad
+            ))
+            self.vnics[vnic_id] = SimpleNamespace(
+                id=vnic_id, display_name=f'vnic-{i}', private_ip=f'10.0.{i // 250}.{i % 250 + 2}',
+                public_ip=f'203.0.{i // 250}.{i % 250 + 2}' if state == 'RUNNING' else None,
+                ipv6_addresses=[], subnet_id=f'ocid1.subnet.{tenancy}.0', mac_address='02:00:17:00:00:00',
+                is_primary=True, lifecycle_state='AVAILABLE'
+            )
+            volume_id = f'ocid1.bootvolume.{tenancy}.{i}'
+            self.boot_volumes.append(SimpleNamespace(
+                id=volume_id, display_name=f'instance-{i} (Boot Volume)', availability_domain=ad,
+                size_in_gbs=rng.choice([47, 50, 100, 200]), vpus_per_gb=10, lifecycle_state='AVAILABLE'
+            ))
+            self.boot_volume_attachments.append(SimpleNamespace(
+                id=f'ocid1.bootvolumeattachment.{tenancy}.{i}', boot_volume_id=volume_id,
+                instance_id=instance_id, availability_domain=ad, lifecycle_state='ATTACHED'
+            ))
+
+        self.images = [SimpleNamespace(
+            id=f'ocid1.image.{tenancy}.{os_index}.{v}', operating_system=os_name,
+            operating_system_version=f'{v + 7}', display_name=f'{os_name}-{v + 7}-2024.01.01-0',
+            size_in_mbs=47694
+        ) for os_index, os_name in enumerate(OPERATING_SYSTEMS) for v in range(12)]
+        self.vcns = [SimpleNamespace(id=f'ocid1.vcn.{tenancy}.{v}', display_name=f'vcn-{v}') for v in range(3)]
+        self.subnets = {vcn.id: [SimpleNamespace(
+            id=f'ocid1.subnet.{tenancy}.{v}.{s}', display_name=f'subnet-{s}', cidr_block=f'10.{v}.{s}.0/24',
+            availability_domain=None
+        ) for s in range(4)] for v, vcn in enumerate(self.vcns)}
+        self.shapes = [SimpleNamespace(
+            shape=shape, ocpus=ocpus, memory_in_gbs=memory, networking_bandwidth_in_gbps=1,
+            processor_description='Synthetic'
+        ) for shape, ocpus, memory in SHAPES]
+        self.limit_definitions = [SimpleNamespace(
+            service_name=service, name=name, description=f'{service} {name}',
+            scope_type='AD' if service == 'compute' else 'REGION'
+        ) for service, names in LIMIT_SERVICES.items() for name in names]
+
+
+class FakeBackend:
+    """模拟OCI后端：注入延迟、分页和错误，并统计调用次数"""
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.02, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, page_size: int = 100, seed: int = 7, transition_polls: int = 2):
+        """
+        Args:
+            latency: 每次调用的平均延迟（秒）
+            jitter: 延迟的随机浮动范围（秒）
+            error_rate: 返回 500 的概率
+            throttle_rate: 返回 429 的概率
+            page_size: 未指定 limit 时每页返回的条数
+            seed: 随机种子
+            transition_polls: 状态变化操作之后，资源在多少次查询后到达最终状态
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.page_size = page_size
+        self.transition_polls = transition_polls
+        self._rng = random.Random(seed)
+        self._seed = seed
+        self._lock = threading.Lock()
+        self.calls: Counter = Counter()
+        self.tenancies: Dict[str, Tenancy] = {}
+
+    def add_tenancy(self, tenancy: str, instances: int) -> Tenancy:
+        data = Tenancy(tenancy, instances, random.Random(f'{self._seed}:{tenancy}'))
+        self.tenancies[tenancy] = data
+        return data
+
+    def reset_counts(self) -> None:
+        with self._lock:
+            self.calls.clear()
+
+    def call_counts(self) -> Counter:
+        with self._lock:
+            return Counter(self.calls)
+
+    def call(self, service: str, operation: str) -> None:
+        """记录一次调用，等待模拟延迟，并按概率抛出错误"""
+        with self._lock:
+            self.calls[(service, operation)] += 1
+            roll = self._rng.random()
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+        time.sleep(delay)
+        if roll < self.throttle_rate:
+            raise oci.exceptions.ServiceError(429, 'TooManyRequests', {}, 'Too many requests')
+        if roll < self.throttle_rate + self.error_rate:
+            raise oci.exceptions.ServiceError(500, 'InternalServerError', {}, 'Internal server error')
+
+    def page(self, items: List[Any], page: Optional[str] = None, limit: Optional[int] = None) -> oci.response.Response:
+        """按 page/limit 切片，还有下一页时设置 opc-next-page"""
+        start = int(page or 0)
+        size = limit or self.page_size
+        end = start + size
+        headers = {'opc-next-page': str(end)} if end < len(items) else {}
+        return oci.response.Response(200, headers, items[start:end], None)
+
+    @staticmethod
+    def single(data: Any) -> oci.response.Response:
+        return oci.response.Response(200, {}, data, None)
+
+    def transition(self, resource: Any, intermediate: str, final: str) -> None:
+        """让资源先处于中间状态，之后第 transition_polls 次查询时变为最终状态"""
+        with self._lock:
+            resource.lifecycle_state = intermediate
+            resource.pending_states = [intermediate] * max(0, self.transition_polls - 1) + [final]
+
+    def advance(self, resource: Any) -> Any:
+        """查询资源时推进一次状态变化"""
+        with self._lock:
+            pending = getattr(resource, 'pending_states', None)
+            if pending:
+                resource.lifecycle_state = pending.pop(0)
+        return resource
+
+    def tenancy_for(self, compartment_id: str) -> Tenancy:
+        data = self.tenancies.get(compartment_id)
+        if data is None:
+            raise oci.exceptions.ServiceError(404, 'NotAuthorizedOrNotFound', {}, f'{compartment_id} not found')
+        return data
+
+
+class FakeClient:
+    """模拟客户端基类"""
+
+    service = ''
+
+    def __init__(self, backend: FakeBackend, tenancy: str):
+        self.backend = backend
+        self.tenancy = tenancy
+        self.base_client = SimpleNamespace(endpoint=f'https://fake/{self.service}')
+
+    def _data(self, operation: str, compartment_id: Optional[str] = None) -> Tenancy:
+        self.backend.call(self.service, operation)
+        return self.backend.tenancy_for(compartment_id or self.tenancy)
+
+    @staticmethod
+    def _not_found(resource_id: str):
+        return oci.exceptions.ServiceError(404, 'NotAuthorizedOrNotFound', {}, f'{resource_id} not found')
+
+
+class FakeComputeClient(FakeClient):
+    service = 'compute'
+
+    def list_instances(self, compartment_id, page=None, limit=None, **kwargs):
+        return self.backend.page(self._data('list_instances', compartment_id).instances, page, limit)
+
+    def get_instance(self, instance_id, **kwargs):
+        data = self._data('get_instance')
+        instance = next((i for i in data.instances if i.id == instance_id), None)
+        if instance is None:
+            raise self._not_found(instance_id)
+        return self.backend.single(self.backend.advance(instance))
+
+    def launch_instance(self, launch_instance_details, **kwargs):
+        data = self._data('launch_instance')
+        details = launch_instance_details
+        i = len(data.instances)
+        instance_id = f'ocid1.instance.{data.tenancy}.{i}'
+        shape_config = details.shape_config
+        instance = SimpleNamespace(
+            id=instance_id, display_name=details.display_name, lifecycle_state='PROVISIONING',
+            availability_domain=details.availability_domain, shape=details.shape,
+            time_created=datetime.now(timezone.utc),
+            shape_config=SimpleNamespace(ocpus=shape_config.ocpus if shape_config else 1,
+                                         memory_in_gbs=shape_config.memory_in_gbs if shape_config else 1),
+            compartment_id=details.compartment_id, region='ap-tokyo-1', dedicated_vm_host_id=None
+        )
+        self.backend.transition(instance, 'PROVISIONING', 'RUNNING')
+        vnic_id = f'ocid1.vnic.{data.tenancy}.{i}'
+        data.vnic_attachments.append(SimpleNamespace(
+            id=f'ocid1.vnicattachment.{data.tenancy}.{i}', instance_id=instance_id, vnic_id=vnic_id,
+            lifecycle_state='ATTACHED', availability_domain=details.availability_domain
+        ))
+        data.vnics[vnic_id] = SimpleNamespace(
+            id=vnic_id, display_name=f'vnic-{i}', private_ip=f'10.1.{i // 250}.{i % 250 + 2}',
+            public_ip=f'198.51.{i // 250}.{i % 250 + 2}', ipv6_addresses=[],
+            subnet_id=details.create_vnic_details.subnet_id, mac_address='02:00:17:00:00:01',
+            is_primary=True, lifecycle_state='AVAILABLE'
+        )
+        data.instances.append(instance)
+        return self.backend.single(instance)
+
+    def terminate_instance(self, instance_id, **kwargs):
+        data = self._data('terminate_instance')
+        instance = next((i for i in data.instances if i.id == instance_id), None)
+        if instance is None:
+            raise self._not_found(instance_id)
+        self.backend.transition(instance, 'TERMINATING', 'TERMINATED')
+        return self.backend.single(None)
+
+    def get_vnic_attachment(self, vnic_attachment_id, **kwargs):
+        data = self._data('get_vnic_attachment')
+        attachment = next((a for a in data.vnic_attachments if a.id == vnic_attachment_id), None)
+        if attachment is None:
+            raise self._not_found(vnic_attachment_id)
+        return self.backend.single(self.backend.advance(attachment))
+
+    def detach_vnic(self, vnic_attachment_id, **kwargs):
+        data = self._data('detach_vnic')
+        attachment = next((a for a in data.vnic_attachments if a.id == vnic_attachment_id), None)
+        if attachment is None:
+            raise self._not_found(vnic_attachment_id)
+        self.backend.transition(attachment, 'DETACHING', 'DETACHED')
+        return self.backend.single(None)
+
+    def list_vnic_attachments(self, compartment_id, instance_id=None, page=None, limit=None, **kwargs):
+        attachments = self._data('list_vnic_attachments', compartment_id).vnic_attachments
+        if instance_id:
+            attachments = [a for a in attachments if a.instance_id == instance_id]
+        return self.backend.page(attachments, page, limit)
+
+    def list_boot_volume_attachments(self, availability_domain, compartment_id, page=None, limit=None, **kwargs):
+        attachments = self._data('list_boot_volume_attachments', compartment_id).boot_volume_attachments
+        return self.backend.page([a for a in attachments if a.availability_domain == availability_domain], page, limit)
+
+    def list_images(self, compartment_id, operating_system=None, page=None, limit=None, **kwargs):
+        images = self._data('list_images', compartment_id).images
+        if operating_system:
+            images = [i for i in images if i.operating_system == operating_system]
+        return self.backend.page(images, page, limit)
+
+    def list_shapes(self, compartment_id, page=None, limit=None, **kwargs):
+        return self.backend.page(self._data('list_shapes', compartment_id).shapes, page, limit)
+
+
+class FakeNetworkClient(FakeClient):
+    service = 'network'
+
+    def get_vnic(self, vnic_id, **kwargs):
+        vnic = self._data('get_vnic').vnics.get(vnic_id)
+        if vnic is None:
+            raise self._not_found(vnic_id)
+        return self.backend.single(vnic)
+
+    def list_vcns(self, compartment_id, page=None, limit=None, **kwargs):
+        return self.backend.page(self._data('list_vcns', compartment_id).vcns, page, limit)
+
+    def list_subnets(self, compartment_id, vcn_id=None, page=None, limit=None, **kwargs):
+        subnets = self._data('list_subnets', compartment_id).subnets
+        items = subnets.get(vcn_id, []) if vcn_id else [s for group in subnets.values() for s in group]
+        return self.backend.page(items, page, limit)
+
+
+class FakeBlockstorageClient(FakeClient):
+    service = 'block_storage'
+
+    def list_boot_volumes(self, availability_domain=None, compartment_id=None, page=None, limit=None, **kwargs):
+        volumes = self._data('list_boot_volumes', compartment_id).boot_volumes
+        if availability_domain:
+            volumes = [v for v in volumes if v.availability_domain == availability_domain]
+        return self.backend.page(volumes, page, limit)
+
+
+class FakeIdentityClient(FakeClient):
+    service = 'identity'
+
+    def list_availability_domains(self, compartment_id, **kwargs):
+        self._data('list_availability_domains', compartment_id)
+        return self.backend.single([SimpleNamespace(name=name) for name in AVAILABILITY_DOMAINS])
+
+    def get_user(self, user_id, **kwargs):
+        self._data('get_user')
+        return self.backend.single(SimpleNamespace(id=user_id, lifecycle_state='ACTIVE'))
+
+
+class FakeLimitsClient(FakeClient):
+    service = 'limits'
+
+    def list_services(self, compartment_id, page=None, limit=None, **kwargs):
+        self._data('list_services', compartment_id)
+        services = [SimpleNamespace(name=name, description=name) for name in LIMIT_SERVICES]
+        return self.backend.page(services, page, limit)
+
+    def list_limit_definitions(self, compartment_id, page=None, limit=None, **kwargs):
+        return self.backend.page(self._data('list_limit_definitions', compartment_id).limit_definitions, page, limit)
+
+    def list_limit_values(self, compartment_id, service_name, availability_domain=None, page=None, limit=None,
+                          **kwargs):
+        data = self._data('list_limit_values', compartment_id)
+        values = []
+        for definition in data.limit_definitions:
+            if definition.service_name != service_name:
+                continue
+            domains = AVAILABILITY_DOMAINS if definition.scope_type == 'AD' else [None]
+            for domain in domains:
+                if availability_domain and domain not in (None, availability_domain):
+                    continue
+                values.append(SimpleNamespace(name=definition.name, scope_type=definition.scope_type,
+                                              availability_domain=domain, value=100))
+        return self.backend.page(values, page, limit)
+
+    def get_resource_availability(self, service_name, limit_name, compartment_id, availability_domain=None,
+                                  **kwargs):
+        self._data('get_resource_availability', compartment_id)
+        used = sum(ord(c) for c in limit_name + (availability_domain or '')) % 60
+        return self.backend.single(SimpleNamespace(used=used, available=100 - used, fractional_availability=100))
+
+
+class FakeQuotasClient(FakeClient):
+    service = 'quotas'
+
+    def list_quotas(self, compartment_id, page=None, limit=None, **kwargs):
+        self._data('list_quotas', compartment_id)
+        return self.backend.page([], page, limit)
+
+
+class FakeUsageClient(FakeClient):
+    service = 'usage_api'
+
+    def request_summarized_usages(self, request_summarized_usages_details, page=None, limit=None, **kwargs):
+        details = request_summarized_usages_details
+        self._data('request_summarized_usages', details.tenant_id)
+        start = date.fromisoformat(str(details.time_usage_started)[:10])
+        end = date.fromisoformat(str(details.time_usage_ended)[:10])
+        rng = random.Random(f'{details.tenant_id}:{start}:{end}')
+        items = []
+        day = start
+        while day < end:
+            started = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+            for service, sku_name, unit in USAGE_SKUS:
+                quantity = rng.choice([0, rng.uniform(1, 500)])
+                items.append(SimpleNamespace(
+                    service=service, sku_name=sku_name, unit=unit, computed_quantity=quantity,
+                    computed_amount=round(quantity * 0.01, 6), time_usage_started=started
+                ))
+            day += timedelta(days=1)
+        response = self.backend.page(items, page, limit)
+        return oci.response.Response(response.status, response.headers, SimpleNamespace(items=response.data), None)
+
+
+FAKE_CLIENTS = {
+    'compute': FakeComputeClient,
+    'network': FakeNetworkClient,
+    'block_storage': FakeBlockstorageClient,
+    'identity': FakeIdentityClient,
+    'limits': FakeLimitsClient,
+    'quotas': FakeQuotasClient,
+    'usage_api': FakeUsageClient,
+}
+
+
+def install(backend: FakeBackend, tenants: List[Dict[str, Any]], workdir: Optional[str] = None) -> str:
+    """
+    让应用使用模拟后端
+
+    - 租户注册表改为读取 workdir 下的临时 tenants.yml；
+    - 客户端池返回包装在 GuardedClient 中的模拟客户端；
+    - 租户健康检查改为调用模拟的 identity.get_user；
+    - 使用量仓库和资源清单改为 workdir 下的临时数据库。
+
+    Returns:
+        临时工作目录
+    """
+    from config.tenant_registry import tenant_registry
+    from app.services.tenant_service import TenantService
+    from app.services.inventory_store import inventory_store
+    from app.services.usage_store import usage_store
+    from app.utils.oci_client_pool import client_pool
+
+    workdir = workdir or tempfile.mkdtemp(prefix='oci-bench-')
+    path = os.path.join(workdir, 'tenants.yml')
+    with open(path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump({'tenants': tenants}, f, allow_unicode=True, sort_keys=False)
+    tenant_registry.path = path
+    tenant_registry.items()
+
+    clients: Dict[tuple, Any] = {}
+    lock = threading.Lock()
+
+    def get_client(tenant_key, service, tenant, region=None):
+        region = region or tenant['region']
+        key = (tenant['tenancy'], service, region)
+        with lock:
+            client = clients.get(key)
+            if client is None:
+                fake = FAKE_CLIENTS[service](backend, tenant['tenancy'])
+                client = client_pool._guard(fake, service, tenant, region)
+                clients[key] = client
+            return client
+
+    def check_tenant_config(self, tenant):
+        try:
+            self.get_oci_client(self.registry.id_by_name(tenant['name']), 'identity').get_user(tenant['user_ocid'])
+            return True, None
+        except Exception as e:
+            return False, str(e)
+
+    usage_store.path = os.path.join(workdir, 'usage.db')
+    inventory_store.path = os.path.join(workdir, 'inventory.db')
+    client_pool.get_client = get_client
+    TenantService.check_tenant_config = check_tenant_config
+    return workdir
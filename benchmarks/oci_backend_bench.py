@@ -0,0 +1,178 @@
+"""基于模拟OCI后端的端到端基准
+
+不访问真实OCI：用 benchmarks/fake_oci.py 生成若干合成租户（每个租户数百台实例），
+注入可配置的延迟、分页和错误率，然后运行主要的服务路径，输出每个场景的 p50/p99 耗时
+和每次运行的平均OCI调用次数。客户端仍经过客户端池的限流、重试和熔断层。
+
+场景：
+    list_instances      InstanceService.list_instances（冷：清空缓存；热：命中缓存）
+    get_resources       实例创建页的资源目录（冷：清空缓存；热：命中缓存）
+    get_tenant_quotas   QuotaService.get_tenant_quotas
+    get_usage           UsageService.get_usage（冷：清空本地使用量仓库）
+    tenant_list_page    GET /tenant/list
+
+用法:
+    python benchmarks/oci_backend_bench.py [--tenants 5] [--instances 300] [--latency 0.05]
+        [--jitter 0.02] [--error-rate 0] [--throttle-rate 0] [--page-size 100] [--repeat 10]
+        [--rate-limit 1000] [--scenario list_instances ...]
+"""
+import argparse
+import logging
+import math
+import os
+import sys
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(samples, p):
+    """最近秩法百分位"""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def clear_caches():
+    from app.services.instance_service import instance_list_snapshots, instance_snapshots
+    from app.services.quota_service import catalog_snapshots, quota_snapshots
+    from app.services.resource_catalog_service import image_snapshots, shape_snapshots, subnet_snapshots
+    for cache in (quota_snapshots, catalog_snapshots, image_snapshots, subnet_snapshots, shape_snapshots,
+                  instance_list_snapshots, instance_snapshots):
+        cache.clear()
+
+
+def clear_usage_store():
+    from app.services.usage_store import usage_store
+    with usage_store._transaction() as conn:
+        conn.execute('DELETE FROM usage_daily')
+        conn.execute('DELETE FROM usage_days')
+
+
+def build_scenarios(args, tenant_ids):
+    from app import create_app
+    from app.services.auth_service import auth_service
+    from app.services.instance_service import InstanceService
+    from app.services.quota_service import QuotaService
+    from app.services.usage_service import UsageService
+
+    instance_service = InstanceService()
+    quota_service = QuotaService()
+    usage_service = UsageService()
+    end_day = date.today() - timedelta(days=1)
+    start_day = end_day - timedelta(days=args.usage_days)
+
+    app = create_app()
+    client = app.test_client()
+    username = auth_service.usernames()[0]
+    with client.session_transaction() as session:
+        session['_user_id'] = username
+        session['_fresh'] = True
+
+    def each_tenant(func):
+        return lambda: [func(tenant_id) for tenant_id in tenant_ids]
+
+    def tenant_list_page():
+        response = client.get('/tenant/list')
+        if response.status_code != 200:
+            raise RuntimeError(f"/tenant/list 返回 {response.status_code}")
+
+    def get_usage(tenant_id):
+        return usage_service.get_usage(tenant_id, start_day.isoformat(), end_day.isoformat())
+
+    # (名称, 每次运行前的准备, 被计时的函数)
+    return [
+        ('list_instances:cold', clear_caches, each_tenant(instance_service.list_instances)),
+        ('list_instances:warm', None, each_tenant(instance_service.list_instances)),
+        ('get_resources:cold', clear_caches, each_tenant(instance_service.get_resources)),
+        ('get_resources:warm', None, each_tenant(instance_service.get_resources)),
+        ('get_tenant_quotas', None, each_tenant(quota_service.get_tenant_quotas)),
+        ('get_usage:cold', clear_usage_store, each_tenant(get_usage)),
+        ('get_usage:warm', None, each_tenant(get_usage)),
+        ('tenant_list_page', None, tenant_list_page),
+    ]
+
+
+def run_scenario(backend, name, prepare, func, repeat):
+    timings = []
+    calls = Counter()
+    errors = 0
+    for _ in range(repeat):
+        if prepare:
+            prepare()
+        backend.reset_counts()
+        started = time.perf_counter()
+        try:
+            func()
+        except Exception as e:
+            errors += 1
+            print(f"  {name} 失败: {e}", file=sys.stderr)
+        timings.append(time.perf_counter() - started)
+        calls.update(backend.call_counts())
+    return timings, calls, errors
+
+
+def report(name, timings, calls, errors, repeat):
+    total_calls = sum(calls.values())
+    print(f"{name:<22} p50 {percentile(timings, 50) * 1000:9.1f} ms   p99 {percentile(timings, 99) * 1000:9.1f} ms"
+          f"   OCI调用/次 {total_calls / repeat:8.1f}   失败 {errors}/{repeat}")
+    for (service, operation), count in sorted(calls.items(), key=lambda item: -item[1]):
+        print(f"    {service}.{operation:<36} {count / repeat:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--tenants', type=int, default=5)
+    parser.add_argument('--instances', type=int, default=300, help='每个租户的实例数')
+    parser.add_argument('--latency', type=float, default=0.05, help='每次OCI调用的平均延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回 500 的概率')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='返回 429 的概率')
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--usage-days', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--rate-limit', type=float, default=None,
+                        help='覆盖每个租户的OCI变更请求速率上限（默认使用 oci_calls.rate_limit）')
+    parser.add_argument('--read-rate-limit', type=float, default=None,
+                        help='覆盖每个租户的OCI只读请求速率上限（默认使用 oci_calls.read_rate_limit）')
+    parser.add_argument('--scenario', action='append', help='只运行指定场景（可重复，按名称前缀匹配）')
+    args = parser.parse_args()
+
+    # 日志目录按相对路径创建
+    os.chdir(ROOT)
+    logging.disable(logging.WARNING)
+
+    from app.utils import oci_client_pool
+    if args.rate_limit:
+        oci_client_pool.OCI_RATE_LIMIT = args.rate_limit
+        oci_client_pool.OCI_BURST = args.rate_limit * 2
+    if args.read_rate_limit:
+        oci_client_pool.OCI_READ_RATE_LIMIT = args.read_rate_limit
+        oci_client_pool.OCI_READ_BURST = args.read_rate_limit * 2
+
+    import fake_oci
+    backend = fake_oci.FakeBackend(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                   throttle_rate=args.throttle_rate, page_size=args.page_size)
+    tenants = fake_oci.make_tenants(args.tenants)
+    for tenant in tenants:
+        backend.add_tenancy(tenant['tenancy'], args.instances)
+    workdir = fake_oci.install(backend, tenants)
+
+    tenant_ids = [str(i + 1) for i in range(args.tenants)]
+    print(f"租户 {args.tenants} 个 × 实例 {args.instances} 台，延迟 {args.latency * 1000:.0f}±{args.jitter * 1000:.0f} ms，"
+          f"错误率 {args.error_rate}，限流率 {args.throttle_rate}，分页 {args.page_size}，重复 {args.repeat} 次")
+    print(f"临时目录: {workdir}\n")
+
+    for name, prepare, func in build_scenarios(args, tenant_ids):
+        if args.scenario and not any(name.startswith(s) for s in args.scenario):
+            continue
+        timings, calls, errors = run_scenario(backend, name, prepare, func, args.repeat)
+        report(name, timings, calls, errors, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
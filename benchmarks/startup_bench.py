@@ -0,0 +1,117 @@
+"""应用启动耗时基准
+
+每次运行都启动一个新的解释器，依次计时：
+    import      导入 app 包（不含创建应用）
+    create_app  创建应用、注册全部蓝图
+    health      第一次 GET /health（容器健康检查）
+并记录此时 oci 是否已被导入、共加载了多少个模块，最后输出各阶段的 p50 和最大值。
+--eager-oci 先完整导入 oci 及全部服务包（较早版本SDK的默认行为）再创建应用，用于和延迟导入对比；
+--importtime 额外用 python -X importtime 运行一次，列出累计导入耗时最高的模块。
+
+用法:
+    python benchmarks/startup_bench.py [--repeat 10] [--eager-oci] [--importtime 20]
+"""
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 在子进程中执行，最后一行输出 JSON 结果
+CHILD = """
+import json, logging, os, sys, time
+started = time.perf_counter()
+if {eager_oci}:
+    os.environ['OCI_PYTHON_SDK_NO_SERVICE_IMPORTS'] = 'False'
+    os.environ['OCI_PYTHON_SDK_LAZY_IMPORTS_DISABLED'] = 'True'
+    import oci
+from app import create_app
+imported = time.perf_counter()
+logging.disable(logging.WARNING)
+app = create_app()
+created = time.perf_counter()
+response = app.test_client().get('/health')
+checked = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({{
+    'import': imported - started,
+    'create_app': created - imported,
+    'health': checked - created,
+    'oci_loaded': 'oci' in sys.modules,
+    'oci_modules': sum(1 for name in sys.modules if name == 'oci' or name.startswith('oci.')),
+    'modules': len(sys.modules),
+}}))
+"""
+
+PHASES = ('import', 'create_app', 'health', 'process')
+
+
+def percentile(samples, p):
+    """最近秩法百分位"""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def run_once(eager_oci):
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-c', CHILD.format(eager_oci=eager_oci)],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    # 包括解释器自身的启动，最接近工作进程从 fork/exec 到可以响应的时间
+    result['process'] = time.perf_counter() - started
+    return result
+
+
+def report_importtime(top):
+    """用 -X importtime 创建一次应用，输出累计耗时最高的模块"""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'from app import create_app; create_app()'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = [part.strip() for part in line[len('import time:'):].split('|')]
+        # 跳过表头
+        if not fields[0].isdigit():
+            continue
+        self_us, cumulative_us, name = fields
+        rows.append((int(cumulative_us), int(self_us), name))
+    rows.sort(reverse=True)
+    print(f"\n累计导入耗时最高的 {top} 个模块（-X importtime）:")
+    for cumulative_us, self_us, name in rows[:top]:
+        print(f"    {cumulative_us / 1000:9.1f} ms  (自身 {self_us / 1000:7.1f} ms)  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--eager-oci', action='store_true', help='创建应用前完整导入 oci，作为对照')
+    parser.add_argument('--importtime', type=int, default=0, metavar='N',
+                        help='额外输出累计导入耗时最高的 N 个模块')
+    args = parser.parse_args()
+
+    results = [run_once(args.eager_oci) for _ in range(args.repeat)]
+    mode = '完整导入 oci' if args.eager_oci else '延迟导入 oci'
+    print(f"{mode}，重复 {args.repeat} 次\n")
+    for phase in PHASES:
+        timings = [result[phase] for result in results]
+        print(f"{phase:<12} p50 {percentile(timings, 50) * 1000:9.1f} ms   max {max(timings) * 1000:9.1f} ms")
+    last = results[-1]
+    print(f"\n已加载模块 {last['modules']} 个，其中 oci {last['oci_modules']} 个"
+          f"（启动后 oci {'已' if last['oci_loaded'] else '未'}导入）")
+
+    if args.importtime:
+        report_importtime(args.importtime)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""使用量聚合微基准
+
+在合成数据上比较原来逐条处理的 _format_usage_data 与列式聚合（app/utils/usage_aggregation.py）。
+
+用法:
+    python benchmarks/usage_aggregation_bench.py [--tenants 5] [--days 90] [--skus 200] [--repeat 5]
+"""
+import argparse
+import gc
+import importlib.util
+import os
+import random
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_aggregation():
+    # 直接按路径加载，避免导入 app 包时创建 Flask 应用
+    path = os.path.join(ROOT, 'app', 'utils', 'usage_aggregation.py')
+    spec = importlib.util.spec_from_file_location('usage_aggregation', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def legacy_format_usage_data(items):
+    """改造前 UsageService._format_usage_data 的实现，作为对照"""
+    formatted_data = []
+    sku_unit_map = {}
+
+    for item in items:
+        computed_quantity = getattr(item, 'computed_quantity', 0)
+        if computed_quantity is None:
+            computed_quantity = 0
+
+        if float(computed_quantity) > 0:
+            service = None
+            sku_name = None
+            unit = None
+
+            if hasattr(item, 'dimensions'):
+                for dim in item.dimensions:
+                    if dim.key == 'service':
+                        service = dim.value
+                    elif dim.key == 'skuName':
+                        sku_name = dim.value
+                    elif dim.key in ['unit', 'billingUnit', 'unitOfMeasure']:
+                        unit = dim.value
+                        break
+
+            service = service or getattr(item, 'service', 'Unknown')
+            sku_name = sku_name or getattr(item, 'sku_name', 'Unknown SKU')
+
+            if sku_name in sku_unit_map:
+                unit = sku_unit_map[sku_name]
+            elif unit:
+                sku_unit_map[sku_name] = unit
+            else:
+                sku_name_upper = (sku_name or '').upper()
+                if any(word in sku_name_upper for word in ['OCPU', 'CPU']):
+                    unit = 'OCPU Hours'
+                elif 'MEMORY' in sku_name_upper:
+                    unit = 'GB Hours'
+                elif any(word in sku_name_upper for word in ['STORAGE', 'VOLUME', 'BACKUP']):
+                    unit = 'GB Months'
+                elif any(word in sku_name_upper for word in ['BANDWIDTH', 'DATA TRANSFER', 'OUTBOUND']):
+                    unit = 'GB'
+                elif 'DATABASE' in sku_name_upper:
+                    unit = 'Instance Hours'
+                else:
+                    unit = 'Units'
+                sku_unit_map[sku_name] = unit
+
+            computed_amount = getattr(item, 'computed_amount', 0)
+            if computed_amount is None:
+                computed_amount = 0
+
+            formatted_data.append({
+                'service': service,
+                'sku_name': sku_name,
+                'quantity': float(computed_quantity),
+                'unit': unit,
+                'cost': float(computed_amount)
+            })
+
+    grouped_data = {}
+    for item in formatted_data:
+        key = (item['sku_name'], item['unit'])
+        if key not in grouped_data:
+            grouped_data[key] = {
+                'service': item['service'],
+                'sku_name': item['sku_name'],
+                'total_quantity': 0,
+                'total_cost': 0,
+                'unit': item['unit']
+            }
+        grouped_data[key]['total_quantity'] += item['quantity']
+        grouped_data[key]['total_cost'] += item['cost']
+
+    result = list(grouped_data.values())
+    return sorted(result, key=lambda x: (-x['total_cost'], x['service'], x['sku_name']))
+
+
+SERVICES = ['COMPUTE', 'BLOCK_STORAGE', 'NETWORK', 'OBJECT_STORAGE', 'DATABASE']
+SKU_WORDS = ['OCPU', 'Memory', 'Block Volume', 'Outbound Data Transfer', 'Database', 'Backup', 'Load Balancer']
+
+
+def synthesize(tenants, days, skus, seed=42):
+    """生成 (OCI风格的汇总项, 仓库行) 两种形式的相同数据"""
+    rng = random.Random(seed)
+    catalog = []
+    for i in range(skus):
+        word = SKU_WORDS[i % len(SKU_WORDS)]
+        unit = rng.choice([None, None, 'GB Months', 'OCPU Hours'])
+        catalog.append((SERVICES[i % len(SERVICES)], f"{word} - Standard {i}", unit))
+
+    start = date.today() - timedelta(days=days)
+    items, rows = [], []
+    for tenant in range(tenants):
+        for offset in range(days):
+            day = (start + timedelta(days=offset)).isoformat()
+            for service, sku_name, unit in catalog:
+                quantity = rng.choice([0, rng.uniform(0.1, 100)])
+                cost = round(quantity * rng.uniform(0, 0.05), 6)
+                dimensions = [SimpleNamespace(key='service', value=service),
+                              SimpleNamespace(key='skuName', value=sku_name)]
+                if unit:
+                    dimensions.append(SimpleNamespace(key='unit', value=unit))
+                items.append(SimpleNamespace(dimensions=dimensions, computed_quantity=quantity,
+                                             computed_amount=cost))
+                rows.append((day, f"tenant-{tenant}", service, sku_name, unit, quantity, cost))
+    return items, rows
+
+
+def best_of(func, repeat):
+    """取多次运行中的最短耗时，计时期间关闭GC"""
+    timings = []
+    result = None
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - started)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='使用量聚合微基准')
+    parser.add_argument('--tenants', type=int, default=5)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--skus', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    aggregation = load_aggregation()
+    items, rows = synthesize(args.tenants, args.days, args.skus)
+    print(f"合成数据: {len(rows)} 行（{args.tenants} 租户 x {args.days} 天 x {args.skus} SKU）")
+
+    legacy_time, legacy_result = best_of(lambda: legacy_format_usage_data(items), args.repeat)
+
+    # 列式数据只构建一次，之后的各种视图都在同一份列上计算
+    build_time, frame = best_of(lambda: aggregation.UsageFrame.from_rows(rows), args.repeat)
+    sku_time, columnar_result = best_of(lambda: aggregation.aggregate_usage(frame), args.repeat)
+
+    # 校验两种实现结果一致
+    assert len(legacy_result) == len(columnar_result)
+    for old, new in zip(legacy_result, columnar_result):
+        assert (old['sku_name'], old['unit'], old['service']) == (new['sku_name'], new['unit'], new['service'])
+        assert abs(old['total_cost'] - new['total_cost']) < 1e-6
+        assert abs(old['total_quantity'] - new['total_quantity']) < 1e-6
+
+    print(f"{'逐条处理 (_format_usage_data)':<32}{legacy_time * 1000:>10.1f} ms")
+    print(f"{'列式构建':<32}{build_time * 1000:>10.1f} ms")
+    print(f"{'列式聚合 (SKU+单位)':<32}{sku_time * 1000:>10.1f} ms  x{legacy_time / sku_time:.1f}")
+    print(f"{'列式构建 + 聚合':<32}{(build_time + sku_time) * 1000:>10.1f} ms  x{legacy_time / (build_time + sku_time):.1f}")
+    for label, group_by, top_n in [
+        ('列式聚合 (按日期)', ('day',), None),
+        ('列式聚合 (按服务)', ('service',), None),
+        ('列式聚合 (按租户+服务)', ('tenant', 'service'), None),
+        ('列式聚合 (SKU Top 10)', ('sku_name', 'unit'), 10),
+    ]:
+        elapsed, _ = best_of(lambda: aggregation.aggregate_usage(frame, group_by=group_by, top_n=top_n), args.repeat)
+        print(f"{label:<32}{elapsed * 1000:>10.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,11 +2,11 @@ import os
 import yaml
 import logging
 from typing import Dict, Any
+from config.tenant_registry import tenant_registry
 
 class Config:
     _instance = None
     _config = None
-    _tenants = None
     _config_path = None
     _tenants_path = None
 
@@ -14,7 +14,7 @@ class Config:
         if cls._instance is None:
             cls._instance = super(Config, cls).__new__(cls)
             cls._config_path = os.path.join(os.path.dirname(__file__), 'config.yml')
-            cls._tenants_path = os.path.join(os.path.dirname(__file__), 'tenants.yml')
+            cls._tenants_path = tenant_registry.path
             cls._instance._init_config_files()
             cls._instance._load_config()
         return cls._instance
@@ -39,17 +39,12 @@ class Config:
             logging.debug(f"正在加载配置文件: {self._config_path}")
             with open(self._config_path, 'r', encoding='utf-8') as f:
                 self._config = yaml.safe_load(f) or {}
-            
-            logging.debug(f"正在加载租户配置: {self._tenants_path}")
-            with open(self._tenants_path, 'r', encoding='utf-8') as f:
-                self._tenants = yaml.safe_load(f) or {'tenants': []}
-            
-            # 将租户配置合并到主配置中
-            self._config['tenants'] = self._tenants.get('tenants', [])
+            # 租户配置统一由租户注册表管理，这里不再保留副本
+            self._config.pop('tenants', None)
 
         except Exception as e:
             logging.error(f"加载配置文件失败: {str(e)}")
-            self._config = {'tenants': []}
+            self._config = {}
 
     def reload(self):
         """重新加载配置"""
@@ -60,6 +55,8 @@ class Config:
         try:
             keys = key.split('.')
             value = self._config
+            if keys[0] == 'tenants':
+                value = tenant_registry.read()
             for k in keys:
                 value = value[k]
             return value
@@ -70,22 +67,28 @@ class Config:
         """设置配置项"""
         try:
             keys = key.split('.')
+
+            # 如果是修改租户配置，则交给租户注册表原子写入租户配置文件
+            if keys[0] == 'tenants':
+                logging.info(f"保存租户配置: {value}")
+
+                def assign(data):
+                    config = data
+                    for k in keys[:-1]:
+                        config = config.setdefault(k, {})
+                    config[keys[-1]] = value
+
+                tenant_registry.update(assign)
+                return True
+
             config = self._config
             for k in keys[:-1]:
                 config = config.setdefault(k, {})
             config[keys[-1]] = value
-            
-            # 如果是修改租户配置，则保存到租户配置文件
-            if keys[0] == 'tenants':
-                logging.info(f"保存租户配置: {value}")
-                with open(self._tenants_path, 'w', encoding='utf-8') as f:
-                    yaml.dump({'tenants': self._config['tenants']}, f, allow_unicode=True)
-            else:
-                # 否则保存到主配置文件
-                with open(self._config_path, 'w', encoding='utf-8') as f:
-                    # 排除租户配置
-                    config_without_tenants = {k: v for k, v in self._config.items() if k != 'tenants'}
-                    yaml.dump(config_without_tenants, f, allow_unicode=True)
+
+            # 否则保存到主配置文件
+            with open(self._config_path, 'w', encoding='utf-8') as f:
+                yaml.dump(self._config, f, allow_unicode=True)
             return True
         except Exception as e:
             logging.error(f"设置配置失败: {str(e)}")
@@ -0,0 +1,190 @@
+import copy
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import yaml
+
+try:
+    import fcntl
+except ImportError:  # Windows下没有fcntl，只保留进程内锁
+    fcntl = None
+
+
+class TenantRegistry:
+    """
+    租户注册表
+
+    将 tenants.yml 解析后常驻内存，并按ID、名称和tenancy OCID建立索引。
+    只有文件的 mtime、inode 或大小发生变化时才重新解析；
+    写入时先写临时文件再原子替换，并使用文件锁防止多个工作进程同时写入。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._stat_key: Optional[Tuple[int, int, int]] = None
+        self._tenants: List[Dict[str, Any]] = []
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_name: Dict[str, str] = {}
+        self._by_tenancy: Dict[str, str] = {}
+        self._listeners: List[Callable[[], None]] = []
+
+    def _current_stat_key(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_ino, st.st_size
+
+    def _load(self, stat_key: Optional[Tuple[int, int, int]]) -> None:
+        """从磁盘加载并重建索引（调用方需持有锁）"""
+        tenants = []
+        if stat_key is not None:
+            # 延迟导入：config 包不依赖 app 包
+            from app.utils.profiler import span
+            try:
+                logging.debug(f"正在加载租户配置: {self.path}")
+                with span('读取 tenants.yml'), open(self.path, 'r', encoding='utf-8') as f:
+                    data = yaml.safe_load(f) or {}
+                tenants = data.get('tenants') or []
+            except Exception as e:
+                logging.error(f"读取租户配置失败: {str(e)}")
+                # 文件暂时不可读时保留旧数据，下次调用再尝试
+                return
+        self._index(tenants)
+        self._stat_key = stat_key
+        self._notify()
+
+    def _index(self, tenants: List[Dict[str, Any]]) -> None:
+        by_id, by_name, by_tenancy = {}, {}, {}
+        for i, tenant in enumerate(tenants):
+            tenant_id = str(i + 1)  # 使用从1开始的索引作为ID
+            by_id[tenant_id] = tenant
+            if tenant.get('name') is not None:
+                by_name.setdefault(tenant['name'], tenant_id)
+            if tenant.get('tenancy'):
+                by_tenancy.setdefault(tenant['tenancy'], tenant_id)
+        self._tenants = tenants
+        self._by_id, self._by_name, self._by_tenancy = by_id, by_name, by_tenancy
+
+    def _notify(self) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener()
+            except Exception as e:
+                logging.error(f"租户配置变更回调执行失败: {str(e)}")
+
+    def _refresh(self) -> None:
+        if self._current_stat_key() == self._stat_key:
+            return
+        with self._lock:
+            stat_key = self._current_stat_key()
+            if stat_key != self._stat_key:
+                self._load(stat_key)
+
+    def add_listener(self, callback: Callable[[], None]) -> None:
+        """注册租户配置变化（重新加载或写入）时的回调"""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def read(self) -> Dict[str, Any]:
+        """返回租户配置的深拷贝，可修改后交给 write 写回"""
+        self._refresh()
+        with self._lock:
+            return {'tenants': copy.deepcopy(self._tenants)}
+
+    def items(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """按顺序返回 (租户ID, 租户配置) 列表"""
+        self._refresh()
+        with self._lock:
+            return [(tenant_id, dict(tenant)) for tenant_id, tenant in self._by_id.items()]
+
+    def get_by_id(self, tenant_id: str) -> Optional[Dict[str, Any]]:
+        self._refresh()
+        tenant = self._by_id.get(str(tenant_id))
+        return dict(tenant) if tenant is not None else None
+
+    def get_by_name(self, name: str) -> Optional[Dict[str, Any]]:
+        tenant_id = self.id_by_name(name)
+        return self.get_by_id(tenant_id) if tenant_id else None
+
+    def get_by_tenancy(self, tenancy: str) -> Optional[Dict[str, Any]]:
+        self._refresh()
+        tenant_id = self._by_tenancy.get(tenancy)
+        return self.get_by_id(tenant_id) if tenant_id else None
+
+    def id_by_name(self, name: str) -> Optional[str]:
+        self._refresh()
+        return self._by_name.get(name)
+
+    def id_by_tenancy(self, tenancy: str) -> Optional[str]:
+        self._refresh()
+        return self._by_tenancy.get(tenancy)
+
+    @contextmanager
+    def _file_lock(self):
+        """进程内锁 + 跨进程文件锁"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock:
+            with open(self.path + '.lock', 'a') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_locked(self, data: Dict[str, Any]) -> None:
+        """写临时文件后原子替换，并立即更新内存索引（调用方需持有文件锁）"""
+        directory = os.path.dirname(self.path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tenants-', suffix='.yml')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                yaml.safe_dump(data, f, allow_unicode=True, sort_keys=False)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(self.path):
+                os.chmod(tmp_path, os.stat(self.path).st_mode & 0o777)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._index(copy.deepcopy(data.get('tenants') or []))
+        self._stat_key = self._current_stat_key()
+        self._notify()
+
+    def write(self, data: Dict[str, Any]) -> None:
+        """原子地写入完整的租户配置"""
+        with self._file_lock():
+            self._write_locked(data)
+
+    def update(self, mutator: Callable[[Dict[str, Any]], Any]) -> Any:
+        """
+        在文件锁内完成“读取-修改-写入”，避免多个工作进程互相覆盖
+
+        Args:
+            mutator: 接收租户配置副本并就地修改的函数，返回值会原样返回；
+                返回 False 表示放弃写入
+
+        Returns:
+            mutator 的返回值
+        """
+        with self._file_lock():
+            stat_key = self._current_stat_key()
+            if stat_key != self._stat_key:
+                self._load(stat_key)
+            data = {'tenants': copy.deepcopy(self._tenants)}
+            result = mutator(data)
+            if result is not False:
+                self._write_locked(data)
+            return result
+
+
+# 全局租户注册表
+tenant_registry = TenantRegistry(os.path.join(os.path.dirname(__file__), 'tenants.yml'))
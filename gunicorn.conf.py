@@ -0,0 +1,106 @@
+"""gunicorn 配置
+
+默认使用 gthread 工作进程：每个进程有多个线程，某个请求等待OCI时不会阻塞其他用户。
+也可以使用 gevent（server.worker_class: gevent），由 server.worker_connections 限制每个进程的并发连接数，
+适合大量 SSE 长连接的场景；gevent 需要在导入应用之前打补丁，因此这时不会预加载应用。
+gthread 下每个 SSE 连接占用一个线程，instance_stream.max_subscribers（默认8，小于 threads）限制每个进程的
+推送连接数，超出的页面改为轮询；使用 gevent 时可以设为 0 取消限制。
+
+参数取自 config.yml 的 server 段，命令行参数和 GUNICORN_CMD_ARGS 环境变量优先，例如：
+    GUNICORN_CMD_ARGS="--threads 32 --bind 0.0.0.0:8000" gunicorn -c gunicorn.conf.py wsgi:app
+
+默认只启动一个工作进程，通过线程（或 gevent）扩展并发：后台任务、缓存失效总线、SSE 观察线程、
+剖析缓冲区和资源清单的同步调度都只保存在进程内，多个工作进程时这些状态会被拆开——
+例如轮询任务状态的请求落到另一个进程会得到 404，变更只清除本进程的缓存。
+需要多进程之前，先把任务状态和缓存失效移到共享存储中。
+同样的原因，默认不按请求数替换工作进程（max_requests: 0）：替换会丢掉进程内的后台任务，
+而创建、终止实例的任务最长要等待约 1000 秒，远超 graceful_timeout，前端查询任务时会得到 404。
+
+平滑重载：kill -HUP <master pid> 会按新配置启动新的工作进程，旧进程处理完当前请求
+（最多等待 graceful_timeout 秒）后退出。
+"""
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+import yaml
+
+
+def _load_server_config():
+    # 主进程只读取 server 段，不导入应用模块，gevent 工作进程打补丁之前不会创建任何锁或线程
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'config.yml')
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return (yaml.safe_load(f) or {}).get('server') or {}
+    except Exception as e:
+        print(f"读取 server 配置失败，使用默认值: {str(e)}", file=sys.stderr)
+        return {}
+
+
+_server = _load_server_config()
+
+bind = _server.get('bind', '0.0.0.0:5000')
+workers = _server.get('workers', 1)
+worker_class = _server.get('worker_class', 'gthread')
+threads = _server.get('threads', 16)
+worker_connections = _server.get('worker_connections', 1000)
+# OCI调用可能持续数十秒，gthread 工作进程在请求执行期间仍会发送心跳，这里只兜住真正卡死的进程
+timeout = _server.get('timeout', 120)
+graceful_timeout = _server.get('graceful_timeout', 30)
+keepalive = _server.get('keepalive', 5)
+# 处理多少个请求后替换工作进程；状态保存在进程内，默认不替换（见文件开头的说明）
+max_requests = _server.get('max_requests', 0)
+max_requests_jitter = _server.get('max_requests_jitter', 0)
+preload_app = bool(_server.get('preload', False)) and worker_class != 'gevent'
+
+accesslog = '-'
+errorlog = '-'
+
+# 多进程下 Prometheus 指标写入共享目录，由 /metrics 汇总；必须在导入 prometheus_client 之前设置
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'oci-web-prometheus'))
+
+
+def on_starting(server):
+    """清理上次运行留下的指标文件"""
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def post_fork(server, worker):
+    """
+    丢弃从主进程继承的客户端和文件句柄
+
+    只在预加载时才有继承的状态；应用按需创建OCI客户端、线程池和数据库连接，正常情况下主进程中什么也没有创建，
+    这里再清理一次，保证即使意外创建了，也不会在进程之间共享。
+    """
+    if not preload_app:
+        return
+
+    pool_module = sys.modules.get('app.utils.oci_client_pool')
+    if pool_module:
+        pool_module.client_pool.clear()
+
+    # 日志文件句柄在创建应用时打开，重新打开后每个进程各自持有
+    for logger in [logging.getLogger(), logging.getLogger('werkzeug')] + [
+            logging.getLogger(name) for name in list(logging.root.manager.loggerDict)]:
+        for handler in getattr(logger, 'handlers', []):
+            if isinstance(handler, logging.FileHandler):
+                handler.close()
+
+
+def worker_exit(server, worker):
+    """等待后台任务结束后再退出，受 graceful_timeout 限制"""
+    health_module = sys.modules.get('app.services.tenant_health_service')
+    if health_module:
+        health_module.health_monitor.stop()
+    job_module = sys.modules.get('app.services.job_service')
+    if job_module:
+        job_module.job_manager.shutdown(wait=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
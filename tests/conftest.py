@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+
+def wait_for_job(manager, job_id, timeout=10.0):
+    """轮询直到任务结束，返回任务字典"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job and job['done']:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"任务 {job_id} 在 {timeout} 秒内没有结束")
+
+
+@pytest.fixture(scope='session')
+def fake_backend(tmp_path_factory):
+    """安装无延迟的模拟OCI后端，租户ID为 "1" """
+    from fake_oci import FakeBackend, install, make_tenants
+
+    backend = FakeBackend(latency=0, jitter=0, transition_polls=2)
+    tenants = make_tenants(1)
+    backend.add_tenancy(tenants[0]['tenancy'], 3)
+    install(backend, tenants, workdir=str(tmp_path_factory.mktemp('oci')))
+    return backend
+
+
+@pytest.fixture
+def instance_service(fake_backend, monkeypatch):
+    from app.services import instance_service as module
+
+    monkeypatch.setattr(module, 'JOB_POLL_INTERVAL', 0.01)
+    monkeypatch.setattr(module, 'JOB_MAX_POLL_INTERVAL', 0.02)
+    return module.InstanceService()
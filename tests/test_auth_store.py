@@ -0,0 +1,47 @@
+import time
+
+from app.services import auth_store as module
+from app.services.auth_store import AuthStateStore
+
+
+def test_failures_from_every_worker_count_towards_lockout(tmp_path):
+    # 两个仓库实例打开同一个数据库，相当于两个工作进程
+    path = str(tmp_path / 'auth.db')
+    worker_a, worker_b = AuthStateStore(path), AuthStateStore(path)
+
+    assert worker_a.record_failure('admin', max_attempts=3, lockout_duration=60) == 1
+    assert worker_b.record_failure('admin', max_attempts=3, lockout_duration=60) == 2
+    assert worker_a.locked_until('admin') is None
+    worker_b.record_failure('admin', max_attempts=3, lockout_duration=60)
+
+    assert worker_a.locked_until('admin') > time.time()
+    worker_a.reset_failures('admin')
+    assert worker_b.locked_until('admin') is None
+
+
+def test_expired_lockout_restarts_the_count(tmp_path):
+    store = AuthStateStore(str(tmp_path / 'auth.db'))
+    store.record_failure('admin', max_attempts=1, lockout_duration=-1)
+
+    assert store.locked_until('admin') is None
+    assert store.record_failure('admin', max_attempts=3, lockout_duration=60) == 1
+
+
+def test_logout_ends_the_session_in_every_worker(tmp_path):
+    path = str(tmp_path / 'auth.db')
+    worker_a, worker_b = AuthStateStore(path), AuthStateStore(path)
+
+    session_id = worker_a.create_session('admin', mfa_verified=True)
+    assert worker_b.get_session(session_id) == ('admin', True)
+
+    worker_b.delete_session(session_id)
+    assert worker_a.get_session(session_id) is None
+
+
+def test_idle_sessions_expire(tmp_path, monkeypatch):
+    store = AuthStateStore(str(tmp_path / 'auth.db'))
+    session_id = store.create_session('admin', mfa_verified=False)
+    assert store.get_session(session_id) == ('admin', False)
+
+    monkeypatch.setattr(module, 'SESSION_LIFETIME', -1)
+    assert store.get_session(session_id) is None
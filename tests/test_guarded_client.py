@@ -0,0 +1,97 @@
+import time
+
+import oci
+import pytest
+
+from app.utils.guarded_client import GuardedClient
+from app.utils.throttle import CircuitBreaker, CircuitOpenError, TokenBucket
+
+
+class RecordingBucket(TokenBucket):
+    def __init__(self):
+        super().__init__(rate=1000)
+        self.acquired = 0
+
+    def acquire(self, *args, **kwargs):
+        self.acquired += 1
+        return super().acquire(*args, **kwargs)
+
+
+class Client:
+    def list_instances(self):
+        return 'listed'
+
+    def launch_instance(self):
+        return 'launched'
+
+
+def test_reads_and_writes_use_separate_limiters():
+    limiter, read_limiter = RecordingBucket(), RecordingBucket()
+    client = GuardedClient(Client(), 'compute', limiter=limiter, breaker=CircuitBreaker('test'),
+                           read_limiter=read_limiter)
+
+    assert client.list_instances() == 'listed'
+    assert client.list_instances() == 'listed'
+    assert client.launch_instance() == 'launched'
+    assert (read_limiter.acquired, limiter.acquired) == (2, 1)
+
+
+def test_reads_share_the_limiter_without_read_limiter():
+    limiter = RecordingBucket()
+    client = GuardedClient(Client(), 'compute', limiter=limiter, breaker=CircuitBreaker('test'))
+
+    client.list_instances()
+    client.launch_instance()
+    assert limiter.acquired == 2
+
+
+class FlakyClient:
+    """前 throttled 次调用返回 429"""
+
+    def __init__(self, throttled):
+        self.throttled = throttled
+
+    def list_instances(self):
+        if self.throttled > 0:
+            self.throttled -= 1
+            raise oci.exceptions.ServiceError(429, 'TooManyRequests', {}, 'Too many requests')
+        return 'listed'
+
+
+def open_breaker(reset_timeout=0.01):
+    breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=reset_timeout)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    time.sleep(reset_timeout * 2)
+    return breaker
+
+
+def guarded(client, breaker, max_attempts=3):
+    return GuardedClient(client, 'compute', limiter=TokenBucket(rate=1000), breaker=breaker,
+                         max_attempts=max_attempts, base_delay=0, max_delay=0)
+
+
+def test_throttled_half_open_trial_retries_and_closes_breaker():
+    breaker = open_breaker()
+    assert guarded(FlakyClient(throttled=1), breaker).list_instances() == 'listed'
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_exhausted_half_open_trial_reopens_breaker():
+    breaker = open_breaker()
+    with pytest.raises(oci.exceptions.ServiceError):
+        guarded(FlakyClient(throttled=5), breaker, max_attempts=2).list_instances()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # 下一次试探仍然可以放行，熔断器不会卡在半开状态
+    time.sleep(0.02)
+    assert guarded(FlakyClient(throttled=0), breaker).list_instances() == 'listed'
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_concurrent_calls_are_rejected_while_trial_runs():
+    breaker = open_breaker(reset_timeout=0.01)
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        guarded(FlakyClient(throttled=0), breaker).list_instances()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
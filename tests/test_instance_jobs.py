@@ -0,0 +1,94 @@
+from app.services.job_service import JOB_FAILED, JOB_SUCCEEDED, job_manager
+from conftest import wait_for_job
+
+TENANT_ID = '1'
+
+
+def launch_data(**overrides):
+    data = {
+        'tenant_id': TENANT_ID,
+        'display_name': 'test-instance',
+        'availability_domain': 'AD-1',
+        'image_id': 'ocid1.image.test',
+        'shape': 'VM.Standard.E4.Flex',
+        'ocpus': 1,
+        'memory_in_gbs': 8,
+        'subnet_id': 'ocid1.subnet.test',
+        'boot_volume_size_in_gbs': 50,
+        'login_method': 'password',
+    }
+    data.update(overrides)
+    return data
+
+
+def tenancy_data(backend):
+    return next(iter(backend.tenancies.values()))
+
+
+def test_create_returns_password_and_job_reaches_running(instance_service):
+    result = instance_service.create_instance(launch_data())
+    assert result['success']
+    assert len(result['password']) == 16
+    assert result['instance']['lifecycle_state'] == 'PROVISIONING'
+
+    job = wait_for_job(job_manager, result['job_id'])
+    assert job['status'] == JOB_SUCCEEDED
+    assert 'password' not in job['result']
+    instance = job['result']['instance']
+    assert instance['lifecycle_state'] == 'RUNNING'
+    assert instance['public_ip'].startswith('198.51.')
+    assert instance['private_ip']
+
+
+def test_create_with_ssh_key_has_no_password(instance_service):
+    result = instance_service.create_instance(launch_data(login_method='ssh', ssh_key='ssh-ed25519 AAAA test'))
+    assert 'password' not in result
+    assert wait_for_job(job_manager, result['job_id'])['status'] == JOB_SUCCEEDED
+
+
+def test_create_job_fails_when_instance_is_terminated(instance_service, fake_backend, monkeypatch):
+    transition = fake_backend.transition
+    monkeypatch.setattr(fake_backend, 'transition',
+                        lambda resource, intermediate, final: transition(resource, intermediate, 'TERMINATED'))
+
+    result = instance_service.create_instance(launch_data())
+    job = wait_for_job(job_manager, result['job_id'])
+    assert job['status'] == JOB_FAILED
+    assert '已被终止' in job['error']
+
+
+def test_delete_waits_until_terminated(instance_service, fake_backend):
+    instance = instance_service.create_instance(launch_data())['instance']
+
+    job_id = instance_service.delete_instance(TENANT_ID, instance['id'])
+    job = wait_for_job(job_manager, job_id)
+    assert job['status'] == JOB_SUCCEEDED
+    assert job['result'] == {'instance_id': instance['id'], 'lifecycle_state': 'TERMINATED'}
+    stored = next(i for i in tenancy_data(fake_backend).instances if i.id == instance['id'])
+    assert stored.lifecycle_state == 'TERMINATED'
+
+
+def test_delete_unknown_instance_returns_none(instance_service):
+    assert instance_service.delete_instance(TENANT_ID, 'ocid1.instance.missing') is None
+
+
+def test_detach_waits_until_detached(instance_service, fake_backend):
+    attachment = tenancy_data(fake_backend).vnic_attachments[0]
+    attachment.lifecycle_state = 'ATTACHED'
+
+    job = wait_for_job(job_manager, instance_service.detach_vnic(TENANT_ID, attachment.id))
+    assert job['status'] == JOB_SUCCEEDED
+    assert job['result'] == {'attachment_id': attachment.id, 'attachment_state': 'DETACHED'}
+    assert attachment.lifecycle_state == 'DETACHED'
+
+
+def test_detach_treats_vanished_attachment_as_detached(instance_service, fake_backend, monkeypatch):
+    data = tenancy_data(fake_backend)
+    attachment = data.vnic_attachments[1]
+    # 分离请求之后附件立即消失，查询返回404
+    monkeypatch.setattr(fake_backend, 'transition',
+                        lambda resource, intermediate, final: data.vnic_attachments.remove(resource))
+
+    job = wait_for_job(job_manager, instance_service.detach_vnic(TENANT_ID, attachment.id))
+    assert job['status'] == JOB_SUCCEEDED
+    assert job['result']['attachment_state'] == 'DETACHED'
@@ -0,0 +1,30 @@
+import json
+
+import pytest
+
+from app.services.instance_service import instance_list_snapshots
+
+
+@pytest.fixture
+def client(fake_backend):
+    from app import create_app
+
+    client = create_app().test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = 'admin'
+        session['_fresh'] = True
+    return client
+
+
+def test_ndjson_listing_is_served_from_the_instance_cache(client, fake_backend):
+    instance_list_snapshots.clear()
+    fake_backend.reset_counts()
+
+    for _ in range(3):
+        response = client.get('/instance/api/instances/1?format=ndjson')
+        assert response.mimetype == 'application/x-ndjson'
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert rows and all('id' in row for row in rows)
+
+    assert fake_backend.call_counts()[('compute', 'list_instances')] == 1
+    assert rows == client.get('/instance/api/instances/1').get_json()
@@ -0,0 +1,36 @@
+import pytest
+
+from app.services.instance_stream_service import InstanceStreamHub
+
+
+@pytest.fixture(autouse=True)
+def no_instances(monkeypatch):
+    """观察线程不访问OCI"""
+    from app.services.instance_service import InstanceService
+
+    monkeypatch.setattr(InstanceService, 'list_instances', lambda self, tenant_id, **kwargs: [])
+
+
+def test_subscribers_are_capped_per_process():
+    hub = InstanceStreamHub(max_subscribers=1, heartbeat=1)
+    assert hub.accepting()
+
+    stream = hub.stream('1')
+    assert next(stream).startswith('retry:')
+    assert hub.subscriber_count() == 1
+    assert not hub.accepting()
+
+    stream.close()
+    assert hub.subscriber_count() == 0
+    assert hub.accepting()
+
+
+def test_zero_means_unlimited():
+    hub = InstanceStreamHub(max_subscribers=0, heartbeat=1)
+    streams = [hub.stream('1') for _ in range(3)]
+    for stream in streams:
+        next(stream)
+    assert hub.subscriber_count() == 3
+    assert hub.accepting()
+    for stream in streams:
+        stream.close()
@@ -0,0 +1,90 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import oci
+import pytest
+
+from app.services import instance_service as module
+
+
+def attachment(index, instance_id, state='ATTACHED'):
+    return SimpleNamespace(id=f'att-{index}', vnic_id=f'vnic-{index}', instance_id=instance_id,
+                           lifecycle_state=state)
+
+
+class NetworkClient:
+    """记录 get_vnic 调用及最大并发数"""
+
+    def __init__(self, missing=(), delay=0.0):
+        self.missing = set(missing)
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def get_vnic(self, vnic_id):
+        with self.lock:
+            self.calls.append(vnic_id)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            if vnic_id in self.missing:
+                raise oci.exceptions.ServiceError(404, 'NotAuthorizedOrNotFound', {}, 'VNIC not found')
+            return SimpleNamespace(data=SimpleNamespace(
+                id=vnic_id, display_name=vnic_id, private_ip='10.0.0.1', public_ip='198.51.100.1',
+                subnet_id='ocid1.subnet.test', mac_address='00:00:17:00:00:01',
+                is_primary=vnic_id == 'vnic-1', lifecycle_state='AVAILABLE'
+            ))
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+@pytest.fixture
+def service():
+    return module.InstanceService()
+
+
+def test_resolve_vnics_groups_attached_vnics_by_instance(service, monkeypatch):
+    client = NetworkClient(missing={'vnic-5'})
+    monkeypatch.setattr(service, '_get_network_client', lambda tenant_id: client)
+    attachments = [
+        attachment(1, 'i1'),
+        attachment(2, 'i1'),
+        attachment(3, 'i2'),
+        attachment(4, 'i2', state='DETACHED'),
+        attachment(5, 'i3'),
+    ]
+
+    vnics = service._resolve_vnics('1', attachments)
+
+    assert sorted(client.calls) == ['vnic-1', 'vnic-2', 'vnic-3', 'vnic-5']
+    assert set(vnics) == {'i1', 'i2'}
+    assert [vnic['id'] for vnic in vnics['i1']] == ['vnic-1', 'vnic-2']
+    assert [vnic['attachment_id'] for vnic in vnics['i2']] == ['att-3']
+    primary = vnics['i1'][0]
+    assert primary['is_primary']
+    assert (primary['public_ip'], primary['private_ip']) == ('198.51.100.1', '10.0.0.1')
+    assert primary['ipv6_addresses'] == []
+
+
+def test_resolve_vnics_fetches_concurrently_within_bound(service, monkeypatch):
+    client = NetworkClient(delay=0.05)
+    monkeypatch.setattr(service, '_get_network_client', lambda tenant_id: client)
+    monkeypatch.setattr(module, 'VNIC_FETCH_WORKERS', 2)
+
+    vnics = service._resolve_vnics('1', [attachment(i, f'i{i}') for i in range(1, 7)])
+
+    assert len(vnics) == 6
+    assert client.peak == 2
+
+
+def test_resolve_vnics_without_attached_vnics_skips_network_client(service, monkeypatch):
+    def fail(tenant_id):
+        raise AssertionError('不应创建网络客户端')
+
+    monkeypatch.setattr(service, '_get_network_client', fail)
+    assert service._resolve_vnics('1', [attachment(1, 'i1', state='DETACHING')]) == {}
@@ -0,0 +1,104 @@
+import threading
+
+import pytest
+
+from app.utils.cache import SnapshotCache
+from app.utils.singleflight import SingleFlight
+
+
+class SlowLoader:
+    """在 release 之前阻塞的加载函数"""
+
+    def __init__(self, value):
+        self.value = value
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.started.set()
+        self.release.wait(5)
+        return self.value
+
+
+def run_in_background(func):
+    results = []
+    thread = threading.Thread(target=lambda: results.append(func()))
+    thread.start()
+    return thread, results
+
+
+@pytest.mark.parametrize('invalidate', [
+    lambda cache: cache.invalidate('k'),
+    lambda cache: cache.invalidate(predicate=lambda key: key == 'k'),
+    lambda cache: cache.clear(),
+])
+def test_load_started_before_invalidate_is_not_cached(invalidate):
+    cache = SnapshotCache('test', ttl=60)
+    loader = SlowLoader('before')
+    thread, results = run_in_background(lambda: cache.get('k', loader)[0])
+    assert loader.started.wait(5)
+
+    invalidate(cache)
+    loader.release.set()
+    thread.join()
+
+    assert results == ['before']
+    assert cache.peek('k') is None
+    assert cache.get('k', lambda: 'after')[0] == 'after'
+    assert cache.stats()['discarded'] == 1
+
+
+def test_load_without_invalidate_is_cached():
+    cache = SnapshotCache('test', ttl=60)
+    assert cache.get('k', lambda: 'value')[0] == 'value'
+    assert cache.get('k', lambda: 'other')[0] == 'value'
+
+
+def test_calls_after_forget_do_not_join_earlier_call():
+    flight = SingleFlight('test')
+    loader = SlowLoader('before')
+    thread, results = run_in_background(lambda: flight.do('k', loader))
+    assert loader.started.wait(5)
+
+    assert flight.forget(predicate=lambda key: key == 'k') == 1
+    assert flight.do('k', lambda: 'after') == 'after'
+    loader.release.set()
+    thread.join()
+
+    assert results == ['before']
+    assert flight.stats() == {'executed': 2, 'shared': 0, 'name': 'test', 'in_flight': 0}
+
+
+@pytest.mark.parametrize('invalidate', [
+    lambda cache: cache.invalidate('k'),
+    lambda cache: cache.invalidate(predicate=lambda key: key == 'k'),
+    lambda cache: cache.clear(),
+])
+def test_put_started_before_invalidate_is_not_cached(invalidate):
+    cache = SnapshotCache('test', ttl=60)
+    generation = cache.generation('k')
+    invalidate(cache)
+
+    meta = cache.put('k', 'before', generation=generation)
+    assert not meta['stale']
+    assert cache.peek('k') is None
+    assert cache.stats()['discarded'] == 1
+
+    cache.put('k', 'after', generation=cache.generation('k'))
+    assert cache.peek('k').value == 'after'
+
+
+def test_streamed_quotas_are_not_cached_after_instance_mutation():
+    from app.services.quota_service import QuotaService, quota_snapshots
+    from app.utils.invalidation import invalidation_bus, limits_key
+
+    service = QuotaService()
+    key = service._quota_key('1', 'compute', None)
+    quota_snapshots.invalidate(key)
+    generation = service.quota_generation('1', 'compute')
+    # 流式查询进行期间创建了实例
+    invalidation_bus.publish([limits_key('1')])
+
+    result = service.store_service_quotas('1', 'compute', None, [], generation=generation)
+    assert result['total_limits'] == 0
+    assert quota_snapshots.peek(key) is None
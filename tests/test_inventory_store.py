@@ -0,0 +1,43 @@
+import pytest
+
+from app.services.inventory_store import InventoryStore
+
+TENANCY = 'ocid1.tenancy.oc1..test'
+
+
+@pytest.fixture
+def store(tmp_path):
+    return InventoryStore(str(tmp_path / 'inventory.db'))
+
+
+def test_apply_snapshot_records_changes(store):
+    store.apply_snapshot(TENANCY, 'instances', {'a': {'id': 'a', 'public_ip': '1.1.1.1'}}, taken_at=100)
+    counts = store.apply_snapshot(TENANCY, 'instances', {'b': {'id': 'b'}}, taken_at=200)
+
+    assert counts == {'added': 1, 'changed': 0, 'removed': 1}
+    assert store.list_resources(TENANCY, 'instances') == [{'id': 'b'}]
+    assert store.snapshot_info(TENANCY, 'instances')['taken_at'] == 200
+
+
+def test_older_snapshot_does_not_overwrite_newer(store):
+    store.apply_snapshot(TENANCY, 'instances', {'b': {'id': 'b'}}, taken_at=200)
+    counts = store.apply_snapshot(TENANCY, 'instances', {'a': {'id': 'a'}}, taken_at=100)
+
+    assert counts == {'added': 0, 'changed': 0, 'removed': 0}
+    assert store.list_resources(TENANCY, 'instances') == [{'id': 'b'}]
+    assert store.snapshot_info(TENANCY, 'instances')['taken_at'] == 200
+    assert len(store.query_changes(TENANCY)) == 1
+
+
+def test_lease_has_a_single_owner_until_released_or_expired(store):
+    assert store.acquire_lease('scheduler', 'host:1', ttl=60)
+    assert not store.acquire_lease('scheduler', 'host:2', ttl=60)
+    # 持有者可以续期
+    assert store.acquire_lease('scheduler', 'host:1', ttl=60)
+
+    store.release_lease('scheduler', 'host:2')
+    assert not store.acquire_lease('scheduler', 'host:2', ttl=60)
+    store.release_lease('scheduler', 'host:1')
+    assert store.acquire_lease('scheduler', 'host:2', ttl=0)
+    # 过期的租约可以被接管
+    assert store.acquire_lease('scheduler', 'host:1', ttl=60)
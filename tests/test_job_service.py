@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+from app.services.job_service import JOB_FAILED, JOB_RUNNING, JOB_SUCCEEDED, JobManager
+from conftest import wait_for_job
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(max_workers=2, retention=60)
+    yield manager
+    manager.shutdown()
+
+
+def test_submit_returns_initial_result_and_merges_return_value(manager):
+    job = manager.submit('test', lambda job: {'answer': 42}, tenant_id='1', instance_id='i-1')
+    assert job.result['instance_id'] == 'i-1'
+
+    result = wait_for_job(manager, job.id)
+    assert result['status'] == JOB_SUCCEEDED
+    assert result['tenant_id'] == '1'
+    assert result['result'] == {'instance_id': 'i-1', 'answer': 42}
+    assert result['progress'] == '已完成'
+    assert result['error'] is None
+
+
+def test_failure_records_error(manager):
+    def fail(job):
+        raise RuntimeError('boom')
+
+    result = wait_for_job(manager, manager.submit('test', fail).id)
+    assert result['status'] == JOB_FAILED
+    assert result['done']
+    assert result['error'] == 'boom'
+
+
+def test_progress_and_active_count_while_running(manager):
+    started = threading.Event()
+    release = threading.Event()
+
+    def work(job):
+        job.update(progress='处理中', step=1)
+        started.set()
+        release.wait(5)
+
+    job = manager.submit('test', work)
+    assert started.wait(5)
+    current = manager.get(job.id)
+    assert current['status'] == JOB_RUNNING
+    assert current['progress'] == '处理中'
+    assert current['result']['step'] == 1
+    assert manager.active_count() == 1
+
+    release.set()
+    wait_for_job(manager, job.id)
+    assert manager.active_count() == 0
+
+
+def test_finished_jobs_are_purged_after_retention(manager):
+    old = manager.submit('test', lambda job: None)
+    wait_for_job(manager, old.id)
+    old.updated_at = time.time() - manager.retention - 1
+
+    manager.submit('test', lambda job: None)
+    assert manager.get(old.id) is None
+
+
+def test_unknown_job_returns_none(manager):
+    assert manager.get('missing') is None
+
+
+def test_shutdown_waits_for_queued_jobs():
+    manager = JobManager(max_workers=1)
+    finished = []
+    jobs = [manager.submit('test', lambda job, i=i: finished.append(i) or time.sleep(0.01)) for i in range(3)]
+    manager.shutdown(wait=True)
+    assert finished == [0, 1, 2]
+    assert all(manager.get(job.id)['status'] == JOB_SUCCEEDED for job in jobs)
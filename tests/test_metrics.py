@@ -0,0 +1,34 @@
+import pytest
+
+from app.utils.metrics import OCI_CALL_LATENCY, observe_oci_call
+
+REMOTE = {'REMOTE_ADDR': '203.0.113.5'}
+
+
+@pytest.fixture(scope='module')
+def app():
+    from app import create_app
+    return create_app()
+
+
+def test_metrics_allowed_from_localhost(app):
+    response = app.test_client().get('/metrics')
+    assert response.status_code == 200
+    assert b'oci_web_request_seconds' in response.data
+
+
+def test_metrics_forbidden_for_other_addresses(app):
+    assert app.test_client().get('/metrics', environ_base=REMOTE).status_code == 403
+
+
+def test_metrics_allowed_for_admins(app):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = 'admin'
+        session['_fresh'] = True
+    assert client.get('/metrics', environ_base=REMOTE).status_code == 200
+
+
+def test_oci_call_latency_has_no_tenant_label():
+    assert 'tenant' not in OCI_CALL_LATENCY._labelnames
+    observe_oci_call('compute', 'list_instances', 'ok', 0.1)
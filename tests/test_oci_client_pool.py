@@ -0,0 +1,58 @@
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.utils.oci_client_pool import OCIClientPool
+
+
+@pytest.fixture(scope='module')
+def key_file(tmp_path_factory):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    path = tmp_path_factory.mktemp('keys') / 'oci_api_key.pem'
+    path.write_bytes(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                       serialization.NoEncryption()))
+    return str(path)
+
+
+@pytest.fixture
+def tenant(key_file):
+    return {
+        'name': 'test',
+        'user_ocid': 'ocid1.user.oc1..test',
+        'fingerprint': ':'.join(['aa'] * 16),
+        'key_file': key_file,
+        'tenancy': 'ocid1.tenancy.oc1..test',
+        'region': 'ap-tokyo-1',
+    }
+
+
+def test_clients_are_reused_per_tenant_service_and_region(tenant):
+    pool = OCIClientPool()
+    compute = pool.get_client('1', 'compute', tenant)
+
+    assert pool.get_client('1', 'COMPUTE', tenant) is compute
+    assert pool.get_client('1', 'network', tenant) is not compute
+    assert pool.get_client('1', 'compute', tenant, region='us-ashburn-1') is not compute
+    # 同一租户的所有客户端共用一个签名器
+    assert pool.stats() == {'clients': 3, 'signers': 1}
+
+
+def test_credential_change_rebuilds_the_tenants_clients(tenant):
+    pool = OCIClientPool()
+    compute = pool.get_client('1', 'compute', tenant)
+    pool.get_client('1', 'network', tenant)
+
+    rotated = dict(tenant, fingerprint=':'.join(['bb'] * 16))
+    assert pool.get_client('1', 'compute', rotated) is not compute
+    assert pool.stats() == {'clients': 1, 'signers': 1}
+
+
+def test_evict_and_unknown_service(tenant):
+    pool = OCIClientPool()
+    pool.get_client('1', 'compute', tenant)
+    pool.get_client('2', 'compute', tenant)
+
+    pool.evict('1')
+    assert pool.stats() == {'clients': 1, 'signers': 1}
+    with pytest.raises(ValueError):
+        pool.get_client('2', 'dns', tenant)
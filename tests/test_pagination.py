@@ -0,0 +1,80 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from app.utils.pagination import iter_items, iter_pages, list_all
+
+
+class PagedList:
+    """模拟OCI列表方法，page 为页号字符串；block 中的页在 release 之前不返回"""
+
+    def __init__(self, pages, collection=False, block=()):
+        self.pages = pages
+        self.collection = collection
+        self.block = set(block)
+        self.requested = []
+        self.limits = []
+        self.started = {}
+        self.release = threading.Event()
+
+    def __call__(self, compartment_id=None, page=None, limit=None):
+        self.requested.append(page)
+        self.limits.append(limit)
+        self.started.setdefault(page, threading.Event()).set()
+        if page in self.block:
+            self.release.wait(5)
+        index = int(page or 0)
+        data = self.pages[index]
+        next_page = str(index + 1) if index + 1 < len(self.pages) else None
+        return SimpleNamespace(data=SimpleNamespace(items=data) if self.collection else data,
+                               next_page=next_page)
+
+    def wait_started(self, page):
+        return self.started.setdefault(page, threading.Event()).wait(5)
+
+
+def test_list_all_follows_next_page_with_page_size():
+    list_func = PagedList([[1, 2], [3, 4], [5]])
+    assert list_all(list_func, compartment_id='c', page_size=2) == [1, 2, 3, 4, 5]
+    assert list_func.requested == [None, '1', '2']
+    assert list_func.limits == [2, 2, 2]
+
+
+def test_collection_responses_yield_their_items():
+    list_func = PagedList([[1], [2]], collection=True)
+    assert list(iter_pages(list_func, page_size=1)) == [[1], [2]]
+
+
+def test_iter_items_stops_requesting_when_caller_stops():
+    list_func = PagedList([[1, 2], [3, 4], [5, 6]])
+    items = iter_items(list_func, page_size=2)
+    assert [next(items) for _ in range(3)] == [1, 2, 3]
+    items.close()
+    assert list_func.requested == [None, '1']
+
+
+def test_prefetch_requests_next_page_while_caller_processes_current():
+    list_func = PagedList([[1], [2], [3]])
+    pages = iter_pages(list_func, page_size=1, prefetch=True)
+
+    assert next(pages) == [1]
+    # 调用方还没有请求下一页，下一页已经在后台发出
+    assert list_func.wait_started('1')
+    assert list(pages) == [[2], [3]]
+    assert list_func.requested == [None, '1', '2']
+
+
+def test_prefetch_early_stop_does_not_wait_for_request_in_flight():
+    list_func = PagedList([[1], [2], [3]], block={'1'})
+    pages = iter_pages(list_func, page_size=1, prefetch=True)
+
+    assert next(pages) == [1]
+    assert list_func.wait_started('1')
+    started = time.monotonic()
+    pages.close()
+    assert time.monotonic() - started < 1
+
+    list_func.release.set()
+    time.sleep(0.05)
+    # 已发出的请求结束后不再请求后续页
+    assert list_func.requested == [None, '1']
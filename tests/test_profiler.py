@@ -0,0 +1,32 @@
+import pytest
+
+from app.utils.profiler import PROFILE_HEADER, TRACE_HEADER, request_profiler
+
+
+@pytest.fixture(scope='module')
+def app():
+    from app import create_app
+    return create_app()
+
+
+def profiled(client):
+    return TRACE_HEADER in client.get('/auth/login', headers={PROFILE_HEADER: '1'}).headers
+
+
+def test_profile_header_ignored_for_anonymous_users(app, monkeypatch):
+    monkeypatch.setattr(request_profiler, 'enabled', False)
+    assert not profiled(app.test_client())
+
+
+def test_profile_header_honored_for_admins(app, monkeypatch):
+    monkeypatch.setattr(request_profiler, 'enabled', False)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = 'admin'
+        session['_fresh'] = True
+    assert profiled(client)
+
+
+def test_profile_header_honored_when_profiling_enabled(app, monkeypatch):
+    monkeypatch.setattr(request_profiler, 'enabled', True)
+    assert profiled(app.test_client())
@@ -0,0 +1,126 @@
+import threading
+import time
+
+from app.utils.singleflight import SingleFlight, coalesced
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, '等待超时'
+        time.sleep(0.001)
+
+
+def run_concurrently(count, func):
+    results, errors = [None] * count, [None] * count
+
+    def run(i):
+        try:
+            results[i] = func()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def test_concurrent_calls_with_same_key_execute_once():
+    flight = SingleFlight('test')
+    release = threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        release.wait(5)
+        return {'items': [1, 2]}
+
+    threads, results, errors = run_concurrently(5, lambda: flight.do('k', load))
+    wait_until(lambda: flight.stats()['shared'] == 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert errors == [None] * 5
+    assert results == [{'items': [1, 2]}] * 5
+    # 每个调用方拿到独立的副本
+    assert len({id(result) for result in results}) == 5
+    assert flight.stats() == {'executed': 1, 'shared': 4, 'name': 'test', 'in_flight': 0}
+
+
+def test_waiters_receive_the_leaders_error():
+    flight = SingleFlight('test')
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise RuntimeError('boom')
+
+    threads, results, errors = run_concurrently(3, lambda: flight.do('k', fail))
+    wait_until(lambda: flight.stats()['shared'] == 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert [str(error) for error in errors] == ['boom'] * 3
+
+
+def test_calls_after_completion_execute_again():
+    flight = SingleFlight('test')
+    assert flight.do('k', lambda: 1) == 1
+    assert flight.do('k', lambda: 2) == 2
+    assert flight.stats()['executed'] == 2
+
+
+class Service:
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+
+    @coalesced()
+    def list_items(self, tenant_id, force=False):
+        self.calls.append((tenant_id, force))
+        self.release.wait(5)
+        return [tenant_id]
+
+
+def test_coalesced_method_keys_on_arguments_including_defaults():
+    service = Service()
+    flight = Service.list_items.flight
+    calls = [lambda: service.list_items('1'), lambda: service.list_items('1', False),
+             lambda: service.list_items(tenant_id='1'), lambda: service.list_items('2')]
+
+    threads = []
+    for call in calls:
+        thread, _, _ = run_concurrently(1, call)
+        threads.extend(thread)
+    wait_until(lambda: flight.stats()['shared'] == 2)
+    service.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(service.calls) == [('1', False), ('2', False)]
+
+
+def test_coalesced_method_runs_unhashable_arguments_directly():
+    service = Service()
+    service.release.set()
+    executed = Service.list_items.flight.stats()['executed']
+
+    assert service.list_items(['1']) == [['1']]
+    assert Service.list_items.flight.stats()['executed'] == executed
+    assert service.calls == [(['1'], False)]
+
+
+def test_different_keys_are_not_shared():
+    flight = SingleFlight('test')
+    release = threading.Event()
+    threads, results, _ = run_concurrently(1, lambda: flight.do('k', lambda: release.wait(5) and 'first'))
+    wait_until(lambda: flight.stats()['in_flight'] == 1)
+
+    assert flight.do('other', lambda: 'second') == 'second'
+    release.set()
+    threads[0].join()
+    assert results == ['first']
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+import yaml
+
+from config.tenant_registry import TenantRegistry
+
+
+def tenant(name, tenancy):
+    return {'name': name, 'tenancy': tenancy, 'region': 'ap-tokyo-1'}
+
+
+def write_file(path, tenants):
+    with open(path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump({'tenants': tenants}, f)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'tenants.yml')
+
+
+@pytest.fixture
+def registry(path):
+    return TenantRegistry(path)
+
+
+def test_missing_file_is_empty(registry):
+    assert registry.items() == []
+    assert registry.get_by_id('1') is None
+
+
+def test_lookups_by_id_name_and_tenancy(registry, path):
+    write_file(path, [tenant('a', 'ocid1.tenancy.a'), tenant('b', 'ocid1.tenancy.b')])
+
+    assert [tenant_id for tenant_id, _ in registry.items()] == ['1', '2']
+    assert registry.get_by_id('2')['name'] == 'b'
+    assert registry.id_by_name('a') == '1'
+    assert registry.get_by_tenancy('ocid1.tenancy.b')['name'] == 'b'
+    # 返回的是副本，修改不影响注册表
+    registry.get_by_id('1')['name'] = 'changed'
+    assert registry.get_by_id('1')['name'] == 'a'
+
+
+def test_reloads_only_when_file_changes(registry, path):
+    loads = []
+    registry.add_listener(lambda: loads.append(1))
+    write_file(path, [tenant('a', 'ocid1.tenancy.a')])
+
+    for _ in range(3):
+        assert registry.get_by_id('1')['name'] == 'a'
+    assert len(loads) == 1
+
+    # 其他工作进程替换了文件
+    write_file(path, [tenant('a', 'ocid1.tenancy.a'), tenant('new', 'ocid1.tenancy.new')])
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    assert registry.get_by_tenancy('ocid1.tenancy.new')['name'] == 'new'
+    assert len(loads) == 2
+
+
+def test_update_writes_through_and_reindexes(registry, path):
+    write_file(path, [tenant('a', 'ocid1.tenancy.a')])
+
+    assert registry.update(lambda data: data['tenants'].append(tenant('b', 'ocid1.tenancy.b'))) is None
+    assert registry.id_by_name('b') == '2'
+    with open(path, encoding='utf-8') as f:
+        assert [t['name'] for t in yaml.safe_load(f)['tenants']] == ['a', 'b']
+
+    # 返回 False 时放弃写入
+    assert registry.update(lambda data: data['tenants'].clear() or False) is False
+    assert len(registry.items()) == 2
+    assert not [name for name in os.listdir(os.path.dirname(path)) if name.startswith('.tenants-')]
@@ -0,0 +1,138 @@
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import usage_service as module
+from app.services.usage_store import UsageStore
+
+TENANCY = 'ocid1.tenancy.oc1..test'
+
+
+def usage_item(day, service, sku_name, quantity, cost, unit=None):
+    dimensions = [SimpleNamespace(key='service', value=service), SimpleNamespace(key='skuName', value=sku_name)]
+    if unit:
+        dimensions.append(SimpleNamespace(key='unit', value=unit))
+    return SimpleNamespace(dimensions=dimensions, computed_quantity=quantity, computed_amount=cost,
+                           time_usage_started=datetime.combine(day, datetime.min.time()))
+
+
+class UsageClient:
+    """每天返回两条使用量（其中一条为0），记录每次查询的日期区间"""
+
+    def __init__(self):
+        self.ranges = []
+
+    def request_summarized_usages(self, request_summarized_usages_details, page=None, limit=None):
+        start = date.fromisoformat(str(request_summarized_usages_details.time_usage_started)[:10])
+        end = date.fromisoformat(str(request_summarized_usages_details.time_usage_ended)[:10])
+        self.ranges.append((start, end))
+        items = []
+        day = start
+        while day < end:
+            items.append(usage_item(day, 'Compute', 'Standard - E4 - OCPU', 24, 1.5))
+            items.append(usage_item(day, 'Compute', 'Standard - E4 - Memory', 0, 0))
+            day += timedelta(days=1)
+        return SimpleNamespace(data=SimpleNamespace(items=items), next_page=None)
+
+
+@pytest.fixture
+def client():
+    return UsageClient()
+
+
+@pytest.fixture
+def service(tmp_path, client, monkeypatch):
+    monkeypatch.setattr(module, 'usage_store', UsageStore(str(tmp_path / 'usage.db')))
+    service = module.UsageService()
+    monkeypatch.setattr(service.tenant_service, 'get_oci_client', lambda tenant_id, service=None: client)
+    return service
+
+
+def days_ago(days):
+    return date.today() - timedelta(days=days)
+
+
+def test_sync_fetches_only_missing_days_as_contiguous_ranges(service, client):
+    assert service.sync_usage('1', TENANCY, days_ago(20), days_ago(15)) == 5
+    assert service.sync_usage('1', TENANCY, days_ago(20), days_ago(15)) == 0
+
+    assert service.sync_usage('1', TENANCY, days_ago(22), days_ago(13)) == 4
+    assert client.ranges == [
+        (days_ago(20), days_ago(15)),
+        (days_ago(22), days_ago(20)),
+        (days_ago(15), days_ago(13)),
+    ]
+
+    rows = module.usage_store.query_rows(TENANCY, days_ago(22).isoformat(), days_ago(13).isoformat())
+    # 使用量为0的行不入库
+    assert len(rows) == 9
+    assert {row[2] for row in rows} == {'Standard - E4 - OCPU'}
+
+
+def test_unsettled_days_are_refetched_after_refresh_interval(service, client, monkeypatch):
+    service.sync_usage('1', TENANCY, days_ago(10), days_ago(0))
+    assert service.sync_usage('1', TENANCY, days_ago(10), days_ago(0)) == 0
+
+    monkeypatch.setattr(module, 'USAGE_REFRESH_INTERVAL', -1)
+    refetched = service.sync_usage('1', TENANCY, days_ago(10), days_ago(0))
+
+    assert refetched == module.USAGE_SETTLE_DAYS
+    assert client.ranges[-1] == (days_ago(module.USAGE_SETTLE_DAYS), days_ago(0))
+    rows = module.usage_store.query_rows(TENANCY, days_ago(10).isoformat(), days_ago(0).isoformat())
+    assert len(rows) == 10
+
+
+def test_future_days_are_not_fetched(service, client):
+    assert service.sync_usage('1', TENANCY, date.today() + timedelta(days=2), date.today() + timedelta(days=5)) == 0
+    assert client.ranges == []
+
+
+def legacy_infer_unit(sku_name):
+    sku_name_upper = (sku_name or '').upper()
+    if any(word in sku_name_upper for word in ['OCPU', 'CPU']):
+        return 'OCPU Hours'
+    if 'MEMORY' in sku_name_upper:
+        return 'GB Hours'
+    if any(word in sku_name_upper for word in ['STORAGE', 'VOLUME', 'BACKUP']):
+        return 'GB Months'
+    if any(word in sku_name_upper for word in ['BANDWIDTH', 'DATA TRANSFER', 'OUTBOUND']):
+        return 'GB'
+    if 'DATABASE' in sku_name_upper:
+        return 'Instance Hours'
+    return 'Units'
+
+
+def legacy_format_usage_data(items):
+    """列式聚合之前逐条构造字典的实现，作为对照"""
+    grouped, sku_unit_map = {}, {}
+    for item in items:
+        quantity = float(item.computed_quantity or 0)
+        if quantity <= 0:
+            continue
+        dims = {dim.key: dim.value for dim in item.dimensions}
+        service, sku_name = dims.get('service', 'Unknown'), dims.get('skuName', 'Unknown SKU')
+        unit = sku_unit_map.get(sku_name) or dims.get('unit') or legacy_infer_unit(sku_name)
+        sku_unit_map.setdefault(sku_name, unit)
+        group = grouped.setdefault((sku_name, unit), {'service': service, 'sku_name': sku_name, 'unit': unit,
+                                                      'total_quantity': 0, 'total_cost': 0})
+        group['total_quantity'] += quantity
+        group['total_cost'] += float(item.computed_amount or 0)
+    return sorted(grouped.values(), key=lambda x: (-x['total_cost'], x['service'], x['sku_name']))
+
+
+def test_aggregation_matches_legacy_row_by_row_result(service):
+    day = days_ago(5)
+    items = [
+        usage_item(day, 'Compute', 'Standard - E4 - OCPU', 24, 1.5),
+        usage_item(day, 'Compute', 'Standard - E4 - OCPU', 12, 0.75, unit='OCPU Hours'),
+        # 第一次出现时没有单位，之后出现的单位以推断结果为准
+        usage_item(day, 'Compute', 'Standard - E4 - Memory', 96, 0.5),
+        usage_item(day, 'Compute', 'Standard - E4 - Memory', 48, 0.25, unit='Gigabyte Hours'),
+        usage_item(day, 'Block Storage', 'Block Volume - Storage', 50, 0.5, unit='GB Month'),
+        usage_item(day, 'Networking', 'Outbound Data Transfer', 10, 0.5),
+        usage_item(day, 'Object Storage', 'Requests', 1000, 0),
+        usage_item(day, 'Compute', 'Free Tier Shape', 0, 0),
+    ]
+
+    assert service._format_usage_data(items) == legacy_format_usage_data(items)
@@ -0,0 +1,10 @@
+"""生产环境 WSGI 入口
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+创建应用时不会创建OCI客户端、后台线程或数据库连接，这些都在工作进程首次使用时才创建，
+因此开启 preload 时在 fork 之前导入应用是安全的。
+"""
+from app import create_app
+
+app = create_app()